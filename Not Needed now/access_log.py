@@ -0,0 +1,162 @@
+"""
+Structured access log written off the request path.
+
+The request thread only builds a small dict from values Flask already has
+(route, status, Content-Length, latency) and puts it on a bounded queue;
+bodies are never deserialized. A daemon thread drains the queue, serializes
+records as JSON lines and writes them out in batches. If the queue is full
+the record is dropped and counted rather than blocking the request.
+"""
+
+import atexit
+import hashlib
+import json
+import logging
+import os
+import queue
+import random
+import threading
+import time
+from typing import Dict, Optional
+
+logger = logging.getLogger(__name__)
+
+
+class AccessLog:
+    """Sampled, batched JSON-lines access log with a background writer"""
+
+    def __init__(self, path: Optional[str] = None, sample_rate: float = 1.0,
+                 digest_rate: float = 0.1, max_queue: int = 10000,
+                 flush_interval: float = 1.0, batch_size: int = 500):
+        self.path = path
+        self.sample_rate = sample_rate
+        self.digest_rate = digest_rate
+        self.flush_interval = flush_interval
+        self.batch_size = batch_size
+        self._queue = queue.Queue(maxsize=max_queue)
+        self._lock = threading.Lock()
+        self._write_lock = threading.Lock()
+        self._thread = None
+        self._pid = None
+        self._stream = None
+        self.written = 0
+        self.dropped = 0
+        atexit.register(self.close)
+
+    @classmethod
+    def from_config(cls, config) -> 'AccessLog':
+        return cls(
+            path=config.ACCESS_LOG_PATH,
+            sample_rate=config.ACCESS_LOG_SAMPLE_RATE,
+            digest_rate=config.ACCESS_LOG_DIGEST_RATE,
+            max_queue=config.ACCESS_LOG_QUEUE_SIZE,
+            flush_interval=config.ACCESS_LOG_FLUSH_INTERVAL
+        )
+
+    def _ensure_writer(self) -> None:
+        # Threads do not survive fork, so a pre-forked worker starts its own
+        if self._pid == os.getpid() and self._thread is not None:
+            return
+        with self._lock:
+            if self._pid != os.getpid() or self._thread is None:
+                self._pid = os.getpid()
+                self._stream = None
+                self._thread = threading.Thread(target=self._run, name='access-log-writer', daemon=True)
+                self._thread.start()
+
+    def record(self, request, response, duration: float) -> None:
+        """Queue one access record; called from after_request"""
+        if self.sample_rate < 1.0 and random.random() >= self.sample_rate:
+            return
+
+        rule = request.url_rule
+        entry = {
+            "ts": round(time.time(), 3),
+            "method": request.method,
+            "route": rule.rule if rule is not None else request.path,
+            "path": request.path,
+            "remote_addr": request.remote_addr,
+            "status": response.status_code,
+            "bytes": response.content_length,
+            "duration_ms": round(duration * 1000, 3),
+            "cache": response.headers.get('X-Cache')
+        }
+        if self.digest_rate and random.random() < self.digest_rate:
+            entry["digest"] = request_digest(request)
+
+        self._ensure_writer()
+        try:
+            self._queue.put_nowait(entry)
+        except queue.Full:
+            self.dropped += 1
+
+    def _run(self) -> None:
+        while True:
+            try:
+                batch = [self._queue.get(timeout=self.flush_interval)]
+            except queue.Empty:
+                continue
+            while len(batch) < self.batch_size:
+                try:
+                    batch.append(self._queue.get_nowait())
+                except queue.Empty:
+                    break
+            self._write(batch)
+
+    def _write(self, batch) -> None:
+        lines = ''.join(json.dumps(entry, separators=(',', ':')) + '\n' for entry in batch)
+        with self._write_lock:
+            self._write_lines(lines, len(batch))
+
+    def _write_lines(self, lines: str, count: int) -> None:
+        try:
+            if self.path is None:
+                for line in lines.splitlines():
+                    logger.info(line)
+            else:
+                if self._stream is None:
+                    directory = os.path.dirname(self.path)
+                    if directory:
+                        os.makedirs(directory, exist_ok=True)
+                    self._stream = open(self.path, 'a', encoding='utf-8')
+                self._stream.write(lines)
+                self._stream.flush()
+            self.written += count
+        except OSError as e:
+            logger.warning(f"Could not write access log: {e}")
+            self.dropped += count
+
+    def flush(self) -> None:
+        """Write out whatever is queued, from the calling thread"""
+        batch = []
+        while True:
+            try:
+                batch.append(self._queue.get_nowait())
+            except queue.Empty:
+                break
+        if batch:
+            self._write(batch)
+
+    def close(self) -> None:
+        self.flush()
+        if self._stream is not None:
+            self._stream.close()
+            self._stream = None
+
+    def stats(self) -> Dict:
+        return {
+            "queued": self._queue.qsize(),
+            "written": self.written,
+            "dropped": self.dropped,
+            "sample_rate": self.sample_rate
+        }
+
+
+def request_digest(request) -> str:
+    """Short hash of method, path, query and raw body; identifies repeated requests without storing them"""
+    digest = hashlib.blake2b(digest_size=8)
+    digest.update(request.method.encode())
+    digest.update(request.full_path.encode())
+    # get_data returns the bytes Flask already buffered for get_json; nothing is parsed
+    digest.update(request.get_data(cache=True))
+    return digest.hexdigest()
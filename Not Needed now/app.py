@@ -1,84 +1,97 @@
-from flask import Flask, request, jsonify
-import pandas as pd
+import time
+_started = time.perf_counter()  # taken before the heavy imports, for the startup report
+
+from flask import Flask, Response, request, jsonify
 import numpy as np
-import joblib
 import os
-import requests
 import json
 from datetime import datetime, timedelta
-import time
+from inference import GridScorer
+from compiled_model import CompiledModel
+from event_store import EventStore, decode_cursor, encode_cursor
+from event_table import EventTable
+from utils import create_ndjson_response
+from metrics import MetricsRegistry
+from nasa_client import NasaClient
+from nasa_ingest import NasaIngester, SpaceEventStore
+from coalesce import Coalescer
 
 app = Flask(__name__)
+metrics = MetricsRegistry(snapshot_dir=os.getenv('METRICS_DIR'))
+metrics.describe('upstream_request_seconds', 'histogram', 'NASA API call latency by endpoint')
+metrics.describe('upstream_responses_total', 'counter', 'NASA responses by endpoint: downloaded, not_modified (304) or pinned')
+metrics.describe('model_inference_seconds', 'histogram', 'Model scoring time by endpoint')
 
 # Global variables to store the model and data
 model = None
 events_data = None
+scorer = None
+popular_events = []
+event_store = None
+data_version = ''
 
 # NASA API configuration
-NASA_API_BASE_URL = "https://api.nasa.gov"
 NASA_API_KEY = os.getenv('NASA_API_KEY', 'DEMO_KEY')  # Use DEMO_KEY as fallback
 
+# NASA data is read from the local store that nasa_ingest.py keeps up to date;
+# handlers never call api.nasa.gov themselves
+nasa_store = SpaceEventStore(os.getenv('NASA_STORE_PATH', 'nasa_events.db'))
+
+# Identical concurrent /recommend calls share one computation, and the result
+# is reused for RECOMMEND_RESULT_TTL seconds
+recommend_coalescer = Coalescer(ttl=float(os.getenv('RECOMMEND_RESULT_TTL', '2')))
+
+# /events pagination
+EVENTS_PAGE_SIZE = 100
+EVENTS_MAX_PAGE_SIZE = 1000
+
+# Cold-start timings, reported on /health
+startup = {"import_ms": None, "ready_ms": None, "first_request_ms": None, "first_response_ms": None}
+
 def load_model():
     """Load the trained model and events data"""
-    global model, events_data
+    global model, events_data, scorer, popular_events, event_store, data_version
     
-    if not os.path.exists('space_events_model.pkl'):
+    if not os.path.exists('space_events_model.npz') and not os.path.exists('space_events_model.pkl'):
         raise FileNotFoundError("Model file not found. Please run train_model.py first.")
     
-    if not os.path.exists('events_data.pkl'):
+    if not EventTable.exists('events_table') and not os.path.exists('events_data.pkl'):
         raise FileNotFoundError("Events data file not found. Please run train_model.py first.")
     
-    model = joblib.load('space_events_model.pkl')
-    events_data = joblib.load('events_data.pkl')
+    # Prefer the compiled tree and the mapped event table, so the server never
+    # has to import sklearn, pandas or joblib
+    if os.path.exists('space_events_model.npz'):
+        model = CompiledModel.load('space_events_model.npz')
+    else:
+        import joblib
+        model = joblib.load('space_events_model.pkl')
+    if EventTable.exists('events_table'):
+        events_data = EventTable.load('events_table')
+    else:
+        import joblib
+        events_data = joblib.load('events_data.pkl')
+    event_store = EventStore(events_data)
+    data_version = event_store.version
+    scorer = GridScorer(model)
+    popularity = np.asarray(events_data['popularity_score'], dtype=np.float64)
+    popular_events = [dict(event_store.records[row]) for row in np.argsort(-popularity, kind='stable')[:3]]
+    startup["ready_ms"] = round((time.perf_counter() - _started) * 1000, 2)
     print("Model and data loaded successfully!")
 
-def get_nasa_apod():
-    """Get NASA's Astronomy Picture of the Day"""
-    try:
-        url = f"{NASA_API_BASE_URL}/planetary/apod"
-        params = {
-            'api_key': NASA_API_KEY,
-            'count': 1
-        }
-        response = requests.get(url, params=params, timeout=10)
-        response.raise_for_status()
-        return response.json()
-    except Exception as e:
-        print(f"Error fetching NASA APOD: {e}")
-        return None
-
-def get_nasa_asteroids():
-    """Get near-Earth asteroid data from NASA"""
-    try:
-        # Get asteroids for today
-        today = datetime.now().strftime('%Y-%m-%d')
-        url = f"{NASA_API_BASE_URL}/neo/rest/v1/feed"
-        params = {
-            'api_key': NASA_API_KEY,
-            'start_date': today,
-            'end_date': today
-        }
-        response = requests.get(url, params=params, timeout=10)
-        response.raise_for_status()
-        return response.json()
-    except Exception as e:
-        print(f"Error fetching NASA asteroids: {e}")
-        return None
-
 def get_nasa_events():
-    """Get space events from NASA API"""
+    """Get today's space events from the local NASA store"""
     nasa_events = []
+    today = datetime.now().strftime('%Y-%m-%d')
     
-    # Get APOD
-    apod_data = get_nasa_apod()
-    if apod_data and len(apod_data) > 0:
-        apod = apod_data[0]
+    # Latest APOD
+    apod = nasa_store.latest('nasa_apod', on_or_before=today)
+    if apod:
         nasa_events.append({
             'event_type': 'nasa_apod',
-            'title': apod.get('title', 'Astronomy Picture of the Day'),
-            'description': apod.get('explanation', 'Daily space image from NASA'),
-            'date': apod.get('date', datetime.now().strftime('%Y-%m-%d')),
-            'image_url': apod.get('url', ''),
+            'title': apod['title'],
+            'description': apod['description'],
+            'date': apod['date'],
+            'image_url': apod['url'],
             'source': 'NASA APOD',
             'popularity_score': 9.0,
             'duration': 60,
@@ -86,26 +99,21 @@ def get_nasa_events():
             'location': 'Global'
         })
     
-    # Get asteroid data
-    asteroid_data = get_nasa_asteroids()
-    if asteroid_data and 'near_earth_objects' in asteroid_data:
-        today = datetime.now().strftime('%Y-%m-%d')
-        if today in asteroid_data['near_earth_objects']:
-            asteroids = asteroid_data['near_earth_objects'][today]
-            for asteroid in asteroids[:3]:  # Limit to 3 asteroids
-                nasa_events.append({
-                    'event_type': 'near_earth_asteroid',
-                    'title': f"Asteroid {asteroid.get('name', 'Unknown')}",
-                    'description': f"Near-Earth asteroid passing by today",
-                    'date': today,
-                    'distance_km': asteroid.get('close_approach_data', [{}])[0].get('miss_distance', {}).get('kilometers', 'Unknown'),
-                    'velocity_kmh': asteroid.get('close_approach_data', [{}])[0].get('relative_velocity', {}).get('kilometers_per_hour', 'Unknown'),
-                    'source': 'NASA NEO',
-                    'popularity_score': 8.5,
-                    'duration': 120,
-                    'time_of_day': 'night',
-                    'location': 'Global'
-                })
+    # Asteroids passing today
+    for asteroid in nasa_store.events(['near_earth_asteroid'], start=today, end=today, limit=3):
+        nasa_events.append({
+            'event_type': 'near_earth_asteroid',
+            'title': asteroid['title'],
+            'description': "Near-Earth asteroid passing by today",
+            'date': today,
+            'distance_km': asteroid['data'].get('miss_distance_km', 'Unknown'),
+            'velocity_kmh': asteroid['data'].get('velocity_kmh', 'Unknown'),
+            'source': 'NASA NEO',
+            'popularity_score': 8.5,
+            'duration': 120,
+            'time_of_day': 'night',
+            'location': 'Global'
+        })
     
     return nasa_events
 
@@ -138,104 +146,67 @@ def recommend_events():
         # Check if NASA events should be included
         include_nasa = user_prefs.get('include_nasa', True)
         
-        # Get NASA events if requested
-        nasa_events = []
-        if include_nasa:
-            nasa_events = get_nasa_events()
-        
-        # Create a DataFrame with user preferences
-        # We'll create multiple rows with different duration and popularity scores
-        # to get a variety of recommendations
-        user_data = []
-        
-        # Generate different combinations of duration and popularity for variety
-        durations = [60, 120, 180, 240, 300]
-        popularity_scores = [7.0, 7.5, 8.0, 8.5, 9.0]
+        def compute():
+            # Get NASA events if requested
+            nasa_events = []
+            if include_nasa:
+                nasa_events = get_nasa_events()
         
-        for duration in durations:
-            for popularity in popularity_scores:
-                user_data.append({
-                    'event_type': user_prefs['event_type'],
-                    'location': user_prefs['location'],
-                    'time_of_day': user_prefs['time_of_day'],
-                    'duration': duration,
-                    'popularity_score': popularity
-                })
+            # Score the duration/popularity grid for these preferences in one model pass
+            with metrics.timer('model_inference_seconds', {'endpoint': 'recommend'}):
+                top_liked = scorer.recommend(user_prefs, 3)
         
-        user_df = pd.DataFrame(user_data)
+            recommendations = []
         
-        # Get predictions for all combinations
-        predictions = model.predict(user_df)
-        prediction_probs = model.predict_proba(user_df)
+            if len(top_liked) == 0:
+                # If no events are predicted to be liked, return top events by popularity
+                for event in popular_events:
+                    recommendations.append({
+                        'event_type': event['event_type'],
+                        'location': event['location'],
+                        'time_of_day': event['time_of_day'],
+                        'duration': int(event['duration']),
+                        'popularity_score': float(event['popularity_score']),
+                        'predicted_like': 0,
+                        'like_probability': 0.0,
+                        'reason': 'No specific matches found, showing popular events',
+                        'source': 'Trained Model'
+                    })
+            else:
+                for event in top_liked:
+                    event.update({
+                        'reason': 'Based on your preferences',
+                        'source': 'Trained Model'
+                    })
+                    recommendations.append(event)
         
-        # Get the probability of liking (class 1)
-        like_probabilities = prediction_probs[:, 1]
+            # Add NASA events to recommendations if available
+            if nasa_events:
+                for nasa_event in nasa_events[:2]:  # Add up to 2 NASA events
+                    recommendations.append({
+                        'event_type': nasa_event['event_type'],
+                        'location': nasa_event['location'],
+                        'time_of_day': nasa_event['time_of_day'],
+                        'duration': nasa_event['duration'],
+                        'popularity_score': nasa_event['popularity_score'],
+                        'predicted_like': 1,
+                        'like_probability': 0.9,
+                        'reason': 'Live NASA data',
+                        'source': nasa_event['source'],
+                        'title': nasa_event.get('title', ''),
+                        'description': nasa_event.get('description', ''),
+                        'date': nasa_event.get('date', ''),
+                        'image_url': nasa_event.get('image_url', ''),
+                        'distance_km': nasa_event.get('distance_km', ''),
+                        'velocity_kmh': nasa_event.get('velocity_kmh', '')
+                    })
         
-        # Add predictions and probabilities to the user data
-        user_df['predicted_like'] = predictions
-        user_df['like_probability'] = like_probabilities
+            # Limit to top 3 recommendations
+            return recommendations[:3]
         
-        # Filter events that are predicted to be liked
-        liked_events = user_df[user_df['predicted_like'] == 1]
-        
-        recommendations = []
-        
-        if len(liked_events) == 0:
-            # If no events are predicted to be liked, return top events by popularity
-            top_events = events_data.nlargest(3, 'popularity_score')
-            
-            for _, event in top_events.iterrows():
-                recommendations.append({
-                    'event_type': event['event_type'],
-                    'location': event['location'],
-                    'time_of_day': event['time_of_day'],
-                    'duration': int(event['duration']),
-                    'popularity_score': float(event['popularity_score']),
-                    'predicted_like': 0,
-                    'like_probability': 0.0,
-                    'reason': 'No specific matches found, showing popular events',
-                    'source': 'Trained Model'
-                })
-        else:
-            # Sort by like probability and get top 3
-            top_liked = liked_events.nlargest(3, 'like_probability')
-            
-            for _, event in top_liked.iterrows():
-                recommendations.append({
-                    'event_type': event['event_type'],
-                    'location': event['location'],
-                    'time_of_day': event['time_of_day'],
-                    'duration': int(event['duration']),
-                    'popularity_score': float(event['popularity_score']),
-                    'predicted_like': int(event['predicted_like']),
-                    'like_probability': float(event['like_probability']),
-                    'reason': 'Based on your preferences',
-                    'source': 'Trained Model'
-                })
-        
-        # Add NASA events to recommendations if available
-        if nasa_events:
-            for nasa_event in nasa_events[:2]:  # Add up to 2 NASA events
-                recommendations.append({
-                    'event_type': nasa_event['event_type'],
-                    'location': nasa_event['location'],
-                    'time_of_day': nasa_event['time_of_day'],
-                    'duration': nasa_event['duration'],
-                    'popularity_score': nasa_event['popularity_score'],
-                    'predicted_like': 1,
-                    'like_probability': 0.9,
-                    'reason': 'Live NASA data',
-                    'source': nasa_event['source'],
-                    'title': nasa_event.get('title', ''),
-                    'description': nasa_event.get('description', ''),
-                    'date': nasa_event.get('date', ''),
-                    'image_url': nasa_event.get('image_url', ''),
-                    'distance_km': nasa_event.get('distance_km', ''),
-                    'velocity_kmh': nasa_event.get('velocity_kmh', '')
-                })
-        
-        # Limit to top 3 recommendations
-        recommendations = recommendations[:3]
+        # The model echoes the preference values, so the key is the exact values
+        key = (data_version, json.dumps([user_prefs[field] for field in required_fields]), bool(include_nasa))
+        recommendations, _ = recommend_coalescer.get_or_compute(key, compute)
         
         return jsonify({
             "user_preferences": user_prefs,
@@ -250,7 +221,7 @@ def recommend_events():
 
 @app.route('/nasa/events', methods=['GET'])
 def get_nasa_events_endpoint():
-    """Get live NASA space events"""
+    """Get today's NASA space events (from the local store)"""
     try:
         nasa_events = get_nasa_events()
         return jsonify({
@@ -261,27 +232,93 @@ def get_nasa_events_endpoint():
     except Exception as e:
         return jsonify({"error": str(e)}), 500
 
+@app.route('/nasa/asteroids/top', methods=['GET'])
+def top_asteroids():
+    """Closest (or fastest) asteroid approaches over a date range, from the local store
+
+    Query: by=miss_km|miss_ld|velocity_kmh|diameter_max_km, k (default 10),
+    start and end (ISO dates, default the last 90 days)
+    """
+    today = datetime.now().date()
+    by = request.args.get('by', 'miss_km')
+    k = min(request.args.get('k', 10, type=int), 1000)
+    start = request.args.get('start', (today - timedelta(days=90)).isoformat())
+    end = request.args.get('end', today.isoformat())
+    try:
+        approaches = nasa_store.approaches(start, end)
+        return jsonify({
+            "by": by,
+            "start": start,
+            "end": end,
+            "approaches_considered": len(approaches),
+            "approaches": approaches.top_k(by, k)
+        })
+    except ValueError as e:
+        return jsonify({"error": str(e)}), 400
+
+@app.before_request
+def time_first_request():
+    if startup["first_request_ms"] is None:
+        request.start_time = time.perf_counter()
+
+@app.after_request
+def record_first_request(response):
+    if startup["first_request_ms"] is None and hasattr(request, 'start_time'):
+        now = time.perf_counter()
+        startup["first_request_ms"] = round((now - request.start_time) * 1000, 2)
+        startup["first_response_ms"] = round((now - _started) * 1000, 2)
+    return response
+
 @app.route('/health', methods=['GET'])
 def health_check():
     """Health check endpoint"""
     return jsonify({
         "status": "healthy", 
         "model_loaded": model is not None,
-        "nasa_api_key": "configured" if NASA_API_KEY != 'DEMO_KEY' else "using_demo_key"
+        "nasa_api_key": "configured" if NASA_API_KEY != 'DEMO_KEY' else "using_demo_key",
+        "nasa_store": nasa_store.info(),
+        "recommend_coalescing": recommend_coalescer.stats(),
+        "startup": startup
     })
 
 @app.route('/events', methods=['GET'])
 def get_all_events():
-    """Get all available events"""
-    if events_data is None:
+    """Get events a page at a time (?limit=&cursor=&fields=), or all of them as NDJSON (?format=ndjson)"""
+    if event_store is None:
         return jsonify({"error": "Events data not loaded"}), 500
     
-    events_list = events_data.to_dict('records')
+    stream = request.args.get('format') == 'ndjson'
+    limit = request.args.get('limit', type=int)
+    if limit is not None:
+        limit = max(1, min(limit, EVENTS_MAX_PAGE_SIZE))
+    elif not stream:
+        limit = EVENTS_PAGE_SIZE
+    
+    try:
+        fields = event_store.parse_fields(request.args.get('fields'))
+        cursor = request.args.get('cursor')
+        after = decode_cursor(cursor, data_version) if cursor else None
+    except ValueError as e:
+        return jsonify({"error": str(e)}), 400
+    
+    rows = event_store.filter_ids()
+    page, last_row = event_store.page(rows, after=after, limit=limit)
+    next_cursor = encode_cursor(last_row, data_version) if last_row is not None else None
+    if stream:
+        return create_ndjson_response(event_store.iter_records(page, fields), next_cursor)
+    
+    events_list = list(event_store.iter_records(page, fields))
     return jsonify({
-        "total_events": len(events_list),
-        "events": events_list
+        "total_events": len(rows),
+        "events": events_list,
+        "next_cursor": next_cursor
     })
 
+@app.route('/metrics', methods=['GET'])
+def get_metrics():
+    """NASA call and inference metrics in Prometheus text format"""
+    return Response(metrics.prometheus_text(), mimetype='text/plain; version=0.0.4')
+
 @app.route('/model/info', methods=['GET'])
 def get_model_info():
     """Get information about the trained model"""
@@ -291,7 +328,9 @@ def get_model_info():
     try:
         # Get feature names if available
         feature_names = []
-        if hasattr(model, 'named_steps') and 'preprocessor' in model.named_steps:
+        if isinstance(model, CompiledModel):
+            feature_names = model.encoded_feature_names
+        elif hasattr(model, 'named_steps') and 'preprocessor' in model.named_steps:
             preprocessor = model.named_steps['preprocessor']
             if hasattr(preprocessor, 'named_transformers_'):
                 cat_features = preprocessor.named_transformers_.get('cat')
@@ -302,16 +341,23 @@ def get_model_info():
             "model_type": "DecisionTreeClassifier",
             "feature_names": feature_names,
             "training_data_size": len(events_data) if events_data is not None else 0,
-            "available_event_types": events_data['event_type'].unique().tolist() if events_data is not None else [],
-            "available_locations": events_data['location'].unique().tolist() if events_data is not None else []
+            "available_event_types": event_store.event_types if event_store is not None else [],
+            "available_locations": event_store.locations if event_store is not None else []
         })
     except Exception as e:
         return jsonify({"error": str(e)}), 500
 
+startup["import_ms"] = round((time.perf_counter() - _started) * 1000, 2)
+
 if __name__ == '__main__':
     # Load the model when starting the app
     try:
         load_model()
+        # Fetch NASA data in the background; the debug reloader runs this file
+        # twice, so only its serving child starts the worker
+        if os.environ.get('WERKZEUG_RUN_MAIN') == 'true' and os.getenv('NASA_INGEST_IN_PROCESS', '1') != '0':
+            NasaIngester(NasaClient.from_env(metrics=metrics, cache=nasa_store), nasa_store,
+                         interval=float(os.getenv('NASA_INGEST_INTERVAL', '3600'))).start()
         print("Starting Flask API server...")
         print(f"NASA API Key: {'Configured' if NASA_API_KEY != 'DEMO_KEY' else 'Using DEMO_KEY'}")
         app.run(debug=True, host='0.0.0.0', port=5000)
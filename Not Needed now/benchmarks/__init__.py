@@ -0,0 +1 @@
+"""Benchmarks for the space events API (run from the parent directory with python -m)"""
@@ -0,0 +1,92 @@
+"""
+Per-request overhead of access logging in after_request.
+
+Compares the original hook (re-parse request and response JSON, then a
+synchronous logger.info(json.dumps(...)) via log_api_request) against the
+queued AccessLog, timing only the hook on a /events-sized response.
+
+Usage (from the API directory):
+    python -m benchmarks.bench_access_log [--requests 2000] [--events 1000]
+"""
+
+import argparse
+import logging
+import os
+import tempfile
+import time
+
+import numpy as np
+from flask import Flask, jsonify, request
+
+from access_log import AccessLog
+from utils import log_api_request
+
+
+def make_app(hook, n_events):
+    app = Flask(__name__)
+    payload = [{'event_type': 'meteor shower', 'location': 'USA', 'time_of_day': 'night',
+                'duration': 120, 'popularity_score': 8.5, 'id': i} for i in range(n_events)]
+    samples = []
+
+    @app.route('/events')
+    def events():
+        return jsonify({'status': 'success', 'data': {'events': payload}})
+
+    @app.before_request
+    def before():
+        request.start_time = time.time()
+
+    @app.after_request
+    def after(response):
+        start = time.perf_counter()
+        hook(response, time.time() - request.start_time)
+        samples.append((time.perf_counter() - start) * 1e6)
+        return response
+
+    return app, samples
+
+
+def legacy_hook(response, duration):
+    request_data = request.get_json() if request.is_json else {}
+    response_data = response.get_json() if response.is_json else {}
+    log_api_request(request_data, response_data, duration)
+
+
+def run(hook, args):
+    app, samples = make_app(hook, args.events)
+    client = app.test_client()
+    for _ in range(args.requests):
+        client.get('/events?limit=100')
+    return np.array(samples[50:])  # drop warm-up
+
+
+def report(name, samples):
+    p50, p99 = np.percentile(samples, [50, 99])
+    print(f"{name:<8} p50 {p50:9.1f} us   p99 {p99:9.1f} us   mean {samples.mean():9.1f} us")
+    return p50
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--requests', type=int, default=2000)
+    parser.add_argument('--events', type=int, default=1000)
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        # Both paths write to a file so neither pays for terminal output
+        handler = logging.FileHandler(os.path.join(tmp, 'legacy.log'))
+        utils_logger = logging.getLogger('utils')
+        utils_logger.addHandler(handler)
+        utils_logger.propagate = False
+        access_log = AccessLog(path=os.path.join(tmp, 'access.log'))
+
+        print(f"after_request overhead, {args.requests} requests, {args.events} events per response")
+        before = report('before', run(legacy_hook, args))
+        after = report('after', run(lambda response, duration: access_log.record(request, response, duration), args))
+        print(f"speedup  p50 {before / after:.1f}x")
+        access_log.close()
+        handler.close()
+
+
+if __name__ == '__main__':
+    main()
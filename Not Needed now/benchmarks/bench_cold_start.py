@@ -0,0 +1,69 @@
+"""
+Worker cold start: time from process launch to the first served request.
+
+Starts a fresh interpreter per run, imports enhanced_app, loads the model
+and serves one /recommend request through the test client, then reads the
+startup report from /health. Compares loading the events from the pickled
+DataFrame (pandas + joblib) with the memory-mapped column arrays.
+
+Needs the artifacts from train_model.py in the working directory.
+
+Usage (from the API directory):
+    python -m benchmarks.bench_cold_start [--runs 10]
+"""
+
+import argparse
+import json
+import os
+import statistics
+import subprocess
+import sys
+import time
+
+WORKER = """
+import json, sys
+import config
+if sys.argv[1] == 'pickle':
+    config.Config.EVENTS_TABLE_PATH = 'no-such-table'
+import enhanced_app
+enhanced_app.load_model()
+client = enhanced_app.app.test_client()
+client.post('/recommend', json={'event_type': 'Meteor Shower', 'location': 'USA', 'time_of_day': 'Night'})
+report = client.get('/health').get_json()['data']['startup']
+report['modules'] = [name for name in ('pandas', 'joblib', 'sklearn') if name in sys.modules]
+print(json.dumps(report))
+"""
+
+
+def measure(mode, runs):
+    env = dict(os.environ, SECRET_KEY=os.environ.get('SECRET_KEY', 'bench'))
+    walls, reports = [], []
+    for _ in range(runs):
+        start = time.perf_counter()
+        output = subprocess.run([sys.executable, '-c', WORKER, mode], env=env, check=True,
+                                capture_output=True, text=True).stdout
+        walls.append((time.perf_counter() - start) * 1000)
+        reports.append(json.loads(output.strip().splitlines()[-1]))
+    return walls, reports
+
+
+def report(label, walls, reports):
+    median = lambda key: statistics.median(r[key] for r in reports)
+    print(f"{label:8} wall p50 {statistics.median(walls):7.1f} ms   import {median('import_ms'):7.1f} ms"
+          f"   load {median('model_load_ms'):6.1f} ms   first request {median('first_request_ms'):5.1f} ms"
+          f"   imported: {', '.join(reports[0]['modules']) or 'none of pandas/joblib/sklearn'}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--runs', type=int, default=10)
+    args = parser.parse_args()
+
+    print(f"Cold start, {args.runs} fresh processes per mode (wall = launch to exit)")
+    for mode in ('pickle', 'table'):
+        walls, reports = measure(mode, args.runs)
+        report(mode, walls, reports)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,70 @@
+"""
+Feedback ingestion throughput.
+
+Compares save_feedback_to_file (open, append one line, close per event)
+against FeedbackWriter, from several threads at once as a threaded worker
+would see it. Rates include the time to get every event onto disk.
+
+Usage (from the API directory):
+    python -m benchmarks.bench_feedback [--events 20000] [--threads 4] [--fsync interval]
+"""
+
+import argparse
+import logging
+import os
+import tempfile
+import threading
+import time
+
+from feedback_store import FeedbackWriter, read_feedback
+from utils import create_user_feedback_data, save_feedback_to_file
+
+PREFERENCES = {'event_type': 'meteor shower', 'location': 'USA', 'time_of_day': 'night'}
+
+
+def make_feedback(i):
+    return create_user_feedback_data(PREFERENCES, [], {'event_type': 'meteor shower', 'rank': i}, 'liked')
+
+
+def run_threads(func, events, threads):
+    per_thread = events // threads
+    # Build the records up front so only ingestion is timed
+    records = [make_feedback(i) for i in range(per_thread)]
+    workers = [threading.Thread(target=lambda: [func(record) for record in records])
+               for _ in range(threads)]
+    start = time.perf_counter()
+    for worker in workers:
+        worker.start()
+    for worker in workers:
+        worker.join()
+    return per_thread * threads, start
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--events', type=int, default=20000)
+    parser.add_argument('--threads', type=int, default=4)
+    parser.add_argument('--fsync', default='interval', choices=['always', 'interval', 'never'])
+    args = parser.parse_args()
+    logging.getLogger('utils').setLevel(logging.WARNING)  # one INFO line per event otherwise
+
+    with tempfile.TemporaryDirectory() as tmp:
+        legacy_path = os.path.join(tmp, 'user_feedback.jsonl')
+        total, start = run_threads(lambda record: save_feedback_to_file(record, legacy_path),
+                                   args.events, args.threads)
+        before = total / (time.perf_counter() - start)
+
+        writer = FeedbackWriter(directory=os.path.join(tmp, 'segments'), fsync=args.fsync)
+        total, start = run_threads(writer.submit, args.events, args.threads)
+        writer.close()
+        after = total / (time.perf_counter() - start)
+        assert sum(1 for _ in read_feedback(writer.directory, legacy_file=None)) == total
+
+    print(f"Feedback ingestion, {total} events from {args.threads} threads (fsync={args.fsync})")
+    print(f"before   {before:10.0f} events/s   (open-append-close per event)")
+    print(f"after    {after:10.0f} events/s   (queued, batched segment writes)")
+    print(f"speedup  {after / before:.1f}x")
+
+
+if __name__ == '__main__':
+    main()
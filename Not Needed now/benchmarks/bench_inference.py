@@ -0,0 +1,102 @@
+"""
+Latency benchmark for the /recommend inference step.
+
+Compares the original per-request path (build a DataFrame, call
+predict and predict_proba, nlargest + iterrows) against GridScorer.
+
+Usage (from the API directory):
+    python -m benchmarks.bench_inference [--iterations 2000]
+"""
+
+import argparse
+import os
+import time
+
+import joblib
+import numpy as np
+import pandas as pd
+
+from inference import GridScorer
+from train_model import build_pipeline
+
+PREFERENCES = [
+    {'event_type': 'meteor shower', 'location': 'USA', 'time_of_day': 'night'},
+    {'event_type': 'solar eclipse', 'location': 'Europe', 'time_of_day': 'day'},
+    {'event_type': 'aurora borealis', 'location': 'Norway', 'time_of_day': 'night'},
+    {'event_type': 'rocket launch', 'location': 'USA', 'time_of_day': 'day'},
+]
+
+
+def load_pipeline(model_path='space_events_model.pkl'):
+    """Load the trained pipeline, training it in memory if the artifact is missing"""
+    if os.path.exists(model_path):
+        return joblib.load(model_path)
+
+    df = pd.read_csv('events.csv')
+    return build_pipeline().fit(df.drop('liked', axis=1), df['liked'])
+
+
+def legacy_recommend(model, prefs, limit=3):
+    """The DataFrame round trip /recommend used before GridScorer"""
+    user_data = []
+    for duration in [60, 120, 180, 240, 300]:
+        for popularity in [7.0, 7.5, 8.0, 8.5, 9.0]:
+            user_data.append({
+                'event_type': prefs['event_type'],
+                'location': prefs['location'],
+                'time_of_day': prefs['time_of_day'],
+                'duration': duration,
+                'popularity_score': popularity
+            })
+
+    user_df = pd.DataFrame(user_data)
+    user_df['predicted_like'] = model.predict(user_df)
+    user_df['like_probability'] = model.predict_proba(user_df)[:, 1]
+    liked_events = user_df[user_df['predicted_like'] == 1]
+    return [event.to_dict() for _, event in liked_events.nlargest(limit, 'like_probability').iterrows()]
+
+
+def measure(func, iterations):
+    """Run ``func`` once per iteration and return per-call latencies in microseconds"""
+    samples = np.empty(iterations)
+    for i in range(iterations):
+        prefs = PREFERENCES[i % len(PREFERENCES)]
+        start = time.perf_counter()
+        func(prefs)
+        samples[i] = (time.perf_counter() - start) * 1e6
+    return samples
+
+
+def report(name, samples):
+    p50, p99 = np.percentile(samples, [50, 99])
+    print(f"{name:<12} p50 {p50:9.1f} us   p99 {p99:9.1f} us   mean {samples.mean():9.1f} us")
+    return p50, p99
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--iterations', type=int, default=2000)
+    args = parser.parse_args()
+
+    model = load_pipeline()
+    scorer = GridScorer(model)
+
+    # Both paths must agree before timing them
+    for prefs in PREFERENCES:
+        expected = legacy_recommend(model, prefs)
+        actual = scorer.recommend(prefs, 3)
+        assert [(e['duration'], e['popularity_score']) for e in expected] == \
+               [(a['duration'], a['popularity_score']) for a in actual], prefs
+
+    # Warm up both paths so first-call costs do not skew p99
+    measure(lambda prefs: legacy_recommend(model, prefs), 50)
+    measure(lambda prefs: scorer.recommend(prefs, 3), 50)
+
+    print(f"Recommendation inference, {args.iterations} requests")
+    before = report('before', measure(lambda prefs: legacy_recommend(model, prefs), args.iterations))
+    after = report('after', measure(lambda prefs: scorer.recommend(prefs, 3), args.iterations))
+    print(f"speedup      p50 {before[0] / after[0]:.1f}x   p99 {before[1] / after[1]:.1f}x")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,146 @@
+"""
+Memory per worker with and without preloading the model in the master.
+
+Mimics gunicorn's pre-fork model with os.fork: for each worker count a
+fresh master process either imports ``wsgi`` (loading the model and
+events) before forking, as ``preload_app`` does, or forks first and lets
+every worker load its own copy. Each worker then serves some requests,
+and with all of them alive the master reads /proc/<pid>/smaps_rollup.
+RSS counts shared pages in full for every worker; PSS splits them between
+the processes sharing them, so master + worker PSS is the memory the
+container actually uses. Linux only.
+
+Needs the artifacts from train_model.py in the working directory.
+``--rows`` serves a larger table built by repeating events.csv.
+
+Usage (from the API directory):
+    python -m benchmarks.bench_memory [--workers 8 16] [--rows 200000] [--requests 200]
+"""
+
+import argparse
+import json
+import os
+import signal
+import subprocess
+import sys
+import tempfile
+
+
+def memory(pid):
+    """Rss/Pss/Shared/Private in MB for one process"""
+    fields = {}
+    with open(f'/proc/{pid}/smaps_rollup') as f:
+        for line in f:
+            parts = line.split()
+            if len(parts) == 3 and parts[2] == 'kB':
+                fields[parts[0].rstrip(':')] = int(parts[1]) / 1024
+    return {
+        'rss': fields['Rss'],
+        'pss': fields['Pss'],
+        'shared': fields.get('Shared_Clean', 0) + fields.get('Shared_Dirty', 0),
+        'private': fields.get('Private_Clean', 0) + fields.get('Private_Dirty', 0),
+    }
+
+
+def serve(n_requests):
+    """What a worker does once it has the app: handle a mix of requests"""
+    import enhanced_app
+    client = enhanced_app.app.test_client()
+    for i in range(n_requests):
+        if i % 2:
+            client.post('/recommend', json={'event_type': 'Meteor Shower', 'location': 'USA',
+                                             'time_of_day': 'Night'})
+        else:
+            client.get(f'/events?limit=100&min_popularity={5 + i % 5}')
+
+
+def run_master(preload, workers, n_requests):
+    """Body of one master process; prints the memory of the master and every worker as JSON"""
+    if preload:
+        import wsgi  # noqa: F401  loads the model and data here, before forking
+
+    children = []
+    for _ in range(workers):
+        read_fd, write_fd = os.pipe()
+        pid = os.fork()
+        if pid == 0:
+            os.close(read_fd)
+            if not preload:
+                import wsgi  # noqa: F401
+            serve(n_requests)
+            os.write(write_fd, b'1')
+            signal.pause()
+            os._exit(0)
+        os.close(write_fd)
+        children.append((pid, read_fd))
+
+    for _, read_fd in children:
+        os.read(read_fd, 1)  # wait until every worker has served its requests
+    report = {'master': memory(os.getpid()), 'workers': [memory(pid) for pid, _ in children]}
+    for pid, _ in children:
+        os.kill(pid, signal.SIGKILL)
+        os.waitpid(pid, 0)
+    print(json.dumps(report))
+
+
+def build_table(rows, directory):
+    import pandas as pd
+    from event_table import export_event_table
+    from utils import enrich_events_frame
+
+    base = pd.read_csv('events.csv')
+    df = pd.concat([base] * (rows // len(base) + 1), ignore_index=True).iloc[:rows]
+    export_event_table(enrich_events_frame(df), directory)
+
+
+def measure(preload, workers, n_requests, table):
+    env = dict(os.environ, SECRET_KEY=os.environ.get('SECRET_KEY', 'bench'))
+    command = [sys.executable, '-m', 'benchmarks.bench_memory', '--master',
+               'preload' if preload else 'per-worker', '--workers', str(workers),
+               '--requests', str(n_requests)]
+    if table:
+        command += ['--table', table]
+    output = subprocess.run(command, env=env, check=True, capture_output=True, text=True).stdout
+    return json.loads(output.strip().splitlines()[-1])
+
+
+def report(label, workers, result):
+    per_worker = result['workers']
+    mean = lambda key: sum(w[key] for w in per_worker) / len(per_worker)
+    total = result['master']['pss'] + sum(w['pss'] for w in per_worker)
+    print(f"{label:10} {workers:3} workers   RSS/worker {mean('rss'):7.1f} MB   "
+          f"PSS/worker {mean('pss'):7.1f} MB   private/worker {mean('private'):6.1f} MB   "
+          f"total (PSS) {total:8.1f} MB")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--workers', type=int, nargs='+', default=[8, 16])
+    parser.add_argument('--rows', type=int, default=0, help="serve a table of this many rows")
+    parser.add_argument('--requests', type=int, default=200, help="requests per worker before measuring")
+    parser.add_argument('--master', choices=['preload', 'per-worker'], help=argparse.SUPPRESS)
+    parser.add_argument('--table', help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.master:
+        if args.table:
+            import config
+            config.Config.EVENTS_TABLE_PATH = args.table
+        run_master(args.master == 'preload', args.workers[0], args.requests)
+        return
+
+    with tempfile.TemporaryDirectory() as tmp:
+        table = None
+        if args.rows:
+            table = os.path.join(tmp, 'events_table')
+            build_table(args.rows, table)
+        print(f"Worker memory, {args.requests} requests per worker"
+              + (f", {args.rows} events" if args.rows else ""))
+        for workers in args.workers:
+            for preload in (False, True):
+                report('preload' if preload else 'per-worker', workers,
+                       measure(preload, workers, args.requests, table))
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,96 @@
+"""
+Latency benchmark for ranking recommendation candidates.
+
+Compares the original ranker (calculate_similarity_score per candidate,
+then a full sort) against the vectorized rank_recommendations, and times
+the scoring core on candidates that are already integer-coded.
+
+Usage (from the API directory):
+    python -m benchmarks.bench_ranking [--candidates 5000] [--limit 3] [--iterations 200]
+"""
+
+import argparse
+import time
+
+import numpy as np
+
+from utils import (
+    SIMILARITY_WEIGHTS, calculate_similarity_score, encode_column, rank_recommendations,
+    similarity_scores, top_k_indices
+)
+
+PREFERENCES = {'event_type': 'meteor shower', 'location': 'usa', 'time_of_day': 'night'}
+
+
+def make_candidates(n, seed=0):
+    rng = np.random.default_rng(seed)
+    return [
+        {
+            'event_type': str(rng.choice(['meteor shower', 'solar eclipse', 'star party', 'rocket launch'])),
+            'location': str(rng.choice(['usa', 'canada', 'norway', 'chile'])),
+            'time_of_day': str(rng.choice(['day', 'night'])),
+            'duration': int(rng.integers(30, 360)),
+            'like_probability': float(rng.random())
+        }
+        for _ in range(n)
+    ]
+
+
+def legacy_rank(recommendations, user_preferences):
+    """rank_recommendations before vectorization"""
+    for rec in recommendations:
+        similarity = calculate_similarity_score(rec, user_preferences)
+        rec['similarity_score'] = similarity
+        rec['final_score'] = (similarity * 0.6) + (rec.get('like_probability', 0) * 0.4)
+    recommendations.sort(key=lambda x: x['final_score'], reverse=True)
+    return recommendations
+
+
+def measure(func, iterations):
+    """Per-call latencies in microseconds"""
+    samples = np.empty(iterations)
+    for i in range(iterations):
+        start = time.perf_counter()
+        func()
+        samples[i] = (time.perf_counter() - start) * 1e6
+    return samples
+
+
+def report(name, samples):
+    p50, p99 = np.percentile(samples, [50, 99])
+    print(f"{name:<12} p50 {p50:9.1f} us   p99 {p99:9.1f} us   mean {samples.mean():9.1f} us")
+    return p50, p99
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--candidates', type=int, default=5000)
+    parser.add_argument('--limit', type=int, default=3)
+    parser.add_argument('--iterations', type=int, default=200)
+    args = parser.parse_args()
+
+    candidates = make_candidates(args.candidates)
+    expected = legacy_rank([dict(c) for c in candidates], PREFERENCES)[:args.limit]
+    assert rank_recommendations([dict(c) for c in candidates], PREFERENCES, limit=args.limit) == expected
+
+    # The scoring core on pre-encoded arrays, as a caller holding columns would use it
+    codes, target_codes = {}, {}
+    for field, _ in SIMILARITY_WEIGHTS:
+        codes[field], target_codes[field] = encode_column([c[field] for c in candidates], PREFERENCES[field])
+    durations = np.array([c['duration'] for c in candidates], dtype=np.float64)
+    like_prob = np.array([c['like_probability'] for c in candidates])
+
+    def encoded_rank():
+        final_score = similarity_scores(codes, target_codes, durations) * 0.6 + like_prob * 0.4
+        return top_k_indices(final_score, args.limit)
+
+    print(f"Ranking {args.candidates} candidates, top {args.limit}, {args.iterations} runs")
+    before = report('before', measure(lambda: legacy_rank(candidates, PREFERENCES), args.iterations))
+    after = report('after', measure(lambda: rank_recommendations(candidates, PREFERENCES, args.limit),
+                                    args.iterations))
+    core = report('encoded', measure(encoded_rank, args.iterations))
+    print(f"speedup      p50 {before[0] / after[0]:.1f}x (dicts)   {before[0] / core[0]:.1f}x (encoded)")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,55 @@
+"""
+Latency of one rate-limit decision.
+
+Times RateLimiter.hit against the local bucket store, and against Redis
+when --redis-url is given, over many client keys so the buckets are spread
+as they are in production. Decisions should stay well under 1 ms.
+
+Usage (from the API directory):
+    python -m benchmarks.bench_rate_limit [--decisions 20000] [--clients 1000]
+                                          [--redis-url redis://localhost:6379/0]
+"""
+
+import argparse
+import time
+
+import numpy as np
+
+from rate_limit import Limit, LocalBucketStore, RateLimiter, RedisBucketStore
+
+
+def measure(limiter, decisions, clients):
+    """Per-decision latencies in microseconds"""
+    limit = Limit.parse("50 per minute")
+    samples = np.empty(decisions)
+    for i in range(decisions):
+        start = time.perf_counter()
+        limiter.hit(f"in:bench:10.0.{i % clients // 256}.{i % 256}", limit)
+        samples[i] = (time.perf_counter() - start) * 1e6
+    return samples
+
+
+def report(name, samples):
+    p50, p99, worst = np.percentile(samples, [50, 99, 100])
+    print(f"{name:6} p50 {p50:8.1f} us   p99 {p99:8.1f} us   max {worst:8.1f} us")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--decisions', type=int, default=20000)
+    parser.add_argument('--clients', type=int, default=1000)
+    parser.add_argument('--redis-url')
+    args = parser.parse_args()
+
+    print(f"{args.decisions} decisions over {args.clients} client buckets")
+    report('local', measure(RateLimiter(LocalBucketStore()), args.decisions, args.clients))
+    if args.redis_url:
+        store = RedisBucketStore.from_url(args.redis_url)
+        limiter = RateLimiter(store, prefix='skyquest:rl-bench:')
+        report('redis', measure(limiter, args.decisions, args.clients))
+        for key in store.client.scan_iter(match='skyquest:rl-bench:*', count=500):
+            store.client.delete(key)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,279 @@
+"""
+Concurrent load test for the recommendation APIs.
+
+Starts enhanced_app.py and/or app.py on a local threaded server (or
+targets an already running server with --url), with app.py's NASA store
+filled from a local fake of the API, and drives each scenario at every
+requested concurrency. Throughput, p50/p95/p99 latency and error rates
+(HTTP errors, and 200 answers whose body says ``"status": "error"``) are
+written to a JSON file with stable keys, so results from two commits can
+be diffed, or compared directly with --baseline.
+
+Rate limiting is switched off for in-process runs so the numbers measure
+the handlers rather than the limiter (--keep-rate-limits to leave it on).
+In-process the load generator shares the interpreter (and GIL) with the
+server, so use the numbers for comparisons between commits; for absolute
+figures point --url at a gunicorn deployment.
+Needs the artifacts from train_model.py in the working directory.
+
+Usage (from the API directory):
+    python -m benchmarks.load_test [--app enhanced app] [--concurrency 1 8 32]
+                                   [--requests 500] [--output load_test.json]
+                                   [--baseline previous.json] [--url http://host:port]
+"""
+
+import argparse
+import json
+import logging
+import os
+import platform
+import random
+import statistics
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+from contextlib import ExitStack
+from datetime import datetime, timezone
+
+import requests
+
+from fake_nasa import FakeNasa
+
+EVENT_TYPES = ['meteor shower', 'solar eclipse', 'aurora borealis', 'rocket launch', 'star party']
+LOCATIONS = ['USA', 'Europe', 'Norway', 'Canada', 'Asia']
+TIMES_OF_DAY = ['day', 'night']
+
+
+# Request generators: (rng) -> (method, path, json body or None)
+
+def recommend_request(rng):
+    return 'POST', '/recommend', {
+        'event_type': rng.choice(EVENT_TYPES),
+        'location': rng.choice(LOCATIONS),
+        'time_of_day': rng.choice(TIMES_OF_DAY),
+    }
+
+
+def events_request(rng):
+    query = f"limit={rng.choice([10, 50, 100])}&min_popularity={rng.choice([5, 7, 8, 9])}"
+    if rng.random() < 0.5:
+        query += f"&event_type={rng.choice(EVENT_TYPES)}"
+    return 'GET', f'/events?{query}', None
+
+
+def feedback_request(rng):
+    return 'POST', '/feedback', {
+        'user_preferences': {'event_type': rng.choice(EVENT_TYPES), 'location': rng.choice(LOCATIONS),
+                             'time_of_day': rng.choice(TIMES_OF_DAY)},
+        'recommendations_shown': [],
+        'selected_event': {'event_type': rng.choice(EVENT_TYPES), 'location': rng.choice(LOCATIONS),
+                           'time_of_day': rng.choice(TIMES_OF_DAY), 'duration': 120, 'popularity_score': 8.0},
+        'feedback': rng.choice(['liked', 'disliked']),
+    }
+
+
+def stats_request(rng):
+    return 'GET', '/stats', None
+
+
+SCENARIOS = {
+    'enhanced': {'recommend': recommend_request, 'events': events_request,
+                 'feedback': feedback_request, 'stats': stats_request},
+    # app.py has no /feedback or /stats; its /recommend reads NASA data from the local store
+    'app': {'recommend': recommend_request, 'events': events_request},
+}
+
+
+def start_in_thread(server):
+    thread = threading.Thread(target=server.serve_forever, daemon=True)
+    thread.start()
+    return server
+
+
+def start_app(name, nasa_url, keep_rate_limits, scratch, cleanup):
+    """Import and load one of the apps and serve it on an ephemeral local port"""
+    from werkzeug.serving import make_server
+
+    if name == 'enhanced':
+        import enhanced_app as module
+        if not keep_rate_limits:
+            module.limiter.enabled = False
+        # Drain the feedback segments before the scratch directory goes away
+        cleanup.callback(module.feedback_writer.close)
+    else:
+        import app as module
+        from nasa_client import NasaClient
+        from nasa_ingest import NasaIngester, SpaceEventStore
+        # Handlers read NASA data from the local store, so fill a temporary one from the fake API
+        module.nasa_store = SpaceEventStore(os.path.join(scratch, 'nasa_events.db'))
+        NasaIngester(NasaClient(base_url=nasa_url, rate_limit='1000 per hour'), module.nasa_store,
+                     backfill_days=0).run_once()
+    module.load_model()
+    # Per-request INFO logging would dominate the measurement
+    logging.getLogger().setLevel(logging.WARNING)
+    logging.getLogger('werkzeug').setLevel(logging.WARNING)
+    server = start_in_thread(make_server('127.0.0.1', 0, module.app, threaded=True))
+    return f'http://127.0.0.1:{server.server_port}', server
+
+
+def run(base_url, make_request, concurrency, total, seed):
+    """Send ``total`` requests from ``concurrency`` threads; returns latencies and status counts"""
+    rng = random.Random(seed)
+    work = [make_request(rng) for _ in range(total)]
+    latencies, statuses, lock = [], {}, threading.Lock()
+    position = iter(range(total))
+
+    def worker():
+        session = requests.Session()
+        local_latencies, local_statuses = [], {}
+        while True:
+            with lock:
+                index = next(position, None)
+            if index is None:
+                break
+            method, path, body = work[index]
+            start = time.perf_counter()
+            try:
+                response = session.request(method, base_url + path, json=body, timeout=30)
+            except requests.RequestException:
+                response, status = None, 'connection_error'
+            local_latencies.append(time.perf_counter() - start)
+            if response is not None:
+                status = response.status_code
+                if status < 400 and answered_error(response):
+                    status = f'{status}_error_body'
+            local_statuses[status] = local_statuses.get(status, 0) + 1
+        with lock:
+            latencies.extend(local_latencies)
+            for status, count in local_statuses.items():
+                statuses[status] = statuses.get(status, 0) + count
+
+    threads = [threading.Thread(target=worker) for _ in range(concurrency)]
+    start = time.perf_counter()
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    return latencies, statuses, time.perf_counter() - start
+
+
+def answered_error(response):
+    """Whether a JSON body reports a failure; enhanced_app answers handler errors with a 200"""
+    if not response.headers.get('Content-Type', '').startswith('application/json'):
+        return False
+    try:
+        body = response.json()
+    except ValueError:
+        return False
+    return isinstance(body, dict) and body.get('status') == 'error'
+
+
+def summarize(latencies, statuses, elapsed):
+    ordered = sorted(latencies)
+    quantile = lambda q: ordered[min(len(ordered) - 1, int(q * len(ordered)))] * 1000
+    errors = sum(count for status, count in statuses.items()
+                 if not isinstance(status, int) or status >= 400)
+    return {
+        'requests': len(latencies),
+        'throughput_rps': round(len(latencies) / elapsed, 1),
+        'mean_ms': round(statistics.fmean(latencies) * 1000, 3),
+        'p50_ms': round(quantile(0.50), 3),
+        'p95_ms': round(quantile(0.95), 3),
+        'p99_ms': round(quantile(0.99), 3),
+        'error_rate': round(errors / len(latencies), 4),
+        'status_counts': {str(status): count for status, count in sorted(statuses.items(), key=str)},
+    }
+
+
+def git_commit():
+    try:
+        return subprocess.run(['git', 'rev-parse', '--short', 'HEAD'], capture_output=True,
+                              text=True, check=True).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def compare(results, baseline):
+    """Print throughput and p99 changes against an earlier results file"""
+    print(f"\nAgainst {baseline['meta'].get('commit') or 'baseline'}:")
+    for app_name, scenarios in results['results'].items():
+        for scenario, by_concurrency in scenarios.items():
+            for concurrency, current in by_concurrency.items():
+                previous = baseline['results'].get(app_name, {}).get(scenario, {}).get(concurrency)
+                if previous is None:
+                    continue
+                rps = (current['throughput_rps'] / previous['throughput_rps'] - 1) * 100
+                p99 = (current['p99_ms'] / previous['p99_ms'] - 1) * 100
+                print(f"  {app_name:9} {scenario:10} c={concurrency:>3}   throughput {rps:+6.1f}%   p99 {p99:+6.1f}%"
+                      f"   errors {previous['error_rate']:.2%} -> {current['error_rate']:.2%}")
+
+
+def measure(args, scratch, cleanup):
+    """Run every scenario, write the results file and compare it with the baseline"""
+    nasa_url = FakeNasa(delay=args.nasa_delay).start().url
+
+    results = {
+        'meta': {
+            'commit': git_commit(),
+            'timestamp': datetime.now(timezone.utc).isoformat(),
+            'python': platform.python_version(),
+            'requests_per_run': args.requests,
+            'mode': 'external' if args.url else 'in-process',
+            'rate_limits': args.keep_rate_limits or bool(args.url),
+        },
+        'results': {},
+    }
+    for app_name in args.app:
+        base_url = args.url.rstrip('/') if args.url else start_app(app_name, nasa_url, args.keep_rate_limits,
+                                                                             scratch, cleanup)[0]
+        scenarios = {name: func for name, func in SCENARIOS[app_name].items()
+                     if not args.scenarios or name in args.scenarios}
+        for scenario, make_request in scenarios.items():
+            run(base_url, make_request, 1, args.warmup, args.seed)
+            for concurrency in args.concurrency:
+                summary = summarize(*run(base_url, make_request, concurrency, args.requests, args.seed))
+                results['results'].setdefault(app_name, {}).setdefault(scenario, {})[str(concurrency)] = summary
+                print(f"{app_name:9} {scenario:10} c={concurrency:>3}   {summary['throughput_rps']:8.1f} req/s   "
+                      f"p50 {summary['p50_ms']:8.2f} ms   p95 {summary['p95_ms']:8.2f} ms   "
+                      f"p99 {summary['p99_ms']:8.2f} ms   errors {summary['error_rate']:.2%}")
+
+    with open(args.output, 'w', encoding='utf-8') as f:
+        json.dump(results, f, indent=2, sort_keys=True)
+        f.write('\n')
+    print(f"\nWrote {args.output}")
+
+    if args.baseline:
+        with open(args.baseline, encoding='utf-8') as f:
+            compare(results, json.load(f))
+    return 0
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--app', nargs='+', choices=sorted(SCENARIOS), default=['enhanced', 'app'])
+    parser.add_argument('--scenarios', nargs='+', help="subset of recommend/events/feedback/stats")
+    parser.add_argument('--concurrency', type=int, nargs='+', default=[1, 8, 32])
+    parser.add_argument('--requests', type=int, default=500, help="requests per scenario and concurrency")
+    parser.add_argument('--warmup', type=int, default=20)
+    parser.add_argument('--seed', type=int, default=42)
+    parser.add_argument('--nasa-delay', type=float, default=0.0, help="seconds the fake NASA API waits per call")
+    parser.add_argument('--url', help="target a running server instead (only valid with a single --app)")
+    parser.add_argument('--keep-rate-limits', action='store_true')
+    parser.add_argument('--output', default='load_test.json')
+    parser.add_argument('--baseline', help="earlier results file to compare against")
+    args = parser.parse_args()
+    if args.url and len(args.app) != 1:
+        parser.error("--url needs exactly one --app")
+
+    with ExitStack() as cleanup:
+        # Keep feedback segments and the NASA store out of the working tree
+        scratch = cleanup.enter_context(tempfile.TemporaryDirectory(prefix='load-test-'))
+        os.environ.setdefault('FEEDBACK_DIR', os.path.join(scratch, 'feedback'))
+        os.environ.setdefault('SECRET_KEY', 'load-test')
+        return measure(args, scratch, cleanup)
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,28 @@
+"""
+Microbenchmarks for the per-row code in process_planets.py
+"""
+
+import process_planets
+from conftest import synthetic_planets
+
+
+def test_compute_similarity_apply(measure, rows):
+    df = synthetic_planets(rows)
+    measure(lambda frame: frame.apply(process_planets.compute_similarity, axis=1), df, rows=rows)
+
+
+def test_temp_class_apply(measure, rows):
+    df = synthetic_planets(rows)
+    measure(lambda teq: teq.apply(process_planets.temp_class), df['pl_eqt'], rows=rows)
+
+
+def test_build_enriched(measure, rows):
+    # The set_index(...).to_dict() per output column, plus the top-10 selection
+    df = synthetic_planets(rows).assign(cluster=0, similarity=0.5, temp_class='Warm')
+    measure(process_planets.build_enriched, df, rows=rows)
+
+
+def test_enrich_planets(measure, rows):
+    # Steps 2-7 of the script: everything but the OpenAI explanations
+    df = synthetic_planets(rows)
+    measure(lambda frame: process_planets.enrich_planets(frame.copy()), df, rows=rows)
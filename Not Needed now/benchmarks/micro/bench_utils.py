@@ -0,0 +1,25 @@
+"""
+Microbenchmarks for the per-request helpers in utils.py
+"""
+
+from conftest import synthetic_events, synthetic_preferences
+from utils import enrich_event_data, rank_recommendations, validate_and_clean_preferences
+
+PREFERENCES = {'event_type': 'meteor shower', 'location': 'USA', 'time_of_day': 'night', 'duration': 120}
+
+
+def test_enrich_event_data(measure, rows):
+    events = synthetic_events(rows)
+    measure(lambda batch: [enrich_event_data(event) for event in batch], events, rows=rows)
+
+
+def test_rank_recommendations(measure, rows):
+    events = synthetic_events(rows)
+    # rank_recommendations annotates its input, so give every round fresh dicts
+    measure(lambda batch: rank_recommendations([dict(event) for event in batch], PREFERENCES, limit=10),
+            events, rows=rows)
+
+
+def test_validate_and_clean_preferences(measure, rows):
+    preferences = synthetic_preferences(rows)
+    measure(lambda batch: [validate_and_clean_preferences(prefs) for prefs in batch], preferences, rows=rows)
@@ -0,0 +1,147 @@
+"""
+Shared fixtures for the microbenchmarks: fixed synthetic datasets and a
+``measure`` fixture that times a function with pytest-benchmark and records
+its peak memory (tracemalloc) next to the timings.
+
+Memory regressions are checked against a saved baseline:
+    --memory-save PATH        write every benchmark's peak memory to PATH
+    --memory-baseline PATH    fail a benchmark whose peak grew more than
+                              --memory-threshold (default 0.2 = 20%)
+"""
+
+import json
+import os
+import sys
+import tracemalloc
+
+import numpy as np
+import pandas as pd
+import pytest
+
+API_DIR = os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+REPO_DIR = os.path.dirname(API_DIR)
+for path in (API_DIR, REPO_DIR):
+    if path not in sys.path:
+        sys.path.insert(0, path)
+
+SIZES = [1_000, 10_000, 100_000, 1_000_000]
+SEED = 1234
+MEMORY_SLACK_MB = 0.25  # below this a peak-memory change is noise, whatever the percentage
+
+EVENT_TYPES = ['meteor shower', 'solar eclipse', 'lunar eclipse', 'aurora borealis',
+               'rocket launch', 'star party', 'comet viewing', 'planetary conjunction']
+LOCATIONS = ['USA', 'Europe', 'Asia', 'Canada', 'Norway', 'Iceland', 'Australia', 'India']
+TIMES_OF_DAY = ['day', 'night']
+
+_peaks = {}
+
+
+def pytest_addoption(parser):
+    parser.addoption('--max-rows', type=int, default=100_000,
+                     help="skip datasets larger than this (1000000 to include the 1M-row runs)")
+    parser.addoption('--memory-baseline', help="peak-memory JSON from an earlier --memory-save")
+    parser.addoption('--memory-save', help="write peak memory per benchmark to this JSON file")
+    parser.addoption('--memory-threshold', type=float, default=0.2)
+
+
+def pytest_generate_tests(metafunc):
+    if 'rows' in metafunc.fixturenames:
+        max_rows = metafunc.config.getoption('--max-rows')
+        metafunc.parametrize('rows', [
+            pytest.param(n, id=f'{n // 1000}k' if n < 1_000_000 else f'{n // 1_000_000}M',
+                         marks=pytest.mark.skipif(n > max_rows, reason=f"--max-rows {max_rows}"))
+            for n in SIZES
+        ])
+
+
+def pytest_sessionfinish(session):
+    path = session.config.getoption('--memory-save')
+    if path and _peaks:
+        with open(path, 'w', encoding='utf-8') as f:
+            json.dump(_peaks, f, indent=2, sort_keys=True)
+
+
+_cache = {}
+
+
+def _cached(key, build):
+    if key not in _cache:
+        _cache[key] = build()
+    return _cache[key]
+
+
+def synthetic_planets(rows):
+    """Planets after load_planets(): the six features present, log-normal like the archive"""
+    def build():
+        rng = np.random.default_rng(SEED)
+        return pd.DataFrame({
+            'pl_name': [f'SYN-{i} b' for i in range(rows)],
+            'pl_rade': rng.lognormal(1.0, 0.8, rows),
+            'pl_bmasse': rng.lognormal(3.0, 1.8, rows),
+            'pl_eqt': rng.lognormal(6.7, 0.5, rows),
+            'st_teff': rng.normal(5400, 900, rows).clip(2500, 10000),
+            'st_rad': rng.lognormal(0.0, 0.4, rows),
+            'st_mass': rng.lognormal(-0.05, 0.25, rows),
+        })
+    return _cached(('planets', rows), build)
+
+
+def synthetic_events(rows):
+    """Recommendation candidates shaped like GridScorer rows"""
+    def build():
+        rng = np.random.default_rng(SEED)
+        return [
+            {'event_type': EVENT_TYPES[t], 'location': LOCATIONS[l], 'time_of_day': TIMES_OF_DAY[d],
+             'duration': int(duration), 'popularity_score': float(popularity),
+             'predicted_like': 1, 'like_probability': float(probability)}
+            for t, l, d, duration, popularity, probability in zip(
+                rng.integers(0, len(EVENT_TYPES), rows), rng.integers(0, len(LOCATIONS), rows),
+                rng.integers(0, 2, rows), rng.choice([60, 120, 180, 240, 300], rows),
+                rng.uniform(5, 10, rows).round(1), rng.random(rows))
+        ]
+    return _cached(('events', rows), build)
+
+
+def synthetic_preferences(rows):
+    """Raw request bodies, a few percent of them invalid"""
+    def build():
+        rng = np.random.default_rng(SEED)
+        preferences = []
+        for i in range(rows):
+            prefs = {'event_type': f' {EVENT_TYPES[i % len(EVENT_TYPES)].title()} ',
+                     'location': LOCATIONS[i % len(LOCATIONS)],
+                     'time_of_day': TIMES_OF_DAY[i % 2].upper(),
+                     'min_popularity': str(rng.integers(0, 12)),
+                     'max_duration': int(rng.integers(-10, 300))}
+            if rng.random() < 0.03:
+                del prefs['location']
+            preferences.append(prefs)
+        return preferences
+    return _cached(('preferences', rows), build)
+
+
+@pytest.fixture
+def measure(benchmark, request):
+    """``measure(func, *args, rows=n)``: time ``func(*args)`` and record its peak memory"""
+    def run(func, *args, rows):
+        # Fewer rounds for the big datasets so the suite stays within minutes
+        rounds = max(1, min(10, 20_000 // rows))
+        result = benchmark.pedantic(func, args=args, rounds=rounds, warmup_rounds=1 if rounds > 1 else 0)
+
+        # Traced separately: tracemalloc slows the code it watches
+        tracemalloc.start()
+        func(*args)
+        peak_mb = tracemalloc.get_traced_memory()[1] / 2 ** 20
+        tracemalloc.stop()
+        benchmark.extra_info['peak_memory_mb'] = round(peak_mb, 3)
+        _peaks[request.node.nodeid] = peak_mb
+
+        baseline_path = request.config.getoption('--memory-baseline')
+        if baseline_path:
+            with open(baseline_path, encoding='utf-8') as f:
+                baseline = json.load(f).get(request.node.nodeid)
+            threshold = request.config.getoption('--memory-threshold')
+            if baseline and peak_mb > baseline * (1 + threshold) and peak_mb - baseline > MEMORY_SLACK_MB:
+                pytest.fail(f"peak memory {peak_mb:.2f} MB is over {threshold:.0%} above baseline {baseline:.2f} MB")
+        return result
+    return run
@@ -0,0 +1,235 @@
+"""
+Synthetic planet catalogs, event tables and feedback logs for capacity tests.
+
+data/planet_cleaned.csv holds about 5,900 planets and events.csv 40 events,
+which is too small to show how the pipeline and the API behave at 10x or
+100x. This fits a Gaussian copula to a real table and samples any number
+of rows from it:
+
+  marginals     numeric columns are drawn from their empirical quantiles
+                (interpolated when continuous, observed values only when
+                discrete); categorical columns follow their frequencies
+  correlations  the copula keeps the rank correlations between columns
+  NaN patterns  each row takes a missing-value mask drawn from the masks in
+                the source, so columns that are missing together still are
+
+Identifier columns (pl_name, hostname, rastr, decstr) are generated, not
+sampled. Output is written chunk by chunk, so memory use does not grow with
+the row count. The same seed and chunk size always give the same files.
+Needs scipy (``pip install scipy``; scikit-learn depends on it).
+
+Usage (from the API directory):
+    python -m benchmarks.synthetic planets --rows 1000000 --out synthetic/planet_cleaned.csv
+    python -m benchmarks.synthetic events --rows 100000 --out synthetic/events.csv
+    python -m benchmarks.synthetic feedback --rows 1000000 --out synthetic/feedback
+"""
+
+import argparse
+import json
+import os
+import time
+from datetime import datetime, timedelta
+from typing import Callable, Iterator, Optional
+
+import numpy as np
+import pandas as pd
+from scipy.special import ndtr, ndtri
+
+API_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+PLANETS_PATH = os.path.join(os.path.dirname(API_DIR), 'data', 'planet_cleaned.csv')
+EVENTS_PATH = os.path.join(API_DIR, 'events.csv')
+
+SEED = 2024
+CHUNK_SIZE = 100_000
+DISCRETE_MAX = 50  # numeric columns with this many distinct values or fewer only take observed values
+PLANET_IDENTIFIERS = ['pl_name', 'hostname', 'rastr', 'decstr']
+FEEDBACK_START = datetime(2025, 1, 1)
+
+
+class CopulaModel:
+    """A Gaussian copula fitted to the columns of one DataFrame"""
+
+    def __init__(self, df: pd.DataFrame, skip=()):
+        self.columns = list(df.columns)
+        self.dtypes = df.dtypes
+        self.modelled = [column for column in self.columns if column not in skip]
+        self.marginals = {}
+        scores = {}
+        for column in self.modelled:
+            observed = df[column].dropna()
+            if pd.api.types.is_numeric_dtype(observed):
+                values = np.sort(observed.to_numpy(dtype=float))
+                discrete = pd.api.types.is_integer_dtype(observed) or observed.nunique() <= DISCRETE_MAX
+                self.marginals[column] = ('discrete' if discrete else 'continuous', values)
+                ranked = observed
+            else:
+                # Categories ordered by frequency, so the codes carry the dependence on other columns
+                counts = observed.value_counts()
+                self.marginals[column] = ('categorical', (counts.index.to_numpy(dtype=object),
+                                                          np.cumsum(counts.to_numpy()) / counts.sum()))
+                ranked = observed.map({category: code for code, category in enumerate(counts.index)})
+            # Normal scores of the ranks; the copula correlation is their correlation
+            scores[column] = pd.Series(ndtri(ranked.rank().to_numpy() / (len(ranked) + 1)), index=ranked.index)
+
+        # Pairwise over the rows where both columns are present; constant columns correlate with nothing
+        correlation = pd.DataFrame(scores, index=df.index).corr(min_periods=3).fillna(0.0).to_numpy(copy=True)
+        np.fill_diagonal(correlation, 1.0)
+        self.cholesky = np.linalg.cholesky(_nearest_correlation(correlation))
+
+        masks = df[self.modelled].isna()
+        patterns = masks.value_counts(normalize=True, sort=False)
+        self.masks = np.array(patterns.index.tolist(), dtype=bool).reshape(len(patterns), len(self.modelled))
+        self.mask_weights = patterns.to_numpy()
+
+    @classmethod
+    def from_csv(cls, path: str, skip=()) -> 'CopulaModel':
+        return cls(pd.read_csv(path), skip=skip)
+
+    def sample_chunk(self, rng: np.random.Generator, rows: int) -> pd.DataFrame:
+        """``rows`` synthetic rows of the modelled columns"""
+        uniform = ndtr(rng.standard_normal((rows, len(self.modelled))) @ self.cholesky.T)
+        missing = self.masks[rng.choice(len(self.masks), size=rows, p=self.mask_weights)]
+        data = {}
+        for i, column in enumerate(self.modelled):
+            kind, marginal = self.marginals[column]
+            u = uniform[:, i]
+            if kind == 'categorical':
+                categories, cumulative = marginal
+                values = categories[np.minimum(np.searchsorted(cumulative, u, side='right'), len(categories) - 1)]
+            elif len(marginal) == 0:
+                values = np.full(rows, np.nan)
+            elif kind == 'discrete':
+                values = marginal[np.minimum((u * len(marginal)).astype(np.int64), len(marginal) - 1)]
+            else:
+                values = np.interp(u * (len(marginal) - 1), np.arange(len(marginal)), marginal)
+
+            column_missing = missing[:, i]
+            if column_missing.any():
+                values = values.astype(object if kind == 'categorical' else float)
+                values[column_missing] = None if kind == 'categorical' else np.nan
+            elif pd.api.types.is_integer_dtype(self.dtypes[column]):
+                values = values.astype(self.dtypes[column])
+            data[column] = values
+        return pd.DataFrame(data)
+
+    def chunks(self, rows: int, seed: int = SEED, chunk_size: int = CHUNK_SIZE) -> Iterator[pd.DataFrame]:
+        """``rows`` synthetic rows in chunks; each chunk has its own generator derived from ``seed``"""
+        for index, start in enumerate(range(0, rows, chunk_size)):
+            rng = np.random.default_rng([seed, index])
+            chunk = self.sample_chunk(rng, min(chunk_size, rows - start))
+            chunk.index = pd.RangeIndex(start, start + len(chunk))
+            yield chunk
+
+    def sample(self, rows: int, seed: int = SEED, chunk_size: int = CHUNK_SIZE) -> pd.DataFrame:
+        return pd.concat(list(self.chunks(rows, seed, chunk_size)))
+
+
+def _nearest_correlation(matrix: np.ndarray) -> np.ndarray:
+    """Pairwise correlations need not be positive definite; clip the eigenvalues and rescale"""
+    eigenvalues, eigenvectors = np.linalg.eigh(matrix)
+    fixed = eigenvectors @ np.diag(np.clip(eigenvalues, 1e-6, None)) @ eigenvectors.T
+    scale = np.sqrt(np.diag(fixed))
+    return fixed / np.outer(scale, scale)
+
+
+def _sexagesimal(values: np.ndarray, unit: str, signed: bool) -> list:
+    # The archive's rastr/decstr format: 12h20m42.91s and +17d47m35.71s
+    result = []
+    for value in values:
+        sign = '-' if value < 0 else '+'
+        value = abs(value)
+        whole = int(value)
+        minutes = int((value - whole) * 60)
+        seconds = ((value - whole) * 60 - minutes) * 60
+        result.append(f"{sign if signed else ''}{whole:02d}{unit}{minutes:02d}m{seconds:05.2f}s")
+    return result
+
+
+def planet_identifiers(chunk: pd.DataFrame) -> pd.DataFrame:
+    """Fill in the identifier columns, unique across chunks since they come from the row index"""
+    hosts = [f"SYN-{i:07d}" for i in chunk.index]
+    chunk['hostname'] = hosts
+    chunk['pl_name'] = [f"{host} b" for host in hosts]
+    chunk['rastr'] = _sexagesimal(chunk['ra'].to_numpy() / 15, 'h', signed=False)
+    chunk['decstr'] = _sexagesimal(chunk['dec'].to_numpy(), 'd', signed=True)
+    return chunk
+
+
+def write_csv(model: CopulaModel, rows: int, path: str, seed: int = SEED, chunk_size: int = CHUNK_SIZE,
+              finish: Optional[Callable[[pd.DataFrame], pd.DataFrame]] = None) -> int:
+    """Stream ``rows`` synthetic rows to ``path`` in the source's column order; returns rows written"""
+    os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+    written = 0
+    with open(path, 'w', encoding='utf-8', newline='') as f:
+        for chunk in model.chunks(rows, seed, chunk_size):
+            if finish is not None:
+                chunk = finish(chunk)
+            chunk[model.columns].to_csv(f, header=written == 0, index=False)
+            written += len(chunk)
+    return written
+
+
+def generate_planets(rows: int, path: str, seed: int = SEED, chunk_size: int = CHUNK_SIZE,
+                     source: str = PLANETS_PATH) -> int:
+    """A synthetic planet_cleaned.csv with ``rows`` planets"""
+    model = CopulaModel.from_csv(source, skip=PLANET_IDENTIFIERS)
+    return write_csv(model, rows, path, seed, chunk_size, finish=planet_identifiers)
+
+
+def generate_events(rows: int, path: str, seed: int = SEED, chunk_size: int = CHUNK_SIZE,
+                    source: str = EVENTS_PATH) -> int:
+    """A synthetic events.csv with ``rows`` events"""
+    return write_csv(CopulaModel.from_csv(source), rows, path, seed, chunk_size)
+
+
+def feedback_records(events: pd.DataFrame, rng: np.random.Generator) -> Iterator[dict]:
+    """Feedback records shaped like the ones /feedback writes, one per sampled event"""
+    shown = rng.integers(1, 11, len(events))
+    jitter = rng.uniform(0, 1, len(events))
+    sessions = rng.integers(0, 2 ** 32, len(events))
+    for i, event in enumerate(events.to_dict('records')):
+        liked = event.pop('liked')
+        yield {
+            "timestamp": (FEEDBACK_START + timedelta(seconds=int(events.index[i]) + jitter[i])).isoformat(),
+            "user_preferences": {key: str(event[key]).title() for key in ('event_type', 'location', 'time_of_day')},
+            "recommendations_shown": int(shown[i]),
+            "selected_event": event,
+            "feedback": 'liked' if liked == 1 else 'disliked',
+            "session_id": f"{sessions[i]:08x}"
+        }
+
+
+def generate_feedback(rows: int, directory: str, seed: int = SEED, segment_rows: int = CHUNK_SIZE,
+                      source: str = EVENTS_PATH) -> int:
+    """``rows`` feedback records as segment files that read_feedback and retrain.py pick up"""
+    model = CopulaModel.from_csv(source)
+    os.makedirs(directory, exist_ok=True)
+    written = 0
+    for index, events in enumerate(model.chunks(rows, seed, segment_rows)):
+        rng = np.random.default_rng([seed, index, 1])
+        path = os.path.join(directory, f"feedback-synthetic-{index:05d}.jsonl")
+        with open(path, 'w', encoding='utf-8') as f:
+            f.writelines(json.dumps(record, default=str) + '\n' for record in feedback_records(events, rng))
+        written += len(events)
+    return written
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('kind', choices=['planets', 'events', 'feedback'])
+    parser.add_argument('--rows', type=int, required=True)
+    parser.add_argument('--out', required=True, help="CSV path, or a directory for feedback segments")
+    parser.add_argument('--seed', type=int, default=SEED)
+    parser.add_argument('--chunk-size', type=int, default=CHUNK_SIZE)
+    parser.add_argument('--source', help="table to fit (default: data/planet_cleaned.csv or events.csv)")
+    args = parser.parse_args()
+
+    generate = {'planets': generate_planets, 'events': generate_events, 'feedback': generate_feedback}[args.kind]
+    source = {'source': args.source} if args.source else {}
+    start = time.perf_counter()
+    written = generate(args.rows, args.out, args.seed, args.chunk_size, **source)
+    print(f"{written:,} synthetic {args.kind} rows written to {args.out} in {time.perf_counter() - start:.1f} s")
+
+
+if __name__ == '__main__':
+    main()
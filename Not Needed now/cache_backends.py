@@ -0,0 +1,329 @@
+"""
+Pluggable cache backends.
+
+utils.Cache is the in-process LRU backend. With several gunicorn workers
+each one has its own copy, so this module adds a Redis backend that all
+workers share and a two-tier backend that keeps a small in-process L1 in
+front of it. FakeRedis implements the handful of redis-py calls used here,
+for tests and for running without a Redis server.
+"""
+
+import fnmatch
+import logging
+import math
+import pickle
+import threading
+import time
+import zlib
+from typing import Any, Dict, Iterable, List, Optional
+
+try:
+    import redis
+except ImportError:  # redis is only needed when CACHE_TYPE = 'redis'
+    redis = None
+
+logger = logging.getLogger(__name__)
+
+# First byte of every stored value says how the rest is encoded
+_RAW = b'p'
+_COMPRESSED = b'z'
+
+
+class CacheBackend:
+    """Interface shared by every cache backend"""
+
+    def get(self, key: str) -> Optional[Any]:
+        raise NotImplementedError
+
+    def get_many(self, keys: Iterable[str]) -> Dict[str, Any]:
+        """Values for the keys that are present; missing keys are left out"""
+        found = {}
+        for key in keys:
+            value = self.get(key)
+            if value is not None:
+                found[key] = value
+        return found
+
+    def set(self, key: str, value: Any, timeout: Optional[int] = None) -> None:
+        raise NotImplementedError
+
+    def delete(self, key: str) -> None:
+        raise NotImplementedError
+
+    def clear(self) -> None:
+        raise NotImplementedError
+
+    def clear_local(self) -> None:
+        """Drop whatever this process holds, leaving any shared tier alone"""
+        self.clear()
+
+    def size(self) -> int:
+        raise NotImplementedError
+
+    def stats(self) -> Dict:
+        raise NotImplementedError
+
+
+class RedisCache(CacheBackend):
+    """Cache shared by every worker, stored in Redis as (optionally zlib-compressed) pickles"""
+
+    def __init__(self, client, prefix: str = 'skyquest:', default_timeout: int = 300,
+                 compress_min_bytes: int = 1024):
+        self.client = client
+        self.prefix = prefix
+        self.default_timeout = default_timeout
+        self.compress_min_bytes = compress_min_bytes
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.errors = 0
+
+    @classmethod
+    def from_url(cls, url: str, **kwargs) -> 'RedisCache':
+        if redis is None:
+            raise RuntimeError("The redis package is required for CACHE_TYPE = 'redis'")
+        return cls(redis.Redis.from_url(url, socket_timeout=0.5), **kwargs)
+
+    def _dumps(self, value: Any) -> bytes:
+        data = pickle.dumps(value, protocol=pickle.HIGHEST_PROTOCOL)
+        if len(data) >= self.compress_min_bytes:
+            return _COMPRESSED + zlib.compress(data, 1)
+        return _RAW + data
+
+    @staticmethod
+    def _loads(data: bytes) -> Any:
+        if data[:1] == _COMPRESSED:
+            return pickle.loads(zlib.decompress(data[1:]))
+        return pickle.loads(data[1:])
+
+    def _count(self, hits: int, misses: int) -> None:
+        with self._lock:
+            self.hits += hits
+            self.misses += misses
+
+    def get(self, key: str) -> Optional[Any]:
+        return self.get_many([key]).get(key)
+
+    def get_many(self, keys: Iterable[str]) -> Dict[str, Any]:
+        """Fetch several keys in a single MGET round trip"""
+        keys = list(keys)
+        if not keys:
+            return {}
+        try:
+            raw_values = self.client.mget([self.prefix + key for key in keys])
+        except Exception as e:
+            # A cache outage should look like a miss, not an error
+            logger.warning(f"Redis get failed: {e}")
+            self.errors += 1
+            self._count(0, len(keys))
+            return {}
+
+        found = {key: self._loads(raw) for key, raw in zip(keys, raw_values) if raw is not None}
+        self._count(len(found), len(keys) - len(found))
+        return found
+
+    def set(self, key: str, value: Any, timeout: Optional[int] = None) -> None:
+        self.set_many({key: value}, timeout)
+
+    def set_many(self, mapping: Dict[str, Any], timeout: Optional[int] = None) -> None:
+        """Store several values in one pipelined round trip"""
+        if timeout is None:
+            timeout = self.default_timeout
+        expire = max(1, math.ceil(timeout)) if timeout else None
+        try:
+            pipe = self.client.pipeline(transaction=False)
+            for key, value in mapping.items():
+                pipe.set(self.prefix + key, self._dumps(value), ex=expire)
+            pipe.execute()
+        except Exception as e:
+            logger.warning(f"Redis set failed: {e}")
+            self.errors += 1
+
+    def delete(self, key: str) -> None:
+        try:
+            self.client.delete(self.prefix + key)
+        except Exception as e:
+            logger.warning(f"Redis delete failed: {e}")
+            self.errors += 1
+
+    def clear(self) -> None:
+        """Delete every key under this cache's prefix"""
+        try:
+            pipe = self.client.pipeline(transaction=False)
+            for key in self.client.scan_iter(match=self.prefix + '*', count=500):
+                pipe.delete(key)
+            pipe.execute()
+        except Exception as e:
+            logger.warning(f"Redis clear failed: {e}")
+            self.errors += 1
+
+    def clear_local(self) -> None:
+        pass
+
+    def size(self) -> int:
+        """Keys in the Redis database (O(1); includes keys outside our prefix)"""
+        try:
+            return self.client.dbsize()
+        except Exception:
+            return 0
+
+    def stats(self) -> Dict:
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                "backend": "redis",
+                "entries": self.size(),
+                "hits": self.hits,
+                "misses": self.misses,
+                "hit_rate": round(self.hits / lookups, 4) if lookups else 0.0,
+                "errors": self.errors
+            }
+
+
+class TieredCache(CacheBackend):
+    """Small per-process L1 in front of a shared L2.
+
+    Entries are kept in L1 for at most ``l1_timeout`` seconds, which bounds
+    how stale one worker can be after another worker overwrites a key.
+    """
+
+    def __init__(self, l1: CacheBackend, l2: CacheBackend, l1_timeout: int = 30):
+        self.l1 = l1
+        self.l2 = l2
+        self.l1_timeout = l1_timeout
+
+    def _l1_timeout(self, timeout: Optional[int]) -> int:
+        if not timeout:
+            return self.l1_timeout
+        return min(timeout, self.l1_timeout)
+
+    def get(self, key: str) -> Optional[Any]:
+        value = self.l1.get(key)
+        if value is not None:
+            return value
+        value = self.l2.get(key)
+        if value is not None:
+            self.l1.set(key, value, timeout=self.l1_timeout)
+        return value
+
+    def get_many(self, keys: Iterable[str]) -> Dict[str, Any]:
+        keys = list(keys)
+        found = self.l1.get_many(keys)
+        missing = [key for key in keys if key not in found]
+        if missing:
+            from_l2 = self.l2.get_many(missing)
+            for key, value in from_l2.items():
+                self.l1.set(key, value, timeout=self.l1_timeout)
+            found.update(from_l2)
+        return found
+
+    def set(self, key: str, value: Any, timeout: Optional[int] = None) -> None:
+        self.l2.set(key, value, timeout=timeout)
+        self.l1.set(key, value, timeout=self._l1_timeout(timeout))
+
+    def delete(self, key: str) -> None:
+        self.l2.delete(key)
+        self.l1.delete(key)
+
+    def clear(self) -> None:
+        self.l2.clear()
+        self.l1.clear()
+
+    def clear_local(self) -> None:
+        self.l1.clear()
+
+    def size(self) -> int:
+        return self.l2.size()
+
+    def stats(self) -> Dict:
+        l1 = self.l1.stats()
+        l2 = self.l2.stats()
+        # Every lookup goes to L1 first; only L1 misses reach L2
+        lookups = l1["hits"] + l1["misses"]
+        hits = l1["hits"] + l2["hits"]
+        return {
+            "backend": "tiered",
+            "entries": l2["entries"],
+            "hits": hits,
+            "misses": lookups - hits,
+            "hit_rate": round(hits / lookups, 4) if lookups else 0.0,
+            "l1": l1,
+            "l2": l2
+        }
+
+
+class FakeRedis:
+    """In-memory stand-in for the subset of redis.Redis used by RedisCache"""
+
+    def __init__(self):
+        self._data = {}
+        self._expires = {}
+        self._lock = threading.Lock()
+
+    def _alive(self, key) -> bool:
+        expires_at = self._expires.get(key)
+        if expires_at is not None and time.time() >= expires_at:
+            self._data.pop(key, None)
+            self._expires.pop(key, None)
+        return key in self._data
+
+    def ping(self) -> bool:
+        return True
+
+    def get(self, key):
+        with self._lock:
+            return self._data.get(key) if self._alive(key) else None
+
+    def mget(self, keys: List):
+        with self._lock:
+            return [self._data.get(key) if self._alive(key) else None for key in keys]
+
+    def set(self, key, value, ex=None):
+        with self._lock:
+            self._data[key] = value
+            if ex:
+                self._expires[key] = time.time() + ex
+            else:
+                self._expires.pop(key, None)
+        return True
+
+    def delete(self, *keys) -> int:
+        with self._lock:
+            removed = 0
+            for key in keys:
+                removed += self._data.pop(key, None) is not None
+                self._expires.pop(key, None)
+            return removed
+
+    def dbsize(self) -> int:
+        with self._lock:
+            return sum(1 for key in list(self._data) if self._alive(key))
+
+    def scan_iter(self, match: str = '*', count: Optional[int] = None):
+        with self._lock:
+            keys = [key for key in self._data if self._alive(key)]
+        return iter([key for key in keys if fnmatch.fnmatchcase(key, match)])
+
+    def pipeline(self, transaction: bool = True) -> '_FakePipeline':
+        return _FakePipeline(self)
+
+
+class _FakePipeline:
+    """Queues FakeRedis calls until execute(), like a redis-py pipeline"""
+
+    def __init__(self, client: FakeRedis):
+        self._client = client
+        self._calls = []
+
+    def __getattr__(self, name):
+        method = getattr(self._client, name)
+
+        def queue(*args, **kwargs):
+            self._calls.append((method, args, kwargs))
+            return self
+        return queue
+
+    def execute(self) -> List:
+        results = [method(*args, **kwargs) for method, args, kwargs in self._calls]
+        self._calls = []
+        return results
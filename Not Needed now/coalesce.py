@@ -0,0 +1,118 @@
+"""
+In-flight request coalescing.
+
+During an event the same preference combination ("meteor shower / USA /
+night") arrives many times a second, and every request used to validate,
+score and call NASA on its own. A Coalescer runs one computation per key
+at a time: callers that arrive while it is running wait for it and share
+its result, and the result is then kept for ``ttl`` seconds so the next
+burst is served without recomputing. Errors are shared with the waiting
+callers but never cached.
+
+Coalescing works between threads of one process (gunicorn --threads, or
+the threaded dev server); the short-lived results also help sync workers.
+"""
+
+import threading
+import time
+from collections import OrderedDict
+from typing import Any, Callable, Dict, Hashable, Tuple
+
+COMPUTED = 'computed'
+COALESCED = 'coalesced'
+CACHED = 'cached'
+
+
+class _Call:
+    """One running computation and the callers waiting on it"""
+
+    __slots__ = ('done', 'result', 'error')
+
+    def __init__(self):
+        self.done = threading.Event()
+        self.result = None
+        self.error = None
+
+
+class Coalescer:
+    """Shares one computation per key among concurrent callers and keeps its result briefly"""
+
+    def __init__(self, ttl: float = 2.0, max_entries: int = 1024, wait_timeout: float = 30.0,
+                 clock: Callable[[], float] = time.monotonic):
+        self.ttl = ttl
+        self.max_entries = max_entries
+        self.wait_timeout = wait_timeout
+        self._clock = clock
+        self._lock = threading.Lock()
+        self._in_flight = {}
+        self._results = OrderedDict()  # key -> (expires_at, result)
+        self.computed = 0
+        self.coalesced = 0
+        self.cached = 0
+        self.errors = 0
+
+    def get_or_compute(self, key: Hashable, compute: Callable[[], Any]) -> Tuple[Any, str]:
+        """``compute()``'s result for ``key`` and how it was obtained: computed, coalesced or cached.
+
+        The result is shared between callers, so treat it as read-only.
+        """
+        with self._lock:
+            entry = self._results.get(key)
+            if entry is not None:
+                if entry[0] > self._clock():
+                    self.cached += 1
+                    return entry[1], CACHED
+                del self._results[key]
+            call = self._in_flight.get(key)
+            leader = call is None
+            if leader:
+                call = self._in_flight[key] = _Call()
+                self.computed += 1
+            else:
+                self.coalesced += 1
+
+        if not leader:
+            if call.done.wait(self.wait_timeout):
+                if call.error is not None:
+                    raise call.error
+                return call.result, COALESCED
+            # The computation we joined is stuck; do not queue behind it forever
+            return compute(), COMPUTED
+
+        try:
+            call.result = compute()
+        except Exception as e:
+            call.error = e
+            with self._lock:
+                self.errors += 1
+            raise
+        finally:
+            with self._lock:
+                del self._in_flight[key]
+                if call.error is None and self.ttl > 0:
+                    self._results[key] = (self._clock() + self.ttl, call.result)
+                    self._results.move_to_end(key)
+                    while len(self._results) > self.max_entries:
+                        self._results.popitem(last=False)
+            call.done.set()
+        return call.result, COMPUTED
+
+    def clear(self) -> None:
+        """Drop the kept results (computations in flight still finish and are shared)"""
+        with self._lock:
+            self._results.clear()
+
+    def stats(self) -> Dict:
+        with self._lock:
+            requests = self.computed + self.coalesced + self.cached
+            return {
+                "requests": requests,
+                "computed": self.computed,
+                "coalesced": self.coalesced,
+                "cached": self.cached,
+                "errors": self.errors,
+                "shared_rate": round((self.coalesced + self.cached) / requests, 4) if requests else 0.0,
+                "in_flight": len(self._in_flight),
+                "entries": len(self._results),
+                "ttl": self.ttl
+            }
@@ -0,0 +1,246 @@
+"""
+Compiled decision-tree evaluator for the space events model.
+
+``export_pipeline`` flattens the fitted training pipeline (one-hot encoder,
+standard scaler and DecisionTreeClassifier) into plain NumPy node arrays
+and writes them to an .npz file. ``CompiledModel`` loads that file and
+walks the tree with nothing but NumPy, so serving never has to import
+sklearn. Scores match ``pipeline.predict_proba`` exactly: numeric features
+are scaled and cast to float32 the same way the tree does before comparing
+against the stored thresholds, and one-hot splits become category tests.
+"""
+
+from typing import Dict, List, Sequence, Tuple
+
+import numpy as np
+
+# Node kinds
+LEAF = 0
+NUMERIC = 1
+CATEGORY = 2
+
+
+def export_pipeline(pipeline, path: str) -> None:
+    """Flatten a fitted preprocessing + tree pipeline into node arrays at ``path``"""
+    preprocessor = pipeline.named_steps['preprocessor']
+    classifier = pipeline.named_steps['classifier']
+
+    categorical_columns: List[str] = []
+    numeric_columns: List[str] = []
+    categories: List[np.ndarray] = []
+    dropped: List[int] = []
+    mean = scale = None
+
+    # Map every transformed feature back to the raw column it came from
+    feature_kind, feature_column, feature_category = [], [], []
+    for name, transformer, columns in preprocessor.transformers_:
+        if name == 'cat':
+            drop_idx = getattr(transformer, 'drop_idx_', None)
+            for position, column in enumerate(columns):
+                categorical_columns.append(column)
+                categories.append(np.asarray(transformer.categories_[position]).astype(str))
+                dropped.append(-1 if drop_idx is None or drop_idx[position] is None else int(drop_idx[position]))
+                for index in range(len(transformer.categories_[position])):
+                    if drop_idx is not None and drop_idx[position] == index:
+                        continue
+                    feature_kind.append(CATEGORY)
+                    feature_column.append(position)
+                    feature_category.append(index)
+        elif name == 'num':
+            for position, column in enumerate(columns):
+                numeric_columns.append(column)
+                feature_kind.append(NUMERIC)
+                feature_column.append(position)
+                feature_category.append(-1)
+            n = len(columns)
+            mean = transformer.mean_ if transformer.mean_ is not None else np.zeros(n)
+            scale = transformer.scale_ if transformer.scale_ is not None else np.ones(n)
+
+    tree = classifier.tree_
+    is_leaf = tree.children_left == -1
+    split_feature = np.where(is_leaf, 0, tree.feature)
+
+    kind = np.where(is_leaf, LEAF, np.asarray(feature_kind)[split_feature]).astype(np.int8)
+    column = np.where(is_leaf, -1, np.asarray(feature_column)[split_feature]).astype(np.int32)
+    category = np.where(kind == CATEGORY, np.asarray(feature_category)[split_feature], -1).astype(np.int32)
+
+    # One-hot features are 0/1, so a split is only a category test if 0 <= threshold < 1
+    category_thresholds = tree.threshold[kind == CATEGORY]
+    if np.any((category_thresholds < 0) | (category_thresholds >= 1)):
+        raise ValueError("Unsupported threshold on a one-hot feature")
+
+    # Same normalisation DecisionTreeClassifier.predict_proba applies to leaf values
+    value = tree.value[:, 0, :].astype(np.float64)
+    normalizer = value.sum(axis=1)[:, np.newaxis]
+    normalizer[normalizer == 0.0] = 1.0
+    value = value / normalizer
+
+    arrays = {
+        'kind': kind,
+        'column': column,
+        'category': category,
+        'threshold': tree.threshold.astype(np.float64),
+        'left': tree.children_left.astype(np.int32),
+        'right': tree.children_right.astype(np.int32),
+        'value': value,
+        'classes': np.asarray(classifier.classes_),
+        'categorical_columns': np.asarray(categorical_columns, dtype=str),
+        'dropped_categories': np.asarray(dropped, dtype=np.int32),
+        'numeric_columns': np.asarray(numeric_columns, dtype=str),
+        'mean': np.asarray(mean, dtype=np.float64),
+        'scale': np.asarray(scale, dtype=np.float64),
+    }
+    for position, values in enumerate(categories):
+        arrays[f'categories_{position}'] = values
+
+    with open(path, 'wb') as f:
+        np.savez(f, **arrays)
+
+
+def case_insensitive_lookup(column: str, codes: Dict) -> Dict:
+    """``codes`` keyed on lowercased categories; raises if two categories differ only in case"""
+    lookup = {}
+    for category, code in codes.items():
+        key = str(category).lower()
+        if key in lookup:
+            raise ValueError(f"{column} has categories differing only in case: {category!r}")
+        lookup[key] = code
+    return lookup
+
+
+class CompiledModel:
+    """NumPy-only evaluator for a pipeline exported with ``export_pipeline``"""
+
+    def __init__(self, arrays):
+        self.kind = arrays['kind']
+        self.column = arrays['column']
+        self.category = arrays['category']
+        self.threshold = arrays['threshold']
+        self.left = arrays['left']
+        self.right = arrays['right']
+        self.value = arrays['value']
+        self.classes_ = arrays['classes']
+        self.categorical_columns = [str(c) for c in arrays['categorical_columns']]
+        self.numeric_columns = [str(c) for c in arrays['numeric_columns']]
+        self.mean = arrays['mean']
+        self.scale = arrays['scale']
+        self.categories = [
+            [str(c) for c in arrays[f'categories_{position}']]
+            for position in range(len(self.categorical_columns))
+        ]
+        self.dropped_categories = arrays['dropped_categories'].tolist()
+        self._lookups = [
+            case_insensitive_lookup(column, {category: code for code, category in enumerate(values)})
+            for column, values in zip(self.categorical_columns, self.categories)
+        ]
+
+        # Plain lists are much faster than array indexing for the single-row walk
+        self._nodes = list(zip(
+            self.kind.tolist(), self.column.tolist(), self.category.tolist(),
+            self.threshold.tolist(), self.left.tolist(), self.right.tolist()
+        ))
+        self._leaf_values = self.value.tolist()
+
+    @classmethod
+    def load(cls, path: str) -> 'CompiledModel':
+        """Load an exported model artifact"""
+        with np.load(path, allow_pickle=False) as data:
+            return cls({key: data[key] for key in data.files})
+
+    @property
+    def feature_names(self) -> List[str]:
+        return self.categorical_columns + self.numeric_columns
+
+    @property
+    def encoded_feature_names(self) -> List[str]:
+        """One-hot feature names, as OneHotEncoder.get_feature_names_out reports them"""
+        return [
+            f"{column}_{category}"
+            for column, values, dropped in zip(self.categorical_columns, self.categories, self.dropped_categories)
+            for code, category in enumerate(values)
+            if code != dropped
+        ]
+
+    @property
+    def n_nodes(self) -> int:
+        return len(self.kind)
+
+    def encode_categories(self, record: Dict) -> Tuple[int, ...]:
+        """Map the categorical fields of one record to category codes"""
+        codes = []
+        for column, lookup in zip(self.categorical_columns, self._lookups):
+            value = record.get(column)
+            code = lookup.get(str(value).lower())
+            if code is None:
+                raise ValueError(f"Found unknown category {value!r} in column {column}")
+            codes.append(code)
+        return tuple(codes)
+
+    def scale_numeric(self, numeric: np.ndarray) -> np.ndarray:
+        """Standardise raw numeric features and cast them the way the tree sees them"""
+        return ((np.asarray(numeric, dtype=np.float64) - self.mean) / self.scale).astype(np.float32)
+
+    def encode(self, records: Sequence[Dict]) -> Tuple[np.ndarray, np.ndarray]:
+        """Encode records into (category codes, scaled numeric features) arrays"""
+        codes = np.array([self.encode_categories(record) for record in records], dtype=np.int32)
+        numeric = np.array(
+            [[record[column] for column in self.numeric_columns] for record in records],
+            dtype=np.float64
+        )
+        codes = codes.reshape(len(records), len(self.categorical_columns))
+        numeric = numeric.reshape(len(records), len(self.numeric_columns))
+        return codes, self.scale_numeric(numeric)
+
+    def predict_proba_encoded(self, codes: np.ndarray, scaled: np.ndarray) -> np.ndarray:
+        """Class probabilities for already-encoded rows, walking all rows level by level"""
+        n_rows = max(len(codes), len(scaled))
+        node = np.zeros(n_rows, dtype=np.intp)
+        rows = np.arange(n_rows)
+
+        while True:
+            kind = self.kind[node]
+            active = kind != LEAF
+            if not active.any():
+                break
+
+            active_rows = rows[active]
+            active_nodes = node[active]
+            columns = self.column[active_nodes]
+            numeric = kind[active] == NUMERIC
+            categorical = ~numeric
+
+            go_left = np.empty(len(active_rows), dtype=bool)
+            go_left[numeric] = (
+                scaled[active_rows[numeric], columns[numeric]] <= self.threshold[active_nodes[numeric]]
+            )
+            # One-hot value is 1 only for the matching category, and 1 > threshold goes right
+            go_left[categorical] = (
+                codes[active_rows[categorical], columns[categorical]] != self.category[active_nodes[categorical]]
+            )
+            node[active] = np.where(go_left, self.left[active_nodes], self.right[active_nodes])
+
+        return self.value[node]
+
+    def predict_proba(self, records: Sequence[Dict]) -> np.ndarray:
+        """Class probabilities for a batch of raw records"""
+        return self.predict_proba_encoded(*self.encode(records))
+
+    def predict(self, records: Sequence[Dict]) -> np.ndarray:
+        """Predicted class for a batch of raw records"""
+        return self.classes_.take(np.argmax(self.predict_proba(records), axis=1))
+
+    def predict_proba_one(self, record: Dict) -> List[float]:
+        """Class probabilities for a single raw record without building arrays"""
+        codes = self.encode_categories(record)
+        scaled = self.scale_numeric([record[column] for column in self.numeric_columns]).tolist()
+
+        node = 0
+        nodes = self._nodes
+        while True:
+            kind, column, category, threshold, left, right = nodes[node]
+            if kind == LEAF:
+                return self._leaf_values[node]
+            if kind == NUMERIC:
+                node = left if scaled[column] <= threshold else right
+            else:
+                node = left if codes[column] != category else right
@@ -11,25 +11,69 @@ class Config:
     
     # Model settings
     MODEL_PATH = 'space_events_model.pkl'
+    COMPILED_MODEL_PATH = 'space_events_model.npz'
     DATA_PATH = 'events_data.pkl'
+    EVENTS_TABLE_PATH = 'events_table'  # memory-mapped column arrays, preferred over DATA_PATH
     
     # API settings
     MAX_RECOMMENDATIONS = 3
+    MAX_BATCH_SIZE = 1000  # preference sets per /recommend/batch call
+    EVENTS_PAGE_SIZE = 100  # default /events page size
+    EVENTS_MAX_PAGE_SIZE = 1000
     DEFAULT_POPULARITY_THRESHOLD = 7.0
+    RECOMMEND_RESULT_TTL = 2.0  # seconds a /recommend result is reused for identical preferences
+    RECOMMEND_RESULT_MAX_ENTRIES = 1024
     
     # Logging
     LOG_LEVEL = 'INFO'
     LOG_FORMAT = '%(asctime)s - %(name)s - %(levelname)s - %(message)s'
     
+    # Access log (written by a background thread; None logs through the 'access_log' logger)
+    ACCESS_LOG_PATH = os.environ.get('ACCESS_LOG_PATH')
+    ACCESS_LOG_SAMPLE_RATE = float(os.environ.get('ACCESS_LOG_SAMPLE_RATE', '1.0'))
+    ACCESS_LOG_DIGEST_RATE = 0.1  # fraction of logged requests that carry a body digest
+    ACCESS_LOG_QUEUE_SIZE = 10000
+    ACCESS_LOG_FLUSH_INTERVAL = 1.0  # seconds
+    
+    # Feedback ingestion: each worker appends batches to its own segment in FEEDBACK_DIR
+    FEEDBACK_DIR = os.environ.get('FEEDBACK_DIR', 'feedback')
+    FEEDBACK_BATCH_SIZE = 500
+    FEEDBACK_FLUSH_INTERVAL = 1.0  # seconds
+    FEEDBACK_FSYNC = 'interval'  # 'always' (acknowledge only after fsync), 'interval' or 'never'
+    FEEDBACK_SEGMENT_MAX_BYTES = 64 * 1024 * 1024
+    
+    # Retraining from feedback (retrain.py) and picking up new artifacts
+    RETRAIN_BASE_DATA = 'events.csv'
+    RETRAIN_DATASET_PATH = 'feedback_training.csv'  # accumulated rows from feedback
+    RETRAIN_CHECKPOINT_PATH = 'feedback_checkpoint.json'  # how far each segment has been read
+    RETRAIN_MIN_NEW_ROWS = 50
+    RETRAIN_HOLDOUT_FRACTION = 0.2
+    RETRAIN_MAX_ACCURACY_DROP = 0.02
+    MODEL_WATCH_INTERVAL = 5  # seconds between checks for a newly published model
+    
+    # Metrics (set METRICS_DIR to a directory shared by all workers to aggregate across them)
+    METRICS_DIR = os.environ.get('METRICS_DIR')
+    METRICS_SNAPSHOT_INTERVAL = 5  # seconds between per-worker snapshots
+    
     # CORS settings
     CORS_ORIGINS = ['*']  # Allow all origins in development
     
-    # Rate limiting (requests per minute)
+    # Rate limiting (requests per minute); 'redis' shares the token buckets across workers
     RATE_LIMIT = 100
+    RATE_LIMIT_STORAGE = os.environ.get('RATE_LIMIT_STORAGE', 'memory')  # 'memory' or 'redis'
+    RATE_LIMIT_REDIS_URL = os.environ.get('REDIS_URL', 'redis://localhost:6379/0')
+    RATE_LIMIT_KEY_PREFIX = 'skyquest:rl:'
     
     # Cache settings
     CACHE_TYPE = 'simple'
     CACHE_DEFAULT_TIMEOUT = 300  # 5 minutes
+    CACHE_MAX_ENTRIES = 1024
+    CACHE_MAX_BYTES = 64 * 1024 * 1024  # 64 MB
+    CACHE_REDIS_URL = os.environ.get('REDIS_URL', 'redis://localhost:6379/0')
+    CACHE_KEY_PREFIX = 'skyquest:'
+    CACHE_COMPRESS_MIN_BYTES = 1024  # zlib-compress larger values in Redis
+    CACHE_L1_MAX_ENTRIES = 256  # per-process cache in front of Redis
+    CACHE_L1_TIMEOUT = 30  # seconds a worker may serve an L1 copy
     
     # Database settings (for future use)
     DATABASE_URL = os.environ.get('DATABASE_URL') or 'sqlite:///space_events.db'
@@ -56,7 +100,9 @@ class TestingConfig(Config):
     
     # Use test model and data files
     MODEL_PATH = 'test_space_events_model.pkl'
+    COMPILED_MODEL_PATH = 'test_space_events_model.npz'
     DATA_PATH = 'test_events_data.pkl'
+    EVENTS_TABLE_PATH = 'test_events_table'
     
     # Disable rate limiting for tests
     RATE_LIMIT = 10000
@@ -70,8 +116,9 @@ class ProductionConfig(Config):
     if not SECRET_KEY:
         raise ValueError("SECRET_KEY environment variable is required for production")
     
-    # Stricter rate limiting for production
+    # Stricter rate limiting for production, enforced across all workers
     RATE_LIMIT = 60
+    RATE_LIMIT_STORAGE = os.environ.get('RATE_LIMIT_STORAGE', 'redis')
     
     # Production CORS origins
     CORS_ORIGINS = os.environ.get('CORS_ORIGINS', '').split(',')
@@ -81,7 +128,7 @@ class ProductionConfig(Config):
     
     # Use Redis for caching in production
     CACHE_TYPE = 'redis'
-    CACHE_REDIS_URL = os.environ.get('REDIS_URL')
+    CACHE_REDIS_URL = os.environ.get('REDIS_URL', 'redis://localhost:6379/0')
     
     @classmethod
     def init_app(cls, app):
@@ -1,22 +1,32 @@
-from flask import Flask, request, jsonify
+import time
+_started = time.perf_counter()  # taken before the heavy imports, for the startup report
+
+from flask import Flask, Response, request
 from flask_cors import CORS
-from flask_limiter import Limiter
-from flask_limiter.util import get_remote_address
-import pandas as pd
 import numpy as np
-import joblib
 import os
-import time
 import logging
 from datetime import datetime
-from config import get_config, validate_user_preferences, VALID_EVENT_TYPES, VALID_LOCATIONS
+from types import SimpleNamespace
+from config import get_config, validate_user_preferences, VALID_EVENT_TYPES
 from utils import (
-    cache, cache_result, create_response, create_error_response, 
-    log_api_request, filter_events_by_preferences, rank_recommendations,
-    validate_and_clean_preferences, generate_recommendation_explanation,
-    create_user_feedback_data, save_feedback_to_file, get_api_usage_stats,
-    enrich_event_data
+    cache_response, create_cache, set_cache, create_response, create_error_response, 
+    rank_recommendations,
+    validate_and_clean_preferences, validate_and_clean_preferences_batch,
+    generate_recommendation_explanation,
+    create_user_feedback_data, get_api_usage_stats,
+    create_ndjson_response, enrich_events_frame, build_enrichment_index, enrich_from_index
 )
+from inference import GridScorer
+from compiled_model import CompiledModel
+from event_store import EventStore, decode_cursor, encode_cursor
+from event_table import EventTable
+from access_log import AccessLog
+from metrics import MetricsRegistry
+from feedback_store import FeedbackWriter
+from model_manager import ModelManager
+from rate_limit import FlaskRateLimiter, create_rate_limiter, remote_address
+from coalesce import Coalescer, COMPUTED
 
 # Initialize Flask app
 app = Flask(__name__)
@@ -27,47 +37,146 @@ config.init_app(app)
 # Enable CORS
 CORS(app, origins=config.CORS_ORIGINS)
 
-# Set up rate limiting
-limiter = Limiter(
-    app=app,
-    key_func=get_remote_address,
-    default_limits=[f"{config.RATE_LIMIT} per minute"]
-)
+# Response cache: per-process, or shared through Redis when CACHE_TYPE = 'redis'
+cache = create_cache(config)
+set_cache(cache)
+access_log = AccessLog.from_config(config)
+# Identical concurrent /recommend calls share one computation, kept for a couple of seconds
+recommend_coalescer = Coalescer(ttl=config.RECOMMEND_RESULT_TTL, max_entries=config.RECOMMEND_RESULT_MAX_ENTRIES)
+feedback_writer = FeedbackWriter.from_config(config)
+
+# Request, inference and cache metrics for /metrics and /stats
+metrics = MetricsRegistry(snapshot_dir=config.METRICS_DIR, snapshot_interval=config.METRICS_SNAPSHOT_INTERVAL)
+metrics.describe('http_requests_total', 'counter', 'Requests by route, method and status')
+metrics.describe('http_request_duration_seconds', 'histogram', 'Request latency by route')
+metrics.describe('response_cache_total', 'counter', 'Cached-response lookups by route and result')
+metrics.describe('model_inference_seconds', 'histogram', 'Model scoring time by endpoint')
+
+def cache_lookups():
+    stats = cache.stats()
+    return {(('result', 'hit'),): stats['hits'], (('result', 'miss'),): stats['misses']}
+
+metrics.gauge('cache_lookups_total', cache_lookups, 'Cache backend lookups by result', kind='counter')
+
+def recommend_sources():
+    stats = recommend_coalescer.stats()
+    return {(('result', source),): stats[source] for source in ('computed', 'coalesced', 'cached')}
+
+metrics.gauge('recommend_results_total', recommend_sources,
+              '/recommend results by whether they were computed, coalesced or cached', kind='counter')
 
 # Set up logging
 logging.basicConfig(level=getattr(logging, config.LOG_LEVEL))
 logger = logging.getLogger(__name__)
 
-# Global variables to store the model and data
-model = None
-events_data = None
+def load_snapshot(version):
+    """Load the model and events data into a new, self-contained snapshot"""
+    if not os.path.exists(config.COMPILED_MODEL_PATH) and not os.path.exists(config.MODEL_PATH):
+        raise FileNotFoundError(f"Model file not found: {config.MODEL_PATH}")
+    
+    if not EventTable.exists(config.EVENTS_TABLE_PATH) and not os.path.exists(config.DATA_PATH):
+        raise FileNotFoundError(f"Data file not found: {config.DATA_PATH}")
+    
+    # Prefer the compiled tree and the mapped event table: then neither sklearn
+    # nor pandas (nor joblib) is ever imported by a worker
+    if os.path.exists(config.COMPILED_MODEL_PATH):
+        model = CompiledModel.load(config.COMPILED_MODEL_PATH)
+    else:
+        import joblib
+        model = joblib.load(config.MODEL_PATH)
+    if EventTable.exists(config.EVENTS_TABLE_PATH):
+        # Exported already enriched by train_model.py
+        events_data = EventTable.load(config.EVENTS_TABLE_PATH)
+    else:
+        import joblib
+        # Enrichment columns are computed once here rather than per row per request
+        events_data = enrich_events_frame(joblib.load(config.DATA_PATH))
+    scorer = GridScorer(model)
+    event_store = EventStore(events_data)
+    
+    # The fallback list never changes between requests, so build it once
+    # (stable sort keeps the first of tied rows, like DataFrame.nlargest)
+    popularity = np.asarray(events_data['popularity_score'], dtype=np.float64)
+    top_rows = np.argsort(-popularity, kind='stable')[:config.MAX_RECOMMENDATIONS]
+    popular_events = [dict(event_store.records[row]) for row in top_rows]
+    
+    return SimpleNamespace(
+        version=version,
+        model=model,
+        events_data=events_data,
+        scorer=scorer,
+        event_store=event_store,
+        enrichment_index=build_enrichment_index(
+            VALID_EVENT_TYPES, np.unique(scorer.durations), np.unique(scorer.popularity_scores)
+        ),
+        popular_events=popular_events
+    )
+
+def warm_up_snapshot(snapshot):
+    """Score one preference set per event type before the snapshot takes traffic"""
+    samples = {}
+    for record in snapshot.event_store.records:
+        samples.setdefault(record['event_type'], {
+            field: record[field] for field in ('event_type', 'location', 'time_of_day')
+        })
+    snapshot.warm_up_results = snapshot.scorer.recommend_many(
+        list(samples.values()), config.MAX_RECOMMENDATIONS
+    )
+
+def validate_snapshot(snapshot):
+    """Refuse a snapshot that has no events or scores outside [0, 1]"""
+    if len(snapshot.event_store) == 0:
+        raise ValueError("events data is empty")
+    for results in snapshot.warm_up_results:
+        for result in results:
+            if not 0.0 <= result['like_probability'] <= 1.0:
+                raise ValueError(f"like_probability out of range: {result['like_probability']}")
+
+def artifact_version():
+    """Version string for the current model and data files (their mtimes)"""
+    model_path = config.COMPILED_MODEL_PATH if os.path.exists(config.COMPILED_MODEL_PATH) else config.MODEL_PATH
+    if EventTable.exists(config.EVENTS_TABLE_PATH):
+        data_path = os.path.join(config.EVENTS_TABLE_PATH, 'manifest.json')
+    else:
+        data_path = config.DATA_PATH
+    return f"{os.stat(model_path).st_mtime_ns}-{os.stat(data_path).st_mtime_ns}"
+
+def on_model_swap(snapshot):
+    # Cached responses are keyed on the version, so entries for the old one are dead weight
+    cache.clear_local()
+    recommend_coalescer.clear()
+    logger.info(f"Loaded {len(snapshot.events_data)} events")
+
+# The model and data currently being served; handlers take model_manager.current once per request
+model_manager = ModelManager(
+    loader=load_snapshot,
+    version_func=artifact_version,
+    warm_up=warm_up_snapshot,
+    validate=validate_snapshot,
+    on_swap=on_model_swap,
+    interval=config.MODEL_WATCH_INTERVAL
+)
+
+# Cold-start timings, reported on /health
+startup = {"import_ms": None, "model_load_ms": None, "ready_ms": None,
+           "first_request_ms": None, "first_response_ms": None}
 
 def load_model():
-    """Load the trained model and events data"""
-    global model, events_data
-    
+    """Load the trained model and events data (blocking; raises if they cannot be loaded)"""
     try:
-        if not os.path.exists(config.MODEL_PATH):
-            raise FileNotFoundError(f"Model file not found: {config.MODEL_PATH}")
-        
-        if not os.path.exists(config.DATA_PATH):
-            raise FileNotFoundError(f"Data file not found: {config.DATA_PATH}")
-        
-        model = joblib.load(config.MODEL_PATH)
-        events_data = joblib.load(config.DATA_PATH)
-        
+        load_started = time.perf_counter()
+        model_manager.reload(force=True)
+        startup["model_load_ms"] = round((time.perf_counter() - load_started) * 1000, 2)
+        startup["ready_ms"] = round((time.perf_counter() - _started) * 1000, 2)
         logger.info("Model and data loaded successfully!")
-        logger.info(f"Loaded {len(events_data)} events")
-        
     except Exception as e:
         logger.error(f"Error loading model: {e}")
         raise
 
 @app.before_request
 def before_request():
-    """Log request details"""
+    """Start the request timer (the request itself is logged by access_log, off-thread)"""
     request.start_time = time.time()
-    logger.info(f"Request: {request.method} {request.path} from {request.remote_addr}")
 
 @app.after_request
 def after_request(response):
@@ -78,16 +187,37 @@ def after_request(response):
     response.headers['X-Response-Time'] = str(duration)
     response.headers['X-API-Version'] = 'v1'
     
-    # Log request/response
+    if startup["first_request_ms"] is None:
+        startup["first_request_ms"] = round(duration * 1000, 2)
+        startup["first_response_ms"] = round((time.perf_counter() - _started) * 1000, 2)
+        logger.info(f"Startup: {startup}")
+    
+    # Queue an access record; bodies are not parsed and writing happens off-thread
     try:
-        request_data = request.get_json() if request.is_json else {}
-        response_data = response.get_json() if response.is_json else {}
-        log_api_request(request_data, response_data, duration)
+        access_log.record(request, response, duration)
+        
+        # Label by route rule rather than path so series stay bounded
+        route = request.url_rule.rule if request.url_rule is not None else 'unmatched'
+        metrics.inc('http_requests_total', {'route': route, 'method': request.method, 'status': response.status_code})
+        metrics.observe('http_request_duration_seconds', duration, {'route': route})
+        if 'X-Cache' in response.headers:
+            metrics.inc('response_cache_total', {'route': route, 'result': response.headers['X-Cache'].lower()})
     except Exception as e:
         logger.warning(f"Could not log request/response: {e}")
     
     return response
 
+# Per-client token buckets, shared by every worker when RATE_LIMIT_STORAGE = 'redis'.
+# Set up after the hooks above so rejected requests are still timed and logged.
+rate_limiter = create_rate_limiter(config.RATE_LIMIT_STORAGE, config.RATE_LIMIT_REDIS_URL,
+                                   config.RATE_LIMIT_KEY_PREFIX)
+limiter = FlaskRateLimiter(
+    app,
+    rate_limiter,
+    key_func=remote_address,
+    default_limits=[f"{config.RATE_LIMIT} per minute"]
+)
+
 @app.errorhandler(404)
 def not_found(error):
     """Handle 404 errors"""
@@ -101,28 +231,43 @@ def internal_error(error):
 
 @app.errorhandler(429)
 def ratelimit_handler(error):
-    """Handle rate limit errors"""
-    return create_error_response("Rate limit exceeded", 429)
+    """Handle rate limit errors (FlaskRateLimiter adds Retry-After)"""
+    return create_error_response("Rate limit exceeded", 429), 429
 
 @app.route('/health', methods=['GET'])
 def health_check():
     """Health check endpoint"""
+    snapshot = model_manager.current
     return create_response({
         "status": "healthy",
-        "model_loaded": model is not None,
-        "events_count": len(events_data) if events_data is not None else 0,
+        "model_loaded": snapshot is not None,
+        "model_version": model_manager.version,
+        "events_count": len(snapshot.events_data) if snapshot is not None else 0,
         "cache_size": cache.size(),
+        "cache": cache.stats(),
+        "access_log": access_log.stats(),
+        "feedback": feedback_writer.stats(),
+        "rate_limit": rate_limiter.stats(),
+        "recommend_coalescing": recommend_coalescer.stats(),
+        "startup": startup,
         "uptime": datetime.utcnow().isoformat()
     })
 
 @app.route('/events', methods=['GET'])
 @limiter.limit("100 per minute")
-@cache_result(timeout=300)
+@cache_response(timeout=300, version=lambda: model_manager.version)
 def get_all_events():
-    """Get all available events with optional filtering"""
+    """Get available events with optional filtering, cursor pagination and field projection.
+    
+    Pass ``format=ndjson`` to stream every matching event as newline-delimited
+    JSON instead of a JSON page; with a ``limit``, the X-Next-Cursor header
+    carries the cursor for the rest.
+    """
     try:
-        if events_data is None:
+        snapshot = model_manager.current
+        if snapshot is None:
             return create_error_response("Events data not loaded", 500)
+        event_store = snapshot.event_store
         
         # Get query parameters
         event_type = request.args.get('event_type')
@@ -130,42 +275,42 @@ def get_all_events():
         time_of_day = request.args.get('time_of_day')
         min_popularity = request.args.get('min_popularity', type=float)
         max_duration = request.args.get('max_duration', type=int)
+        limit = request.args.get('limit', type=int)
+        cursor = request.args.get('cursor')
+        stream = request.args.get('format') == 'ndjson'
+        
+        try:
+            fields = event_store.parse_fields(request.args.get('fields'))
+            after = decode_cursor(cursor, snapshot.event_store.version) if cursor else None
+        except ValueError as e:
+            return create_error_response(str(e), 400)
+        
+        # JSON pages are bounded; streams only stop early when a limit is given
+        if limit is not None:
+            limit = max(1, min(limit, config.EVENTS_MAX_PAGE_SIZE))
+        elif not stream:
+            limit = config.EVENTS_PAGE_SIZE
+        
+        # Filter through the prebuilt indexes; records are already enriched
+        rows = event_store.filter_ids(
+            event_type=event_type,
+            location=location,
+            time_of_day=time_of_day,
+            min_popularity=min_popularity,
+            max_duration=max_duration
+        )
+        page, last_row = event_store.page(rows, after=after, limit=limit)
         
-        # Filter events
-        filtered_events = events_data.copy()
-        
-        if event_type:
-            filtered_events = filtered_events[
-                filtered_events['event_type'].str.lower() == event_type.lower()
-            ]
-        
-        if location:
-            filtered_events = filtered_events[filtered_events['location'] == location]
-        
-        if time_of_day:
-            filtered_events = filtered_events[
-                filtered_events['time_of_day'].str.lower() == time_of_day.lower()
-            ]
-        
-        if min_popularity is not None:
-            filtered_events = filtered_events[
-                filtered_events['popularity_score'] >= min_popularity
-            ]
-        
-        if max_duration is not None:
-            filtered_events = filtered_events[
-                filtered_events['duration'] <= max_duration
-            ]
-        
-        # Enrich event data
-        events_list = []
-        for _, event in filtered_events.iterrows():
-            enriched_event = enrich_event_data(event.to_dict())
-            events_list.append(enriched_event)
+        next_cursor = encode_cursor(last_row, event_store.version) if last_row is not None else None
+        if stream:
+            return create_ndjson_response(event_store.iter_records(page, fields), next_cursor)
         
+        events_list = list(event_store.iter_records(page, fields))
         return create_response({
-            "total_events": len(events_list),
+            "total_events": len(rows),
+            "count": len(events_list),
             "events": events_list,
+            "next_cursor": next_cursor,
             "filters_applied": {
                 "event_type": event_type,
                 "location": location,
@@ -179,6 +324,29 @@ def get_all_events():
         logger.error(f"Error getting events: {e}")
         return create_error_response("Error retrieving events", 500)
 
+def build_recommendations(snapshot, top_liked, cleaned_prefs):
+    """Turn scored grid rows into enriched, ranked recommendations"""
+    recommendations = []
+    
+    if len(top_liked) == 0:
+        # Fallback to popular events
+        for event in snapshot.popular_events:
+            enriched_event = dict(event)
+            enriched_event.update({
+                'predicted_like': 0,
+                'like_probability': 0.0,
+                'reason': 'No specific matches found, showing popular events'
+            })
+            recommendations.append(enriched_event)
+    else:
+        for event in top_liked:
+            enriched_event = enrich_from_index(event, snapshot.enrichment_index)
+            enriched_event['reason'] = generate_recommendation_explanation(enriched_event, cleaned_prefs)
+            recommendations.append(enriched_event)
+    
+    # Rank recommendations
+    return rank_recommendations(recommendations, cleaned_prefs)
+
 @app.route('/recommend', methods=['POST'])
 @limiter.limit("50 per minute")
 def recommend_events():
@@ -186,6 +354,11 @@ def recommend_events():
     start_time = time.time()
     
     try:
+        # Serve the whole request from one model version, even if a reload lands meanwhile
+        snapshot = model_manager.current
+        if snapshot is None:
+            return create_error_response("Model not loaded", 500)
+        
         # Get and validate user preferences
         user_prefs = request.get_json()
         
@@ -202,64 +375,15 @@ def recommend_events():
                 errors=validation_errors
             )
         
-        # Create recommendation data with various combinations
-        user_data = []
-        durations = [60, 120, 180, 240, 300]
-        popularity_scores = [7.0, 7.5, 8.0, 8.5, 9.0]
-        
-        for duration in durations:
-            for popularity in popularity_scores:
-                user_data.append({
-                    'event_type': cleaned_prefs['event_type'],
-                    'location': cleaned_prefs['location'],
-                    'time_of_day': cleaned_prefs['time_of_day'],
-                    'duration': duration,
-                    'popularity_score': popularity
-                })
-        
-        user_df = pd.DataFrame(user_data)
-        
-        # Get predictions
-        predictions = model.predict(user_df)
-        prediction_probs = model.predict_proba(user_df)
-        like_probabilities = prediction_probs[:, 1]
-        
-        # Add predictions to user data
-        user_df['predicted_like'] = predictions
-        user_df['like_probability'] = like_probabilities
-        
-        # Filter liked events and get top recommendations
-        liked_events = user_df[user_df['predicted_like'] == 1]
-        
-        if len(liked_events) == 0:
-            # Fallback to popular events
-            top_events = events_data.nlargest(config.MAX_RECOMMENDATIONS, 'popularity_score')
-            recommendations = []
-            
-            for _, event in top_events.iterrows():
-                enriched_event = enrich_event_data(event.to_dict())
-                enriched_event.update({
-                    'predicted_like': 0,
-                    'like_probability': 0.0,
-                    'reason': 'No specific matches found, showing popular events'
-                })
-                recommendations.append(enriched_event)
-        else:
-            # Get top recommendations
-            top_liked = liked_events.nlargest(config.MAX_RECOMMENDATIONS, 'like_probability')
-            recommendations = []
-            
-            for _, event in top_liked.iterrows():
-                enriched_event = enrich_event_data(event.to_dict())
-                enriched_event.update({
-                    'predicted_like': int(event['predicted_like']),
-                    'like_probability': float(event['like_probability']),
-                    'reason': generate_recommendation_explanation(enriched_event, cleaned_prefs)
-                })
-                recommendations.append(enriched_event)
-        
-        # Rank recommendations
-        recommendations = rank_recommendations(recommendations, cleaned_prefs)
+        def compute():
+            # Score the duration/popularity grid in one model pass
+            with metrics.timer('model_inference_seconds', {'endpoint': 'recommend'}):
+                top_liked = snapshot.scorer.recommend(cleaned_prefs, config.MAX_RECOMMENDATIONS)
+            return build_recommendations(snapshot, top_liked, cleaned_prefs)
+        
+        # Requests with the same cleaned preferences on the same model version share one result
+        key = (snapshot.version,) + tuple(sorted(cleaned_prefs.items()))
+        recommendations, source = recommend_coalescer.get_or_compute(key, compute)
         
         # Calculate response time
         response_time = time.time() - start_time
@@ -269,13 +393,77 @@ def recommend_events():
             "recommendations": recommendations,
             "total_recommendations": len(recommendations),
             "response_time_ms": round(response_time * 1000, 2),
-            "cache_hit": False  # Would be True if using cache decorator
+            "cache_hit": source != COMPUTED
         })
         
     except Exception as e:
         logger.error(f"Error in recommendation: {e}")
         return create_error_response("Error generating recommendations", 500)
 
+@app.route('/recommend/batch', methods=['POST'])
+@limiter.limit("20 per minute")
+def recommend_events_batch():
+    """Recommend events for many preference sets in one call"""
+    start_time = time.time()
+    
+    try:
+        snapshot = model_manager.current
+        if snapshot is None:
+            return create_error_response("Model not loaded", 500)
+        
+        # Accept either a bare list or {"preferences": [...]}
+        payload = request.get_json()
+        preferences_list = payload.get('preferences') if isinstance(payload, dict) else payload
+        
+        if not preferences_list:
+            return create_error_response("No data provided", 400)
+        
+        if not isinstance(preferences_list, list):
+            return create_error_response("preferences must be a list", 400)
+        
+        if len(preferences_list) > config.MAX_BATCH_SIZE:
+            return create_error_response(
+                f"Batch too large: at most {config.MAX_BATCH_SIZE} preference sets per call", 400
+            )
+        
+        # Validate and clean every preference set up front
+        cleaned_list, validation_errors = validate_and_clean_preferences_batch(preferences_list)
+        
+        if validation_errors:
+            return create_error_response(
+                "Invalid input data", 
+                400, 
+                errors=validation_errors
+            )
+        
+        # Score every profile's grid in a single model pass
+        try:
+            with metrics.timer('model_inference_seconds', {'endpoint': 'recommend_batch'}):
+                top_liked_list = snapshot.scorer.recommend_many(cleaned_list, config.MAX_RECOMMENDATIONS)
+        except ValueError as e:
+            return create_error_response("Invalid input data", 400, errors=[str(e)])
+        
+        results = []
+        for cleaned_prefs, top_liked in zip(cleaned_list, top_liked_list):
+            recommendations = build_recommendations(snapshot, top_liked, cleaned_prefs)
+            results.append({
+                "user_preferences": cleaned_prefs,
+                "recommendations": recommendations,
+                "total_recommendations": len(recommendations)
+            })
+        
+        response_time = time.time() - start_time
+        
+        return create_response({
+            "results": results,
+            "total_profiles": len(results),
+            "response_time_ms": round(response_time * 1000, 2)
+        })
+        
+    except Exception as e:
+        logger.error(f"Error in batch recommendation: {e}")
+        return create_error_response("Error generating recommendations", 500)
+
 @app.route('/feedback', methods=['POST'])
 @limiter.limit("20 per minute")
 def submit_feedback():
@@ -299,8 +487,10 @@ def submit_feedback():
             feedback_data['feedback']
         )
         
-        # Save feedback
-        save_feedback_to_file(structured_feedback)
+        # Queue for the batched writer; it reaches disk within FEEDBACK_FLUSH_INTERVAL
+        # (with FEEDBACK_FSYNC = 'always', submit returns only once it is fsynced)
+        if not feedback_writer.submit(structured_feedback):
+            return create_error_response("Feedback could not be stored, please retry", 503)
         
         return create_response({
             "message": "Feedback submitted successfully",
@@ -316,16 +506,19 @@ def submit_feedback():
 def get_stats():
     """Get API usage statistics"""
     try:
-        stats = get_api_usage_stats()
+        stats = get_api_usage_stats(metrics.summary())
+        stats["recommend_coalescing"] = recommend_coalescer.stats()
         
         # Add model statistics
-        if events_data is not None:
+        snapshot = model_manager.current
+        if snapshot is not None:
+            events_data = snapshot.events_data
             stats.update({
                 "total_events": len(events_data),
-                "event_types": events_data['event_type'].nunique(),
-                "locations": events_data['location'].nunique(),
-                "avg_popularity": float(events_data['popularity_score'].mean()),
-                "avg_duration": float(events_data['duration'].mean())
+                "event_types": len(snapshot.event_store.event_types),
+                "locations": len(snapshot.event_store.locations),
+                "avg_popularity": float(np.nanmean(events_data['popularity_score'])),
+                "avg_duration": float(np.nanmean(events_data['duration']))
             })
         
         return create_response(stats)
@@ -334,6 +527,34 @@ def get_stats():
         logger.error(f"Error getting stats: {e}")
         return create_error_response("Error retrieving statistics", 500)
 
+@app.route('/metrics', methods=['GET'])
+@limiter.exempt
+def get_metrics():
+    """Metrics in Prometheus text format, summed across workers"""
+    return Response(metrics.prometheus_text(), mimetype='text/plain; version=0.0.4')
+
+@app.route('/model/info', methods=['GET'])
+def get_model_info():
+    """The model being served, plus its version, load time and how often it has been swapped"""
+    snapshot = model_manager.current
+    if snapshot is None:
+        return create_error_response("Model not loaded", 500)
+    
+    if isinstance(snapshot.model, CompiledModel):
+        feature_names = snapshot.model.encoded_feature_names
+    else:
+        feature_names = snapshot.model.named_steps['preprocessor'].get_feature_names_out().tolist()
+    
+    return create_response({
+        "model_type": "DecisionTreeClassifier",
+        "compiled": isinstance(snapshot.model, CompiledModel),
+        "feature_names": feature_names,
+        "training_data_size": len(snapshot.events_data),
+        "available_event_types": snapshot.event_store.event_types,
+        "available_locations": snapshot.event_store.locations,
+        **model_manager.info()
+    })
+
 @app.route('/validate', methods=['POST'])
 def validate_preferences():
     """Validate user preferences without making recommendations"""
@@ -362,15 +583,15 @@ def validate_preferences():
         return create_error_response("Error validating preferences", 500)
 
 @app.route('/event-types', methods=['GET'])
-@cache_result(timeout=3600)  # Cache for 1 hour
+@cache_response(timeout=3600, version=lambda: model_manager.version)  # Cache for 1 hour
 def get_event_types():
     """Get all available event types"""
     try:
-        if events_data is None:
+        snapshot = model_manager.current
+        if snapshot is None:
             return create_error_response("Events data not loaded", 500)
         
-        event_types = events_data['event_type'].unique().tolist()
-        event_types.sort()
+        event_types = snapshot.event_store.event_types
         
         return create_response({
             "event_types": event_types,
@@ -382,15 +603,15 @@ def get_event_types():
         return create_error_response("Error retrieving event types", 500)
 
 @app.route('/locations', methods=['GET'])
-@cache_result(timeout=3600)  # Cache for 1 hour
+@cache_response(timeout=3600, version=lambda: model_manager.version)  # Cache for 1 hour
 def get_locations():
     """Get all available locations"""
     try:
-        if events_data is None:
+        snapshot = model_manager.current
+        if snapshot is None:
             return create_error_response("Events data not loaded", 500)
         
-        locations = events_data['location'].unique().tolist()
-        locations.sort()
+        locations = snapshot.event_store.locations
         
         return create_response({
             "locations": locations,
@@ -401,10 +622,13 @@ def get_locations():
         logger.error(f"Error getting locations: {e}")
         return create_error_response("Error retrieving locations", 500)
 
+startup["import_ms"] = round((time.perf_counter() - _started) * 1000, 2)
+
 if __name__ == '__main__':
     # Load the model when starting the app
     try:
         load_model()
+        model_manager.start()
         logger.info("Starting enhanced Flask API server...")
         app.run(debug=config.DEBUG, host='0.0.0.0', port=5000)
     except Exception as e:
@@ -0,0 +1,179 @@
+"""
+Indexed, read-only view of the events table for the /events endpoints.
+
+The store is built once when the model and data are loaded. It keeps the
+events as plain records (enriched beforehand by
+``utils.enrich_events_frame``) plus hash indexes on the categorical
+filters and sorted arrays for the numeric range filters, so a request
+turns into a few dict lookups, binary searches and sorted-array
+intersections instead of copying and re-scanning the DataFrame.
+"""
+
+import base64
+import hashlib
+from typing import Dict, Iterator, List, Optional, Tuple
+
+import numpy as np
+
+
+def _hash_index(keys) -> Dict[str, np.ndarray]:
+    """Map each key to the sorted row ids holding it"""
+    index = {}
+    for row, key in enumerate(keys):
+        index.setdefault(key, []).append(row)
+    return {key: np.asarray(rows, dtype=np.int64) for key, rows in index.items()}
+
+
+class _SortedColumn:
+    """Row ids ordered by a numeric column, for range queries by binary search"""
+
+    def __init__(self, values):
+        values = np.asarray(values, dtype=np.float64)
+        # NaN never satisfies a comparison, so leave those rows out entirely
+        rows = np.flatnonzero(~np.isnan(values))
+        order = np.argsort(values[rows], kind='stable')
+        self.rows = rows[order]
+        self.values = values[rows][order]
+
+    def at_least(self, minimum: float) -> np.ndarray:
+        start = np.searchsorted(self.values, minimum, side='left')
+        return np.sort(self.rows[start:])
+
+    def at_most(self, maximum: float) -> np.ndarray:
+        end = np.searchsorted(self.values, maximum, side='right')
+        return np.sort(self.rows[:end])
+
+
+class EventStore:
+    """Event records with indexes for the /events filters.
+
+    ``events`` is a DataFrame or an ``event_table.EventTable``; only
+    ``columns``, ``events[column]`` and ``to_dict('records')`` are used.
+    """
+
+    def __init__(self, events):
+        self.records = [
+            {key: _to_python(value) for key, value in event.items()}
+            for event in events.to_dict('records')
+        ]
+        self.fields = list(self.records[0]) if self.records else list(events.columns)
+        event_types = _strings(events['event_type'])
+        locations = _strings(events['location'])
+        self.event_types = sorted(set(event_types))
+        self.locations = sorted(set(locations))
+
+        # Filters on event_type/time_of_day are case-insensitive, location is exact
+        self._by_event_type = _hash_index(value.lower() for value in event_types)
+        self._by_location = _hash_index(locations)
+        self._by_time_of_day = _hash_index(value.lower() for value in _strings(events['time_of_day']))
+        self._popularity = _SortedColumn(events['popularity_score'])
+        self._duration = _SortedColumn(events['duration'])
+        # Cursors are tied to this, so a reload that only changes the model keeps them valid
+        self.version = _fingerprint(events)
+
+    def __len__(self) -> int:
+        return len(self.records)
+
+    def filter_ids(self, event_type: Optional[str] = None, location: Optional[str] = None,
+                   time_of_day: Optional[str] = None, min_popularity: Optional[float] = None,
+                   max_duration: Optional[int] = None) -> np.ndarray:
+        """Row ids matching every given filter, in table order"""
+        empty = np.empty(0, dtype=np.int64)
+        candidates = []
+        if event_type:
+            candidates.append(self._by_event_type.get(event_type.lower(), empty))
+        if location:
+            candidates.append(self._by_location.get(location, empty))
+        if time_of_day:
+            candidates.append(self._by_time_of_day.get(time_of_day.lower(), empty))
+        if min_popularity is not None:
+            candidates.append(self._popularity.at_least(min_popularity))
+        if max_duration is not None:
+            candidates.append(self._duration.at_most(max_duration))
+
+        if not candidates:
+            return np.arange(len(self.records))
+
+        # Intersect smallest first so later steps work on as few ids as possible
+        candidates.sort(key=len)
+        rows = candidates[0]
+        for other in candidates[1:]:
+            if len(rows) == 0:
+                break
+            rows = np.intersect1d(rows, other, assume_unique=True)
+        return rows
+
+    def filter(self, **filters) -> List[Dict]:
+        """Records matching ``filters`` (see ``filter_ids``)"""
+        return [self.records[row] for row in self.filter_ids(**filters)]
+
+    def parse_fields(self, fields: Optional[str]) -> Optional[List[str]]:
+        """Validate a comma-separated ``fields=`` projection (None means all fields)"""
+        if not fields:
+            return None
+        requested = [field.strip() for field in fields.split(',') if field.strip()]
+        unknown = [field for field in requested if field not in self.fields]
+        if unknown:
+            raise ValueError(f"Unknown fields: {', '.join(unknown)}. Available: {', '.join(self.fields)}")
+        return requested
+
+    @staticmethod
+    def page(rows: np.ndarray, after: Optional[int] = None,
+             limit: Optional[int] = None) -> Tuple[np.ndarray, Optional[int]]:
+        """Slice sorted row ids to the page after row ``after``.
+
+        Returns the page and the last row id in it when more rows follow
+        (the position to continue from), else None.
+        """
+        if after is not None:
+            rows = rows[np.searchsorted(rows, after, side='right'):]
+        if limit is None or len(rows) <= limit:
+            return rows, None
+        rows = rows[:limit]
+        return rows, int(rows[-1])
+
+    def iter_records(self, rows: np.ndarray, fields: Optional[List[str]] = None) -> Iterator[Dict]:
+        """Yield the records for ``rows`` one at a time, optionally projected to ``fields``"""
+        for row in rows:
+            record = self.records[row]
+            yield record if fields is None else {field: record.get(field) for field in fields}
+
+
+def encode_cursor(row: int, version: str) -> str:
+    """Opaque pagination cursor; tied to the data version so it cannot outlive a reload"""
+    token = f"{version}|{row}".encode()
+    return base64.urlsafe_b64encode(token).decode().rstrip('=')
+
+
+def decode_cursor(cursor: str, version: str) -> int:
+    """Row id to continue after; raises ValueError for malformed or stale cursors"""
+    try:
+        padded = cursor + '=' * (-len(cursor) % 4)
+        cursor_version, row = base64.urlsafe_b64decode(padded.encode()).decode().rsplit('|', 1)
+        row = int(row)
+    except Exception:
+        raise ValueError("Invalid cursor") from None
+    if cursor_version != version:
+        raise ValueError("Cursor has expired, the events data was reloaded")
+    return row
+
+
+def _fingerprint(events) -> str:
+    """Short hash of the events' contents, independent of file times"""
+    digest = hashlib.sha1()
+    for column in events.columns:
+        values = np.asarray(events[column])
+        if values.dtype == object:
+            values = values.astype(str)
+        digest.update(f"{column}:{values.dtype.str}:".encode())
+        digest.update(np.ascontiguousarray(values).tobytes())
+    return digest.hexdigest()[:16]
+
+
+def _strings(column) -> List[str]:
+    return np.asarray(column).tolist()
+
+
+def _to_python(value):
+    """NumPy scalars to plain Python so records serialise cleanly"""
+    return value.item() if hasattr(value, 'item') else value
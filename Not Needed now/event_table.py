@@ -0,0 +1,124 @@
+"""
+Column-array storage for the events table.
+
+``events_data.pkl`` is a pickled DataFrame: loading it means importing
+pandas and unpickling a private copy in every worker. ``export_event_table``
+writes the same table as one .npy file per column plus a small JSON
+manifest, and ``EventTable.load`` opens them with ``mmap_mode='r'``, so a
+worker starts without pandas and every worker on a host shares the same
+page-cache pages instead of holding its own copy. Strings are stored as
+fixed-width unicode arrays, which NumPy can map directly.
+
+Running workers keep those files mapped, so an export never rewrites
+them: each export writes its columns into a new version subdirectory and
+then atomically replaces the manifest, which names the version to load.
+A worker still mapping the old version keeps reading it whole until it
+reloads. Older versions are removed on the next export.
+"""
+
+import json
+import os
+import shutil
+import time
+from typing import Dict, Iterator, List
+
+import numpy as np
+
+MANIFEST = 'manifest.json'
+VERSION_PREFIX = 'v-'
+
+
+def export_event_table(events_df, directory: str) -> None:
+    """Write every column of ``events_df`` to a new version under ``directory`` and switch to it"""
+    os.makedirs(directory, exist_ok=True)
+    previous = _manifest_version(directory)
+    version = f'{VERSION_PREFIX}{time.time_ns()}'
+    version_dir = os.path.join(directory, version)
+    os.makedirs(version_dir)
+    columns = []
+    for column in events_df.columns:
+        values = events_df[column].to_numpy()
+        if values.dtype == object:
+            values = values.astype(str)
+        np.save(os.path.join(version_dir, f'{column}.npy'), values, allow_pickle=False)
+        columns.append(column)
+
+    # Written last and swapped in atomically: a table is only complete once its manifest exists
+    tmp_path = os.path.join(directory, f'{MANIFEST}.tmp')
+    with open(tmp_path, 'w', encoding='utf-8') as f:
+        json.dump({'columns': columns, 'rows': len(events_df), 'version': version}, f)
+    os.replace(tmp_path, os.path.join(directory, MANIFEST))
+    _remove_old_versions(directory, keep={version, previous})
+
+
+def _manifest_version(directory: str):
+    try:
+        with open(os.path.join(directory, MANIFEST), encoding='utf-8') as f:
+            return json.load(f).get('version')
+    except (OSError, ValueError):
+        return None
+
+
+def _remove_old_versions(directory: str, keep) -> None:
+    """Drop versions older than the previous one (a worker may still be loading that one)
+
+    Unlinking a mapped file is safe on POSIX: the mapping keeps the data
+    until it is closed. Where the OS refuses (Windows), the version is
+    left for a later export.
+    """
+    for name in os.listdir(directory):
+        path = os.path.join(directory, name)
+        if name.startswith(VERSION_PREFIX) and name not in keep:
+            shutil.rmtree(path, ignore_errors=True)
+        elif name.endswith('.npy') and os.path.isfile(path):
+            # Columns of the layout without versions
+            try:
+                os.remove(path)
+            except OSError:
+                pass
+
+
+class EventTable:
+    """Read-only events table backed by memory-mapped column arrays.
+
+    Supports the parts of the DataFrame interface the API uses:
+    ``len``, ``columns``, ``table[column]`` and ``to_dict('records')``.
+    """
+
+    def __init__(self, columns: Dict[str, np.ndarray]):
+        self._columns = columns
+        self.columns = list(columns)
+        self._length = len(next(iter(columns.values()))) if columns else 0
+
+    @classmethod
+    def load(cls, directory: str, mmap: bool = True) -> 'EventTable':
+        with open(os.path.join(directory, MANIFEST), encoding='utf-8') as f:
+            manifest = json.load(f)
+        # Tables exported before versions had their columns next to the manifest
+        base = os.path.join(directory, manifest.get('version', ''))
+        mode = 'r' if mmap else None
+        return cls({
+            column: np.load(os.path.join(base, f'{column}.npy'), mmap_mode=mode, allow_pickle=False)
+            for column in manifest['columns']
+        })
+
+    @staticmethod
+    def exists(directory: str) -> bool:
+        return os.path.exists(os.path.join(directory, MANIFEST))
+
+    def __len__(self) -> int:
+        return self._length
+
+    def __getitem__(self, column: str) -> np.ndarray:
+        return self._columns[column]
+
+    def iter_records(self) -> Iterator[Dict]:
+        # One tolist() per column gives plain Python values without a per-cell conversion
+        values = [self._columns[column].tolist() for column in self.columns]
+        for row in zip(*values):
+            yield dict(zip(self.columns, row))
+
+    def to_dict(self, orient: str = 'records') -> List[Dict]:
+        if orient != 'records':
+            raise ValueError("EventTable only supports orient='records'")
+        return list(self.iter_records())
@@ -0,0 +1,209 @@
+"""
+A local stand-in for api.nasa.gov, for tests and load tests.
+
+Serves /planetary/apod, /neo/rest/v1/feed and /DONKI/{FLR,CME,GST} with
+deterministic data for any date range, enforces the NEO feed's 7-day
+limit and sends X-RateLimit-Remaining like the real API (429 once an
+optional quota is used up). Responses carry an ETag and Last-Modified and
+conditional requests that match get a 304. Every request is recorded so
+tests can check what a client asked for.
+"""
+
+import hashlib
+import json
+import random
+import threading
+import time
+from datetime import date, datetime, timedelta, timezone
+from email.utils import format_datetime
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Dict, List, Optional, Tuple
+from urllib.parse import parse_qsl, urlencode, urlsplit
+
+NEO_MAX_DAYS = 7
+
+
+def _days(start: date, end: date) -> List[date]:
+    return [start + timedelta(days=offset) for offset in range((end - start).days + 1)]
+
+
+def apod_entry(day: date) -> Dict:
+    return {
+        'date': day.isoformat(),
+        'title': f"Astronomy Picture for {day.isoformat()}",
+        'explanation': f"What the sky looked like on {day:%B %d, %Y}.",
+        'url': f"https://apod.nasa.gov/apod/image/{day:%y%m%d}.jpg",
+        'media_type': 'image',
+        'service_version': 'v1'
+    }
+
+
+def neo_objects(day: date, per_day: int) -> List[Dict]:
+    objects = []
+    for i in range(per_day):
+        rng = random.Random(f"{day.isoformat()}-{i}")
+        miss_km = rng.uniform(2e5, 7.5e7)
+        velocity_kmh = rng.uniform(1.5e4, 1.5e5)
+        diameter_km = rng.uniform(0.005, 2.0)
+        objects.append({
+            'id': f"{day:%Y%m%d}{i:03d}",
+            'neo_reference_id': f"{day:%Y%m%d}{i:03d}",
+            'name': f"({day.year} {chr(65 + day.month)}{chr(65 + i % 26)}{day.day})",
+            'absolute_magnitude_h': round(rng.uniform(17, 30), 2),
+            'estimated_diameter': {'kilometers': {'estimated_diameter_min': diameter_km / 2.2,
+                                                  'estimated_diameter_max': diameter_km}},
+            'is_potentially_hazardous_asteroid': miss_km < 7.5e6 and diameter_km > 0.14,
+            'close_approach_data': [{
+                'close_approach_date': day.isoformat(),
+                'epoch_date_close_approach': int(time.mktime(day.timetuple())) * 1000,
+                'relative_velocity': {'kilometers_per_second': repr(velocity_kmh / 3600),
+                                      'kilometers_per_hour': repr(velocity_kmh),
+                                      'miles_per_hour': repr(velocity_kmh / 1.609344)},
+                'miss_distance': {'astronomical': repr(miss_km / 149597870.7),
+                                  'lunar': repr(miss_km / 384400),
+                                  'kilometers': repr(miss_km),
+                                  'miles': repr(miss_km / 1.609344)},
+                'orbiting_body': 'Earth'
+            }]
+        })
+    return objects
+
+
+def donki_entries(kind: str, day: date) -> List[Dict]:
+    ordinal = day.toordinal()
+    stamp = f"{day.isoformat()}T{ordinal % 24:02d}:00Z"
+    link = f"https://webtools.ccmc.gsfc.nasa.gov/DONKI/view/{kind}/{ordinal}/-1"
+    if kind == 'FLR' and ordinal % 3 == 0:
+        return [{'flrID': f"{stamp[:-1]}-FLR-001", 'beginTime': stamp, 'peakTime': stamp,
+                 'classType': f"{'CMX'[ordinal % 3]}{ordinal % 9 + 1}.{ordinal % 7}",
+                 'sourceLocation': f"N{ordinal % 30:02d}E{ordinal % 60:02d}", 'link': link}]
+    if kind == 'CME' and ordinal % 2 == 0:
+        return [{'activityID': f"{stamp[:-1]}-CME-001", 'startTime': stamp,
+                 'note': "Faint CME seen in coronagraph imagery.", 'link': link}]
+    if kind == 'GST' and ordinal % 5 == 0:
+        return [{'gstID': f"{stamp[:-1]}-GST-001", 'startTime': stamp,
+                 'allKpIndex': [{'observedTime': stamp, 'kpIndex': 5 + ordinal % 4, 'source': 'NOAA'}],
+                 'link': link}]
+    return []
+
+
+class FakeNasa:
+    """api.nasa.gov on an ephemeral local port (``start()``, then use ``url``)"""
+
+    def __init__(self, quota: Optional[int] = None, delay: float = 0.0, neo_per_day: int = 5,
+                 validators: bool = True):
+        self.quota = quota
+        self.delay = delay
+        self.neo_per_day = neo_per_day
+        self.validators = validators  # send ETag/Last-Modified and honour conditional requests
+        self.requests = []  # (path, params) of every request, in order
+        self.not_modified = 0
+        self.bytes_sent = 0
+        self._lock = threading.Lock()
+        self._server = None
+
+    @property
+    def url(self) -> str:
+        return f"http://127.0.0.1:{self._server.server_port}"
+
+    def start(self) -> 'FakeNasa':
+        fake = self
+
+        class Handler(BaseHTTPRequestHandler):
+            def do_GET(self):
+                split = urlsplit(self.path)
+                status, body, headers = fake.handle(split.path, dict(parse_qsl(split.query)), dict(self.headers))
+                data = json.dumps(body).encode() if status != 304 else b''
+                with fake._lock:
+                    fake.bytes_sent += len(data)
+                self.send_response(status)
+                self.send_header('Content-Type', 'application/json')
+                self.send_header('Content-Length', str(len(data)))
+                for name, value in headers.items():
+                    self.send_header(name, value)
+                self.end_headers()
+                self.wfile.write(data)
+
+            def log_message(self, *args):
+                pass
+
+        self._server = ThreadingHTTPServer(('127.0.0.1', 0), Handler)
+        threading.Thread(target=self._server.serve_forever, name='fake-nasa', daemon=True).start()
+        return self
+
+    def stop(self) -> None:
+        if self._server is not None:
+            self._server.shutdown()
+            self._server.server_close()
+
+    def calls(self, path_prefix: str = '') -> List[Tuple[str, Dict]]:
+        with self._lock:
+            return [call for call in self.requests if call[0].startswith(path_prefix)]
+
+    def handle(self, path: str, params: Dict, request_headers: Optional[Dict] = None) -> Tuple[int, object, Dict]:
+        """(status, JSON body, extra headers) for one request"""
+        time.sleep(self.delay)
+        with self._lock:
+            self.requests.append((path, params))
+            if self.quota is not None:
+                if self.quota <= 0:
+                    return 429, {'error': {'code': 'OVER_RATE_LIMIT'}}, {'X-RateLimit-Remaining': '0'}
+                self.quota -= 1
+            headers = {'X-RateLimit-Limit': '1000',
+                       'X-RateLimit-Remaining': str(self.quota if self.quota is not None else 999)}
+        try:
+            body = self._body(path, params)
+            if self.validators:
+                etag = '"%s"' % hashlib.sha1(json.dumps(body, sort_keys=True).encode()).hexdigest()[:16]
+                headers.update(ETag=etag, **{'Last-Modified': self._last_modified(params)})
+                request_headers = request_headers or {}
+                if request_headers.get('If-None-Match') == etag or (
+                        'If-None-Match' not in request_headers
+                        and request_headers.get('If-Modified-Since') == headers['Last-Modified']):
+                    with self._lock:
+                        self.not_modified += 1
+                    return 304, None, headers
+            return 200, body, headers
+        except LookupError:
+            return 404, {'error': f"No route for {path}"}, headers
+        except ValueError as e:
+            return 400, {'error_message': str(e)}, headers
+
+    @staticmethod
+    def _last_modified(params: Dict) -> str:
+        # Data for a date is final from the next day on
+        last = params.get('end_date') or params.get('endDate') or params.get('start_date') or date.today().isoformat()
+        published = datetime.combine(min(date.fromisoformat(last) + timedelta(days=1), date.today()),
+                                     datetime.min.time(), tzinfo=timezone.utc)
+        return format_datetime(published, usegmt=True)
+
+    def _body(self, path: str, params: Dict):
+        today = date.today()
+        start = date.fromisoformat(params.get('start_date') or params.get('startDate') or today.isoformat())
+        end = date.fromisoformat(params.get('end_date') or params.get('endDate') or start.isoformat())
+        if end < start:
+            raise ValueError("end_date is before start_date")
+
+        if path == '/planetary/apod':
+            if 'start_date' not in params:
+                return [apod_entry(today)] if 'count' in params else apod_entry(today)
+            return [apod_entry(day) for day in _days(start, min(end, today))]
+        if path == '/neo/rest/v1/feed':
+            if (end - start).days >= NEO_MAX_DAYS + 1:
+                raise ValueError(f"The Feed date limit is only {NEO_MAX_DAYS} Days")
+            objects = {day.isoformat(): neo_objects(day, self.neo_per_day) for day in _days(start, end)}
+            link = lambda first, last: f"{self.url}{path}?" + urlencode(
+                {'start_date': first.isoformat(), 'end_date': last.isoformat()})
+            span = timedelta(days=(end - start).days + 1)
+            return {
+                'links': {'self': link(start, end), 'next': link(start + span, end + span),
+                          'previous': link(start - span, end - span)},
+                'element_count': sum(len(day_objects) for day_objects in objects.values()),
+                'near_earth_objects': objects
+            }
+        if path.startswith('/DONKI/'):
+            kind = path.rsplit('/', 1)[-1]
+            if kind not in ('FLR', 'CME', 'GST'):
+                raise LookupError(kind)
+            return [entry for day in _days(start, end) for entry in donki_entries(kind, day)]
+        raise LookupError(path)
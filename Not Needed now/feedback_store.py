@@ -0,0 +1,224 @@
+"""
+Buffered feedback ingestion.
+
+/feedback used to open user_feedback.jsonl, append one line and close it
+on every request, with every worker appending to the same file. Here each
+process queues feedback in memory and a writer thread appends it in
+batches to the process's own segment file, so workers never share a file
+descriptor and lines cannot interleave. Batches are flushed when
+``batch_size`` records are waiting or every ``flush_interval`` seconds.
+
+fsync policy:
+    'always'    submit() waits until the batch holding its record is written
+                and fsynced, so nothing acknowledged is lost on power failure.
+                Batches are written as soon as anything is queued, and
+                concurrent submits share one fsync.
+    'interval'  submit() returns once queued; fsync at most every
+                ``fsync_interval`` seconds
+    'never'     submit() returns once queued; leave syncing to the OS
+"""
+
+import atexit
+import glob
+import json
+import logging
+import os
+import queue
+import socket
+import threading
+import time
+from typing import Dict, Iterator, List, Optional
+
+logger = logging.getLogger(__name__)
+
+FSYNC_POLICIES = ('always', 'interval', 'never')
+SEGMENT_PATTERN = 'feedback-*.jsonl'
+_STOP = object()  # queued by close() to stop the writer thread
+
+
+class _Ack:
+    """Set once a record's batch is on disk, for submits in 'always' mode"""
+
+    __slots__ = ('event', 'ok')
+
+    def __init__(self):
+        self.event = threading.Event()
+        self.ok = False
+
+
+class FeedbackWriter:
+    """Queues feedback records and appends them in batches to a per-process segment file"""
+
+    def __init__(self, directory: str = 'feedback', batch_size: int = 500,
+                 flush_interval: float = 1.0, fsync: str = 'interval', fsync_interval: float = 1.0,
+                 max_queue: int = 100000, segment_max_bytes: int = 64 * 1024 * 1024,
+                 ack_timeout: float = 5.0):
+        if fsync not in FSYNC_POLICIES:
+            raise ValueError(f"fsync must be one of {FSYNC_POLICIES}, got {fsync!r}")
+        self.directory = directory
+        self.batch_size = batch_size
+        self.flush_interval = flush_interval
+        self.fsync = fsync
+        self.fsync_interval = fsync_interval
+        self.segment_max_bytes = segment_max_bytes
+        self.ack_timeout = ack_timeout
+        self._queue = queue.Queue(maxsize=max_queue)
+        self._lock = threading.Lock()
+        self._write_lock = threading.Lock()
+        self._thread = None
+        self._pid = None
+        self._file = None
+        self._segment_path = None
+        self._last_fsync = 0.0
+        self.written = 0
+        self.dropped = 0
+        self.batches = 0
+        atexit.register(self.close)
+
+    @classmethod
+    def from_config(cls, config) -> 'FeedbackWriter':
+        return cls(
+            directory=config.FEEDBACK_DIR,
+            batch_size=config.FEEDBACK_BATCH_SIZE,
+            flush_interval=config.FEEDBACK_FLUSH_INTERVAL,
+            fsync=config.FEEDBACK_FSYNC,
+            segment_max_bytes=config.FEEDBACK_SEGMENT_MAX_BYTES
+        )
+
+    def _ensure_writer(self) -> None:
+        # Threads do not survive fork, and a forked worker needs its own segment
+        if self._pid == os.getpid() and self._thread is not None:
+            return
+        with self._lock:
+            if self._pid != os.getpid() or self._thread is None:
+                self._pid = os.getpid()
+                self._file = None
+                self._thread = threading.Thread(target=self._run, name='feedback-writer', daemon=True)
+                self._thread.start()
+
+    def submit(self, record: Dict) -> bool:
+        """Queue one feedback record; returns False if the queue is full.
+
+        With fsync='always' this also waits (up to ``ack_timeout``) for the
+        record to be fsynced, and returns False if that fails or times out.
+        """
+        self._ensure_writer()
+        ack = _Ack() if self.fsync == 'always' else None
+        try:
+            self._queue.put_nowait((record, ack))
+        except queue.Full:
+            self.dropped += 1
+            return False
+        if ack is None:
+            return True
+        return ack.event.wait(self.ack_timeout) and ack.ok
+
+    def _run(self) -> None:
+        while True:
+            try:
+                first = self._queue.get(timeout=self.flush_interval)
+            except queue.Empty:
+                continue
+            if first is _STOP:
+                return
+            batch = [first]
+            # Give a burst up to flush_interval to fill the batch before writing;
+            # in 'always' mode submitters are waiting, so take only what is already queued
+            deadline = time.monotonic() + (0.0 if self.fsync == 'always' else self.flush_interval)
+            while len(batch) < self.batch_size:
+                try:
+                    item = self._queue.get(timeout=max(0.0, deadline - time.monotonic()))
+                except queue.Empty:
+                    break
+                if item is _STOP:
+                    self._write(batch)
+                    return
+                batch.append(item)
+            self._write(batch)
+
+    def _open_segment(self) -> None:
+        os.makedirs(self.directory, exist_ok=True)
+        # Host, pid and start time keep segments unique across workers and restarts
+        name = f"feedback-{socket.gethostname()}-{os.getpid()}-{time.time_ns()}.jsonl"
+        self._segment_path = os.path.join(self.directory, name)
+        self._file = open(self._segment_path, 'a', encoding='utf-8')
+
+    def _write(self, batch: List[tuple]) -> None:
+        """Append a batch of (record, ack) and release any submitters waiting on it"""
+        data = ''.join(json.dumps(record, default=str) + '\n' for record, _ in batch)
+        ok = False
+        with self._write_lock:
+            try:
+                if self._file is None or self._file.tell() >= self.segment_max_bytes:
+                    if self._file is not None:
+                        self._sync(force=True)
+                        self._file.close()
+                    self._open_segment()
+                self._file.write(data)
+                self._file.flush()
+                self._sync()
+                self.written += len(batch)
+                self.batches += 1
+                ok = True
+            except OSError as e:
+                logger.error(f"Failed to save feedback batch of {len(batch)}: {e}")
+                self.dropped += len(batch)
+        for _, ack in batch:
+            if ack is not None:
+                ack.ok = ok
+                ack.event.set()
+
+    def _sync(self, force: bool = False) -> None:
+        if self.fsync == 'never' and not force:
+            return
+        now = time.monotonic()
+        if force or self.fsync == 'always' or now - self._last_fsync >= self.fsync_interval:
+            os.fsync(self._file.fileno())
+            self._last_fsync = now
+
+    def close(self) -> None:
+        """Write out everything queued and close the segment"""
+        with self._lock:
+            thread, self._thread = self._thread, None
+        if thread is not None and thread.is_alive() and self._pid == os.getpid():
+            # The writer thread drains what is queued ahead of the sentinel, in order
+            try:
+                self._queue.put(_STOP, timeout=5)
+                thread.join(timeout=30)
+            except queue.Full:
+                logger.error("Feedback writer did not drain its queue before shutdown")
+        with self._write_lock:
+            if self._file is not None:
+                self._sync(force=True)
+                self._file.close()
+                self._file = None
+
+    def stats(self) -> Dict:
+        return {
+            "queued": self._queue.qsize(),
+            "written": self.written,
+            "batches": self.batches,
+            "dropped": self.dropped,
+            "fsync": self.fsync,
+            "segment": self._segment_path
+        }
+
+
+def segment_paths(directory: str) -> List[str]:
+    """Every feedback segment in ``directory``, oldest first"""
+    return sorted(glob.glob(os.path.join(directory, SEGMENT_PATTERN)), key=os.path.getmtime)
+
+
+def read_feedback(directory: str, legacy_file: Optional[str] = 'user_feedback.jsonl') -> Iterator[Dict]:
+    """Yield every stored feedback record, including the pre-segment JSONL file if present"""
+    paths = segment_paths(directory)
+    if legacy_file and os.path.exists(legacy_file):
+        paths.insert(0, legacy_file)
+    for path in paths:
+        with open(path, encoding='utf-8') as f:
+            for line in f:
+                # A worker killed mid-write can leave a partial last line
+                try:
+                    yield json.loads(line)
+                except ValueError:
+                    continue
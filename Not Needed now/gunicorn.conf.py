@@ -0,0 +1,36 @@
+"""
+Gunicorn settings for enhanced_app:
+
+    gunicorn -c gunicorn.conf.py wsgi:app
+
+Environment:
+    WEB_CONCURRENCY   number of worker processes (default: 2 per CPU + 1)
+    PORT              port to bind (default: 5000)
+    PRELOAD_APP       set to 0 to have every worker load its own model and data
+    GUNICORN_THREADS  threads per worker (default 1); with more, identical
+                      concurrent /recommend calls in a worker share one computation
+"""
+
+import multiprocessing
+import os
+
+bind = f"0.0.0.0:{os.environ.get('PORT', '5000')}"
+workers = int(os.environ.get('WEB_CONCURRENCY', multiprocessing.cpu_count() * 2 + 1))
+preload_app = os.environ.get('PRELOAD_APP', '1') != '0'
+threads = int(os.environ.get('GUNICORN_THREADS', '1'))
+timeout = 30
+
+
+def post_worker_init(worker):
+    # Threads do not survive fork, so each worker polls for new artifacts itself.
+    # A version swapped in later is private to the worker that loaded it;
+    # restart the workers to share it again.
+    from enhanced_app import model_manager
+    model_manager.start()
+
+
+def child_exit(server, worker):
+    # Keep an exited worker's counts in the totals, and out of the way of a
+    # new worker that gets the same PID
+    from metrics import retire_snapshot
+    retire_snapshot(os.environ.get('METRICS_DIR'), worker.pid)
@@ -0,0 +1,213 @@
+"""
+Single-pass inference for the space events recommender.
+
+The recommendation endpoints score a fixed grid of duration/popularity
+combinations for one set of user preferences. Going through the sklearn
+pipeline for that means building a DataFrame, running the ColumnTransformer
+and walking the tree twice (predict + predict_proba). GridScorer does the
+one-hot/scaling itself into a reused NumPy buffer and calls the tree once.
+It also accepts a CompiledModel, in which case sklearn is not needed at all.
+"""
+
+import threading
+from typing import Dict, List, Sequence, Tuple
+
+import numpy as np
+
+from compiled_model import CompiledModel, case_insensitive_lookup
+
+CATEGORICAL_FEATURES = ['event_type', 'location', 'time_of_day']
+NUMERICAL_FEATURES = ['duration', 'popularity_score']
+
+# Duration/popularity combinations scored for every preference set
+DEFAULT_DURATIONS = (60, 120, 180, 240, 300)
+DEFAULT_POPULARITY_SCORES = (7.0, 7.5, 8.0, 8.5, 9.0)
+
+
+class GridScorer:
+    """Score the recommendation grid for one preference set in a single tree pass"""
+
+    def __init__(self, model, durations=DEFAULT_DURATIONS,
+                 popularity_scores=DEFAULT_POPULARITY_SCORES):
+        # Grid rows in the same order the endpoints used to build them
+        self.durations = np.repeat(np.asarray(durations, dtype=np.int64), len(popularity_scores))
+        self.popularity_scores = np.tile(np.asarray(popularity_scores, dtype=np.float64), len(durations))
+        self.n_rows = len(self.durations)
+        grid = {'duration': self.durations, 'popularity_score': self.popularity_scores}
+
+        if isinstance(model, CompiledModel):
+            self.compiled = model
+            self.classes_ = model.classes_
+            self._scaled_grid = model.scale_numeric(
+                np.column_stack([grid[column] for column in model.numeric_columns])
+            )
+            return
+
+        self.compiled = None
+        preprocessor = model.named_steps['preprocessor']
+        self.classifier = model.named_steps['classifier']
+        self.classes_ = self.classifier.classes_
+
+        # Work out where each transformer writes into the encoded feature row
+        self._category_columns = {}
+        numeric_offset = None
+        numeric_columns = []
+        numeric_scaler = None
+        offset = 0
+        for name, transformer, columns in preprocessor.transformers_:
+            if name == 'cat':
+                drop_idx = getattr(transformer, 'drop_idx_', None)
+                for position, column in enumerate(columns):
+                    codes = {}
+                    for index, category in enumerate(transformer.categories_[position]):
+                        if drop_idx is not None and drop_idx[position] == index:
+                            codes[category] = None
+                        else:
+                            codes[category] = offset
+                            offset += 1
+                    self._category_columns[column] = case_insensitive_lookup(column, codes)
+            elif name == 'num':
+                numeric_offset = offset
+                numeric_columns = list(columns)
+                numeric_scaler = transformer
+                offset += len(columns)
+
+        self.n_features = offset
+        self._numeric_offset = numeric_offset
+
+        numeric = np.column_stack([grid[column] for column in numeric_columns]).astype(np.float64)
+        if numeric_scaler is not None:
+            # Same arithmetic as StandardScaler.transform, without the feature-name checks
+            if numeric_scaler.mean_ is not None:
+                numeric -= numeric_scaler.mean_
+            if numeric_scaler.scale_ is not None:
+                numeric /= numeric_scaler.scale_
+
+        # The tree evaluates on float32, so keep the buffer in that dtype
+        self._template = np.zeros((self.n_rows, self.n_features), dtype=np.float32)
+        self._template[:, numeric_offset:numeric_offset + numeric.shape[1]] = numeric
+        self._local = threading.local()
+
+    def _buffer(self) -> np.ndarray:
+        """Per-thread feature buffer, allocated once and reused across requests"""
+        buffer = getattr(self._local, 'buffer', None)
+        if buffer is None:
+            buffer = self._template.copy()
+            self._local.buffer = buffer
+        return buffer
+
+    def _one_hot_indices(self, preferences: Dict) -> List[int]:
+        """Encoded feature columns set to 1 for ``preferences``"""
+        indices = []
+        for column, lookup in self._category_columns.items():
+            value = str(preferences.get(column, '')).lower()
+            if value not in lookup:
+                raise ValueError(f"Found unknown category {preferences.get(column)!r} in column {column}")
+            if lookup[value] is not None:
+                indices.append(lookup[value])
+        return indices
+
+    def encode(self, preferences: Dict, out: np.ndarray) -> np.ndarray:
+        """Write the one-hot block for ``preferences`` into every row of ``out``"""
+        out[:, :self._numeric_offset] = 0.0
+        for index in self._one_hot_indices(preferences):
+            out[:, index] = 1.0
+        return out
+
+    def encode_many(self, preferences_list: Sequence[Dict]) -> np.ndarray:
+        """Stack the grids for several preference sets into one feature matrix"""
+        features = np.tile(self._template, (len(preferences_list), 1))
+        rows, columns = [], []
+        for position, preferences in enumerate(preferences_list):
+            try:
+                indices = self._one_hot_indices(preferences)
+            except ValueError as e:
+                raise ValueError(f"preferences[{position}]: {e}") from None
+            start = position * self.n_rows
+            for index in indices:
+                rows.append(np.arange(start, start + self.n_rows))
+                columns.append(np.full(self.n_rows, index))
+        if rows:
+            features[np.concatenate(rows), np.concatenate(columns)] = 1.0
+        return features
+
+    def score(self, preferences: Dict) -> Tuple[np.ndarray, np.ndarray]:
+        """Return (predicted_like, like_probability) arrays for the grid"""
+        if self.compiled is not None:
+            codes = np.array(self.compiled.encode_categories(preferences), dtype=np.int32)
+            probabilities = self.compiled.predict_proba_encoded(
+                np.broadcast_to(codes, (self.n_rows, len(codes))), self._scaled_grid
+            )
+        else:
+            features = self.encode(preferences, self._buffer())
+            probabilities = self.classifier.predict_proba(features)
+        predicted = self.classes_.take(np.argmax(probabilities, axis=1))
+        return predicted, probabilities[:, 1]
+
+    def score_many(self, preferences_list: Sequence[Dict]) -> Tuple[np.ndarray, np.ndarray]:
+        """Score every preference set's grid in one model pass.
+
+        Returns (predicted_like, like_probability) arrays shaped
+        (len(preferences_list), n_rows).
+        """
+        n_profiles = len(preferences_list)
+        if self.compiled is not None:
+            codes = []
+            for position, preferences in enumerate(preferences_list):
+                try:
+                    codes.append(self.compiled.encode_categories(preferences))
+                except ValueError as e:
+                    raise ValueError(f"preferences[{position}]: {e}") from None
+            codes = np.array(codes, dtype=np.int32).reshape(n_profiles, len(self.compiled.categorical_columns))
+            probabilities = self.compiled.predict_proba_encoded(
+                np.repeat(codes, self.n_rows, axis=0), np.tile(self._scaled_grid, (n_profiles, 1))
+            )
+        else:
+            probabilities = self.classifier.predict_proba(self.encode_many(preferences_list))
+        predicted = self.classes_.take(np.argmax(probabilities, axis=1))
+        return (predicted.reshape(n_profiles, self.n_rows),
+                probabilities[:, 1].reshape(n_profiles, self.n_rows))
+
+    def _grid_rows(self, preferences: Dict, order, predicted: np.ndarray,
+                   like_probability: np.ndarray) -> List[Dict]:
+        return [
+            {
+                'event_type': preferences['event_type'],
+                'location': preferences['location'],
+                'time_of_day': preferences['time_of_day'],
+                'duration': int(self.durations[i]),
+                'popularity_score': float(self.popularity_scores[i]),
+                'predicted_like': int(predicted[i]),
+                'like_probability': float(like_probability[i])
+            }
+            for i in order
+        ]
+
+    def recommend(self, preferences: Dict, limit: int) -> List[Dict]:
+        """Top ``limit`` liked grid rows by like probability (empty if none are liked)"""
+        predicted, like_probability = self.score(preferences)
+        liked = np.flatnonzero(predicted == 1)
+        if len(liked) == 0:
+            return []
+
+        # Stable sort keeps the first row on ties, like DataFrame.nlargest
+        order = liked[np.argsort(-like_probability[liked], kind='stable')[:limit]]
+        return self._grid_rows(preferences, order, predicted, like_probability)
+
+    def recommend_many(self, preferences_list: Sequence[Dict], limit: int) -> List[List[Dict]]:
+        """``recommend`` for several preference sets, sharing one model pass"""
+        if len(preferences_list) == 0:
+            return []
+
+        predicted, like_probability = self.score_many(preferences_list)
+        liked = predicted == 1
+
+        # Rank every profile at once; rows that are not liked sort last and are dropped
+        masked = np.where(liked, like_probability, -np.inf)
+        order = np.argsort(-masked, axis=1, kind='stable')[:, :limit]
+
+        results = []
+        for position, preferences in enumerate(preferences_list):
+            top = [i for i in order[position] if liked[position, i]]
+            results.append(self._grid_rows(preferences, top, predicted[position], like_probability[position]))
+        return results
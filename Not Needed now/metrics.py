@@ -0,0 +1,353 @@
+"""
+In-process metrics: counters and bucketed latency histograms.
+
+Every thread records into its own shard, so the hot path takes no locks;
+readers sum the shards. With several gunicorn workers each process
+periodically writes a JSON snapshot to a shared directory, and a scrape
+sums the snapshots of every worker. When a worker exits, gunicorn's
+child_exit hook folds its snapshot into retired.json (see
+``retire_snapshot``), so totals keep counting it and a new worker that
+reuses the PID starts from zero. A snapshot that has not been rewritten
+for ``stale_after`` seconds belongs to a worker that died without the
+hook and is dropped. Output is Prometheus text format, or a compact
+summary with p50/p95/p99 for /stats.
+"""
+
+import glob
+import json
+import os
+import threading
+import time
+import weakref
+from contextlib import contextmanager
+from typing import Callable, Dict, Iterable, List, Optional, Tuple
+
+# Upper bounds in seconds, from sub-millisecond inference up to slow upstream calls
+DEFAULT_BUCKETS = (0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+
+LabelKey = Tuple[Tuple[str, str], ...]
+
+RETIRED = 'retired.json'  # totals of workers that have exited
+
+
+def _label_key(labels: Optional[Dict]) -> LabelKey:
+    return tuple(sorted((str(k), str(v)) for k, v in labels.items())) if labels else ()
+
+
+class _Shard:
+    """Metrics recorded by one thread; only that thread ever writes to it"""
+
+    def __init__(self, n_buckets: int):
+        self.n_buckets = n_buckets
+        self.counters = {}
+        self.histograms = {}  # key -> [bucket counts..., +Inf count, sum]
+
+    def merge_into(self, counters: Dict, histograms: Dict) -> None:
+        for key, value in list(self.counters.items()):
+            counters[key] = counters.get(key, 0) + value
+        for key, entry in list(self.histograms.items()):
+            entry = list(entry)
+            total = histograms.setdefault(key, [0] * (self.n_buckets + 1) + [0.0])
+            for i, value in enumerate(entry):
+                total[i] += value
+
+
+class MetricsRegistry:
+    """Lock-free (per-thread sharded) counters and histograms with cross-process aggregation"""
+
+    def __init__(self, prefix: str = 'skyquest', buckets: Iterable[float] = DEFAULT_BUCKETS,
+                 snapshot_dir: Optional[str] = None, snapshot_interval: float = 5.0,
+                 stale_after: Optional[float] = None):
+        self.prefix = prefix
+        self.buckets = tuple(buckets)
+        self.snapshot_dir = snapshot_dir
+        self.snapshot_interval = snapshot_interval
+        # Live workers rewrite their snapshot every interval, even when idle
+        self.stale_after = stale_after if stale_after is not None else max(30.0, 6 * snapshot_interval)
+        self.started = time.time()
+        self._local = threading.local()
+        self._shards = []  # (thread, shard) for every thread that recorded something
+        self._retired = _Shard(len(self.buckets))  # totals from threads that have exited
+        self._lock = threading.Lock()  # only taken when a thread registers or on collect
+        self._help = {}
+        self._gauges = {}
+        self._snapshot_pid = None
+        # A forked worker must not report the parent's counts as its own
+        ref = weakref.ref(self)
+        os.register_at_fork(after_in_child=lambda: ref() is not None and ref()._reset())
+
+    def _reset(self) -> None:
+        self._local = threading.local()
+        self._shards = []
+        self._retired = _Shard(len(self.buckets))
+        self._lock = threading.Lock()
+        self._snapshot_pid = None
+        self.started = time.time()
+
+    def describe(self, name: str, kind: str, help_text: str) -> None:
+        """Register the Prometheus TYPE and HELP for a metric"""
+        self._help[name] = (kind, help_text)
+
+    def gauge(self, name: str, func: Callable[[], Dict[LabelKey, float]], help_text: str = '',
+              kind: str = 'gauge') -> None:
+        """Value(s) read from ``func`` at collection time, e.g. cache statistics"""
+        self._gauges[name] = func
+        self.describe(name, kind, help_text)
+
+    def _shard(self) -> _Shard:
+        shard = getattr(self._local, 'shard', None)
+        if shard is None:
+            shard = self._local.shard = _Shard(len(self.buckets))
+            with self._lock:
+                # A threaded server starts a thread per request, so fold exited ones in as new ones arrive
+                self._prune_locked()
+                self._shards.append((threading.current_thread(), shard))
+            self._ensure_snapshots()
+        return shard
+
+    def inc(self, name: str, labels: Optional[Dict] = None, value: float = 1) -> None:
+        counters = self._shard().counters
+        key = (name, _label_key(labels))
+        counters[key] = counters.get(key, 0) + value
+
+    def observe(self, name: str, seconds: float, labels: Optional[Dict] = None) -> None:
+        histograms = self._shard().histograms
+        key = (name, _label_key(labels))
+        entry = histograms.get(key)
+        if entry is None:
+            entry = histograms[key] = [0] * (len(self.buckets) + 1) + [0.0]
+        # Linear scan: a dozen comparisons beat bisect's call overhead at this size
+        index = 0
+        for bound in self.buckets:
+            if seconds <= bound:
+                break
+            index += 1
+        entry[index] += 1
+        entry[-1] += seconds
+
+    @contextmanager
+    def timer(self, name: str, labels: Optional[Dict] = None):
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.observe(name, time.perf_counter() - start, labels)
+
+    def collect(self) -> Dict:
+        """This process's totals: {'counters': {key: value}, 'histograms': {key: [...]}}"""
+        counters, histograms = {}, {}
+        with self._lock:
+            self._prune_locked()
+            self._retired.merge_into(counters, histograms)
+            for _, shard in self._shards:
+                shard.merge_into(counters, histograms)
+
+        for name, func in self._gauges.items():
+            try:
+                for labels, value in func().items():
+                    counters[(name, labels)] = counters.get((name, labels), 0) + value
+            except Exception:
+                pass
+        # Point-in-time gauges are left out when a worker's totals are retired
+        gauges = sorted(name for name in self._gauges if self._help[name][0] == 'gauge')
+        return {'pid': os.getpid(), 'counters': counters, 'histograms': histograms, 'gauges': gauges}
+
+    def _prune_locked(self) -> None:
+        """Fold the shards of exited threads into the retired totals (caller holds the lock)"""
+        alive = []
+        for thread, shard in self._shards:
+            if thread.is_alive():
+                alive.append((thread, shard))
+            else:
+                shard.merge_into(self._retired.counters, self._retired.histograms)
+        self._shards = alive
+
+    # Cross-process aggregation
+
+    def _ensure_snapshots(self) -> None:
+        if self.snapshot_dir is None or self._snapshot_pid == os.getpid():
+            return
+        self._snapshot_pid = os.getpid()
+        thread = threading.Thread(target=self._snapshot_loop, name='metrics-snapshot', daemon=True)
+        thread.start()
+
+    def _snapshot_loop(self) -> None:
+        while True:
+            time.sleep(self.snapshot_interval)
+            self.write_snapshot()
+
+    def write_snapshot(self) -> None:
+        """Atomically publish this process's totals for other workers to aggregate"""
+        if self.snapshot_dir is None:
+            return
+        os.makedirs(self.snapshot_dir, exist_ok=True)
+        data = _encode(self.collect())
+        path = os.path.join(self.snapshot_dir, f'{os.getpid()}.json')
+        tmp_path = f'{path}.tmp'
+        with open(tmp_path, 'w', encoding='utf-8') as f:
+            json.dump(data, f)
+        os.replace(tmp_path, path)
+
+    def aggregate(self) -> Dict:
+        """Totals across every worker: live values for this process, snapshots for the others"""
+        totals = self.collect()
+        if self.snapshot_dir is None:
+            return totals
+        own = os.path.join(self.snapshot_dir, f'{os.getpid()}.json')
+        retired = os.path.join(self.snapshot_dir, RETIRED)
+        now = time.time()
+        for path in glob.glob(os.path.join(self.snapshot_dir, '*.json')):
+            if path == own:
+                continue
+            try:
+                if path != retired and now - os.path.getmtime(path) > self.stale_after:
+                    # Its worker died without child_exit retiring it
+                    os.remove(path)
+                    continue
+                with open(path, encoding='utf-8') as f:
+                    _add(totals, _decode(json.load(f)))
+            except (OSError, ValueError):
+                continue
+        return totals
+
+    # Output
+
+    def prometheus_text(self) -> str:
+        """Every metric in the Prometheus text exposition format"""
+        totals = self.aggregate()
+        lines = []
+        by_name = {}
+        for (name, labels), value in totals['counters'].items():
+            by_name.setdefault(name, []).append((labels, value))
+        for (name, labels), entry in totals['histograms'].items():
+            by_name.setdefault(name, []).append((labels, entry))
+
+        for name in sorted(by_name):
+            full_name = f'{self.prefix}_{name}'
+            default_kind = 'histogram' if name in {key[0] for key in totals['histograms']} else 'counter'
+            kind, help_text = self._help.get(name, (default_kind, ''))
+            if help_text:
+                lines.append(f'# HELP {full_name} {help_text}')
+            lines.append(f'# TYPE {full_name} {kind}')
+            for labels, value in sorted(by_name[name], key=lambda item: item[0]):
+                if kind != 'histogram':
+                    lines.append(f'{full_name}{_format_labels(labels)} {_format_value(value)}')
+                    continue
+                cumulative = 0
+                for bound, count in zip(self.buckets + (float('inf'),), value[:-1]):
+                    cumulative += count
+                    le = '+Inf' if bound == float('inf') else _format_value(bound)
+                    lines.append(f'{full_name}_bucket{_format_labels(labels + (("le", le),))} {cumulative}')
+                lines.append(f'{full_name}_sum{_format_labels(labels)} {_format_value(value[-1])}')
+                lines.append(f'{full_name}_count{_format_labels(labels)} {cumulative}')
+        return '\n'.join(lines) + '\n'
+
+    def summary(self) -> Dict:
+        """Counts, mean and p50/p95/p99 (milliseconds) for every histogram series"""
+        totals = self.aggregate()
+        result = {}
+        for (name, labels), entry in sorted(totals['histograms'].items()):
+            count = sum(entry[:-1])
+            series = result.setdefault(name, {})
+            label = ','.join(value for _, value in labels) or 'all'
+            series[label] = {
+                'count': count,
+                'mean_ms': round(entry[-1] / count * 1000, 3) if count else 0.0,
+                'p50_ms': round(self.percentile(entry, 0.50) * 1000, 3),
+                'p95_ms': round(self.percentile(entry, 0.95) * 1000, 3),
+                'p99_ms': round(self.percentile(entry, 0.99) * 1000, 3),
+            }
+        return {'counters': _counter_summary(totals['counters']), 'latency': result,
+                'uptime_seconds': round(time.time() - self.started, 1)}
+
+    def percentile(self, entry: List[float], q: float) -> float:
+        """Estimate a quantile from bucket counts, interpolating within the bucket"""
+        counts = entry[:-1]
+        total = sum(counts)
+        if total == 0:
+            return 0.0
+        rank = q * total
+        seen = 0
+        lower = 0.0
+        for bound, count in zip(self.buckets, counts):
+            if count and seen + count >= rank:
+                return lower + (bound - lower) * (rank - seen) / count
+            seen += count
+            lower = bound
+        # Beyond the last finite bucket the best estimate is its upper bound
+        return self.buckets[-1]
+
+
+def retire_snapshot(snapshot_dir: Optional[str], pid: int) -> None:
+    """Fold an exited worker's snapshot into retired.json; call from gunicorn's child_exit (in the master)"""
+    if snapshot_dir is None:
+        return
+    path = os.path.join(snapshot_dir, f'{pid}.json')
+    retired_path = os.path.join(snapshot_dir, RETIRED)
+    try:
+        with open(path, encoding='utf-8') as f:
+            snapshot = _decode(json.load(f))
+    except (OSError, ValueError):
+        return
+    try:
+        with open(retired_path, encoding='utf-8') as f:
+            retired = _decode(json.load(f))
+    except (OSError, ValueError):
+        retired = {'pid': 0, 'counters': {}, 'histograms': {}, 'gauges': []}
+    gauges = set(snapshot['gauges'])
+    snapshot['counters'] = {key: value for key, value in snapshot['counters'].items() if key[0] not in gauges}
+    _add(retired, snapshot)
+    tmp_path = f'{retired_path}.tmp'
+    with open(tmp_path, 'w', encoding='utf-8') as f:
+        json.dump(_encode(retired), f)
+    os.replace(tmp_path, retired_path)
+    os.remove(path)
+
+
+def _add(totals: Dict, other: Dict) -> None:
+    for key, value in other['counters'].items():
+        totals['counters'][key] = totals['counters'].get(key, 0) + value
+    for key, entry in other['histograms'].items():
+        total = totals['histograms'].setdefault(key, [0] * len(entry))
+        for i, value in enumerate(entry):
+            total[i] += value
+
+
+def _counter_summary(counters: Dict) -> Dict:
+    summary = {}
+    for (name, labels), value in sorted(counters.items()):
+        label = ','.join(f'{k}={v}' for k, v in labels) or 'all'
+        summary.setdefault(name, {})[label] = value
+    return summary
+
+
+def _format_labels(labels: LabelKey) -> str:
+    if not labels:
+        return ''
+    escaped = (k + '="' + v.replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n') + '"'
+               for k, v in labels)
+    return '{' + ','.join(escaped) + '}'
+
+
+def _format_value(value: float) -> str:
+    return repr(float(value)) if isinstance(value, float) else str(value)
+
+
+def _encode(totals: Dict) -> Dict:
+    return {
+        'pid': totals['pid'],
+        'counters': [[name, list(map(list, labels)), value] for (name, labels), value in totals['counters'].items()],
+        'histograms': [[name, list(map(list, labels)), entry] for (name, labels), entry in totals['histograms'].items()],
+        'gauges': totals.get('gauges', []),
+    }
+
+
+def _decode(data: Dict) -> Dict:
+    def key(name, labels):
+        return name, tuple(tuple(pair) for pair in labels)
+    return {
+        'pid': data['pid'],
+        'counters': {key(name, labels): value for name, labels, value in data['counters']},
+        'histograms': {key(name, labels): entry for name, labels, entry in data['histograms']},
+        'gauges': data.get('gauges', []),
+    }
@@ -0,0 +1,123 @@
+"""
+Zero-downtime model reloads.
+
+Each loaded version is an immutable snapshot holding the model and
+everything derived from it (scorer, event indexes, ...). Request handlers
+read ``manager.current`` once and use only that snapshot, so a request that
+is running when a new version lands finishes on the version it started
+with. A background thread polls the artifact version; when it changes the
+next snapshot is built, warmed up and validated off the request path, and
+only then does a single reference assignment make it current. A version
+that fails to load or validate is logged and skipped until the artifacts
+change again, and the old snapshot keeps serving.
+"""
+
+import logging
+import threading
+import time
+from datetime import datetime, timezone
+from typing import Any, Callable, Dict, Optional
+
+logger = logging.getLogger(__name__)
+
+
+class ModelManager:
+    """Loads model snapshots in the background and swaps them in atomically"""
+
+    def __init__(self, loader: Callable[[str], Any], version_func: Callable[[], str],
+                 warm_up: Optional[Callable[[Any], None]] = None,
+                 validate: Optional[Callable[[Any], None]] = None,
+                 on_swap: Optional[Callable[[Any], None]] = None, interval: float = 5.0):
+        self.loader = loader
+        self.version_func = version_func
+        self.warm_up = warm_up
+        self.validate = validate
+        self.on_swap = on_swap
+        self.interval = interval
+        self._current = None
+        self._version = ''
+        self._loaded_at = None
+        self._load_seconds = None
+        self._rejected_version = None
+        self._reload_lock = threading.Lock()  # one load at a time; readers never take it
+        self._thread = None
+        self.swap_count = 0
+        self.failed_reloads = 0
+        self.last_error = None
+
+    @property
+    def current(self) -> Any:
+        """The snapshot to serve from; take it once per request"""
+        return self._current
+
+    @property
+    def version(self) -> str:
+        return self._version
+
+    def reload(self, force: bool = False) -> bool:
+        """Load, warm up and validate the published version, then swap it in.
+
+        Returns True if a new snapshot became current. Raises if the load,
+        warm-up or validation fails; the current snapshot is left in place.
+        """
+        with self._reload_lock:
+            version = self.version_func()
+            if not force and (version == self._version or version == self._rejected_version):
+                return False
+
+            start = time.perf_counter()
+            try:
+                snapshot = self.loader(version)
+                if self.warm_up is not None:
+                    self.warm_up(snapshot)
+                if self.validate is not None:
+                    self.validate(snapshot)
+            except Exception as e:
+                # Do not retry the same broken artifacts every tick
+                self._rejected_version = version
+                self.failed_reloads += 1
+                self.last_error = f"{version}: {e}"
+                raise
+
+            load_seconds = time.perf_counter() - start
+            first_load = self._current is None
+            # Requests that already hold the old snapshot keep using it
+            self._current = snapshot
+            self._version = version
+            self._loaded_at = datetime.now(timezone.utc)
+            self._load_seconds = load_seconds
+            self._rejected_version = None
+            if not first_load:
+                self.swap_count += 1
+            if self.on_swap is not None:
+                self.on_swap(snapshot)
+            logger.info(f"Model version {version} is live (loaded in {load_seconds * 1000:.1f} ms)")
+            return True
+
+    def start(self) -> threading.Thread:
+        """Poll for new artifacts every ``interval`` seconds in a daemon thread"""
+        if self._thread is not None and self._thread.is_alive():
+            return self._thread
+
+        def watch():
+            while True:
+                time.sleep(self.interval)
+                try:
+                    self.reload()
+                except Exception as e:
+                    logger.error(f"Model reload failed, still serving {self._version}: {e}")
+
+        self._thread = threading.Thread(target=watch, name='model-watcher', daemon=True)
+        self._thread.start()
+        return self._thread
+
+    def info(self) -> Dict:
+        return {
+            "version": self._version,
+            "loaded_at": self._loaded_at.isoformat() if self._loaded_at else None,
+            "load_time_ms": round(self._load_seconds * 1000, 2) if self._load_seconds is not None else None,
+            "swap_count": self.swap_count,
+            "failed_reloads": self.failed_reloads,
+            "last_error": self.last_error,
+            "watching": self._thread is not None and self._thread.is_alive()
+        }
@@ -0,0 +1,227 @@
+"""
+Client for the api.nasa.gov feeds read by the ingestion worker.
+
+Every call first takes a token from the API key's budget (a shared
+rate_limit bucket, so every process using the key draws from one quota)
+and records the X-RateLimit-Remaining header NASA sends back. When either
+says the quota is gone the client raises QuotaExhausted instead of
+spending a call on a 429.
+
+Responses are kept with their ETag/Last-Modified validators. A repeat
+call sends If-None-Match/If-Modified-Since, and a 304 refreshes the kept
+body instead of downloading it again. APOD and NEO data for dates that
+have passed do not change, so those responses are pinned: later calls
+for the same window are answered from the cache without a request or
+any budget.
+"""
+
+import json
+import logging
+import os
+import threading
+import time
+from collections import OrderedDict
+from datetime import date, timedelta
+from typing import Any, Callable, Dict, Optional
+from urllib.parse import urlencode
+
+from rate_limit import RateLimiter, create_rate_limiter, key_id
+
+logger = logging.getLogger(__name__)
+
+NASA_API_BASE_URL = "https://api.nasa.gov"
+NEO_MAX_DAYS = 7  # the NEO feed rejects longer ranges
+DONKI_KINDS = ('FLR', 'CME', 'GST')  # solar flares, coronal mass ejections, geomagnetic storms
+QUOTA_WINDOW = 3600  # NASA's quota is per rolling hour
+# A date is final once it has passed everywhere and NASA has published it; two days leaves room for both
+PIN_AFTER_DAYS = 2
+
+
+class QuotaExhausted(Exception):
+    """The API key's budget is used up; calls may resume after ``retry_after`` seconds"""
+
+    def __init__(self, message: str, retry_after: float):
+        super().__init__(message)
+        self.retry_after = retry_after
+
+
+def default_rate_limit(api_key: str) -> str:
+    # DEMO_KEY allows 30 calls an hour per IP, a registered key 1000
+    return '30 per hour' if api_key == 'DEMO_KEY' else '1000 per hour'
+
+
+class ResponseCache:
+    """Kept responses by request key, in memory (SpaceEventStore keeps them in SQLite instead)
+
+    An entry is a dict of body (the JSON text), etag, last_modified,
+    fetched_at and pinned.
+    """
+
+    def __init__(self, max_entries: int = 4096):
+        self.max_entries = max_entries
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get_response(self, key: str) -> Optional[Dict]:
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None:
+                self._entries.move_to_end(key)
+            return entry
+
+    def put_response(self, key: str, entry: Dict) -> None:
+        with self._lock:
+            self._entries[key] = entry
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+
+
+class NasaClient:
+    """Budgeted GETs against api.nasa.gov (or anything that answers like it)"""
+
+    def __init__(self, api_key: str = 'DEMO_KEY', base_url: str = NASA_API_BASE_URL,
+                 limiter: Optional[RateLimiter] = None, rate_limit: Optional[str] = None,
+                 reserve: int = 2, timeout: float = 10, metrics=None, cache=None,
+                 today: Callable[[], date] = date.today):
+        self.api_key = api_key
+        self.base_url = base_url.rstrip('/')
+        self.limiter = limiter if limiter is not None else RateLimiter()
+        self.rate_limit = rate_limit or default_rate_limit(api_key)
+        self.reserve = reserve  # leave this many calls of NASA's quota for anything else using the key
+        self.timeout = timeout
+        self.metrics = metrics
+        self.cache = cache if cache is not None else ResponseCache()
+        self.today = today
+        self.remaining = None  # X-RateLimit-Remaining from the last response
+        self._remaining_at = 0.0
+        self.calls = 0
+        self.errors = 0
+        self.cache_stats = {"pinned": 0, "not_modified": 0, "downloaded": 0, "bytes_downloaded": 0, "bytes_saved": 0}
+        self._local = threading.local()  # one requests.Session per thread
+        self._lock = threading.Lock()
+
+    @classmethod
+    def from_env(cls, **kwargs) -> 'NasaClient':
+        """NASA_API_KEY, NASA_API_BASE_URL and NASA_RATE_LIMIT; the budget is shared when RATE_LIMIT_STORAGE=redis"""
+        kwargs.setdefault('limiter', create_rate_limiter(os.getenv('RATE_LIMIT_STORAGE', 'memory'),
+                                                         os.getenv('REDIS_URL', 'redis://localhost:6379/0')))
+        return cls(api_key=os.getenv('NASA_API_KEY', 'DEMO_KEY'),
+                   base_url=os.getenv('NASA_API_BASE_URL', NASA_API_BASE_URL),
+                   rate_limit=os.getenv('NASA_RATE_LIMIT'), **kwargs)
+
+    def _take_budget(self) -> None:
+        fresh = time.monotonic() - self._remaining_at < QUOTA_WINDOW
+        if fresh and self.remaining is not None and self.remaining <= self.reserve:
+            raise QuotaExhausted(f"NASA reports {self.remaining} calls left on the key",
+                                 QUOTA_WINDOW - (time.monotonic() - self._remaining_at))
+        decision = self.limiter.hit(f"out:nasa:{key_id(self.api_key)}", self.rate_limit)
+        if not decision.allowed:
+            raise QuotaExhausted(f"NASA API budget ({self.rate_limit}) used up", decision.retry_after)
+
+    def get(self, path: str, api: str, immutable: bool = False, **params) -> Any:
+        """GET ``path`` with the API key added; ``api`` labels the call in metrics.
+
+        ``immutable`` responses are pinned in the cache and never requested again.
+        """
+        key = f"{path}?{urlencode(sorted(params.items()))}"
+        cached = self.cache.get_response(key)
+        if cached is not None and cached['pinned']:
+            self._count_cache(api, 'pinned', saved=len(cached['body']))
+            return json.loads(cached['body'])
+
+        self._take_budget()
+        headers = {}
+        if cached is not None:
+            if cached.get('etag'):
+                headers['If-None-Match'] = cached['etag']
+            if cached.get('last_modified'):
+                headers['If-Modified-Since'] = cached['last_modified']
+        import requests  # deferred: only the worker makes NASA calls
+        session = getattr(self._local, 'session', None)
+        if session is None:
+            session = self._local.session = requests.Session()
+
+        started = time.perf_counter()
+        try:
+            response = session.get(self.base_url + path, params=dict(params, api_key=self.api_key),
+                                   headers=headers, timeout=self.timeout)
+        except requests.RequestException:
+            self._count_error(api)
+            raise
+        finally:
+            with self._lock:
+                self.calls += 1
+            if self.metrics is not None:
+                self.metrics.observe('upstream_request_seconds', time.perf_counter() - started, {'api': api})
+
+        remaining = response.headers.get('X-RateLimit-Remaining')
+        if remaining is not None and remaining.isdigit():
+            self.remaining, self._remaining_at = int(remaining), time.monotonic()
+        if response.status_code == 429:
+            self._count_error(api)
+            raise QuotaExhausted("NASA answered 429 Too Many Requests", QUOTA_WINDOW)
+        if response.status_code == 304 and cached is not None:
+            self.cache.put_response(key, dict(
+                cached, etag=response.headers.get('ETag', cached.get('etag')),
+                last_modified=response.headers.get('Last-Modified', cached.get('last_modified')),
+                fetched_at=time.time(), pinned=immutable
+            ))
+            self._count_cache(api, 'not_modified', saved=len(cached['body']))
+            return json.loads(cached['body'])
+        if response.status_code == 304 or not response.ok:
+            self._count_error(api)
+            response.raise_for_status()
+            raise requests.HTTPError(f"304 Not Modified for {path} with nothing cached", response=response)
+
+        body = response.text
+        etag, last_modified = response.headers.get('ETag'), response.headers.get('Last-Modified')
+        if immutable or etag or last_modified:
+            self.cache.put_response(key, {'body': body, 'etag': etag, 'last_modified': last_modified,
+                                          'fetched_at': time.time(), 'pinned': immutable})
+        self._count_cache(api, 'downloaded', downloaded=len(response.content))
+        return json.loads(body)
+
+    def _count_cache(self, api: str, result: str, saved: int = 0, downloaded: int = 0) -> None:
+        with self._lock:
+            self.cache_stats[result] += 1
+            self.cache_stats['bytes_saved'] += saved
+            self.cache_stats['bytes_downloaded'] += downloaded
+        if self.metrics is not None:
+            self.metrics.inc('upstream_responses_total', {'api': api, 'result': result})
+
+    def _final(self, end: date) -> bool:
+        return end <= self.today() - timedelta(days=PIN_AFTER_DAYS)
+
+    def _count_error(self, api: str) -> None:
+        with self._lock:
+            self.errors += 1
+        if self.metrics is not None:
+            self.metrics.inc('upstream_errors_total', {'api': api})
+
+    def apod(self, start: date, end: date) -> Any:
+        return self.get('/planetary/apod', 'apod', immutable=self._final(end),
+                        start_date=start.isoformat(), end_date=end.isoformat())
+
+    def neo_feed(self, start: date, end: date) -> Any:
+        if (end - start).days >= NEO_MAX_DAYS:
+            raise ValueError(f"The NEO feed covers at most {NEO_MAX_DAYS} days, got {start} to {end}")
+        return self.get('/neo/rest/v1/feed', 'neo_feed', immutable=self._final(end),
+                        start_date=start.isoformat(), end_date=end.isoformat())
+
+    def donki(self, kind: str, start: date, end: date) -> Any:
+        if kind not in DONKI_KINDS:
+            raise ValueError(f"DONKI kind must be one of {DONKI_KINDS}, got {kind!r}")
+        # Not pinned: DONKI entries for past days are revised as analyses come in
+        return self.get(f'/DONKI/{kind}', f'donki_{kind.lower()}',
+                        startDate=start.isoformat(), endDate=end.isoformat())
+
+    def stats(self) -> Dict:
+        return {
+            "calls": self.calls,
+            "errors": self.errors,
+            "nasa_remaining": self.remaining,
+            "rate_limit": self.rate_limit,
+            "responses": dict(self.cache_stats),
+            "budget": self.limiter.stats()
+        }
@@ -0,0 +1,520 @@
+"""
+Background ingestion of NASA feeds into a local SQLite table.
+
+/recommend and /nasa/events used to call api.nasa.gov synchronously on
+every request. Now this worker pulls APOD, the NEO feed and DONKI (solar
+flares, coronal mass ejections, geomagnetic storms) into space_events,
+indexed on date and type, and request handlers only read that table.
+NEO close approaches also go into neo_approaches with numeric columns,
+for top-k queries over long ranges (see neo_feed.py).
+
+Each feed records in ingest_state how far it has been fetched:
+  forward   from the last covered day (fetched again, since today's data
+            is still filling in) up to today, in windows the API accepts
+  backfill  then backwards, window by window, to ``backfill_days`` ago
+Responses are kept in upstream_responses so NasaClient can revalidate
+them (and never re-request pinned past dates) across runs and restarts;
+only the most recently fetched ``max_responses`` are kept, since the rows
+they produced are already in space_events.
+Every call draws from the API key's budget. When the budget or NASA's own
+quota runs out the run stops, and the next run picks up where it left off.
+
+Usage:
+    python nasa_ingest.py                          # every NASA_INGEST_INTERVAL seconds
+    python nasa_ingest.py --once --backfill-days 90
+    python nasa_ingest.py --neo-range 2025-01-01 2025-06-30 --workers 4
+"""
+
+import argparse
+import json
+import logging
+import os
+import sqlite3
+import threading
+import time
+from contextlib import contextmanager
+from datetime import date, datetime, timedelta, timezone
+from typing import Callable, Dict, Iterable, List, Optional
+
+from nasa_client import NEO_MAX_DAYS, NasaClient, QuotaExhausted
+from neo_feed import COLUMNS, NeoApproaches, fetch_neo_range, flatten_neo_feed
+
+logger = logging.getLogger(__name__)
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS space_events (
+    source TEXT NOT NULL,
+    id TEXT NOT NULL,
+    type TEXT NOT NULL,
+    date TEXT NOT NULL,
+    title TEXT,
+    description TEXT,
+    url TEXT,
+    data TEXT,
+    fetched_at TEXT NOT NULL,
+    PRIMARY KEY (source, id)
+);
+CREATE INDEX IF NOT EXISTS space_events_date ON space_events (date);
+CREATE INDEX IF NOT EXISTS space_events_type_date ON space_events (type, date);
+CREATE TABLE IF NOT EXISTS ingest_state (
+    feed TEXT PRIMARY KEY,
+    covered_until TEXT,
+    backfilled_from TEXT,
+    last_run_at TEXT,
+    last_error TEXT
+);
+CREATE TABLE IF NOT EXISTS neo_approaches (
+    neo_id TEXT NOT NULL,
+    name TEXT,
+    date TEXT NOT NULL,
+    epoch_ms INTEGER NOT NULL,
+    miss_km REAL,
+    miss_ld REAL,
+    velocity_kmh REAL,
+    diameter_max_km REAL,
+    hazardous INTEGER NOT NULL,
+    url TEXT,
+    PRIMARY KEY (neo_id, date)
+);
+CREATE INDEX IF NOT EXISTS neo_approaches_date ON neo_approaches (date);
+CREATE TABLE IF NOT EXISTS upstream_responses (
+    key TEXT PRIMARY KEY,
+    body TEXT NOT NULL,
+    etag TEXT,
+    last_modified TEXT,
+    fetched_at REAL NOT NULL,
+    pinned INTEGER NOT NULL
+);
+CREATE INDEX IF NOT EXISTS upstream_responses_fetched_at ON upstream_responses (fetched_at);
+"""
+
+UPSERT = """
+INSERT INTO space_events (source, id, type, date, title, description, url, data, fetched_at)
+VALUES (:source, :id, :type, :date, :title, :description, :url, :data, :fetched_at)
+ON CONFLICT (source, id) DO UPDATE SET
+    type = excluded.type, date = excluded.date, title = excluded.title, description = excluded.description,
+    url = excluded.url, data = excluded.data, fetched_at = excluded.fetched_at
+"""
+
+
+class SpaceEventStore:
+    """The local space_events table; WAL so readers never wait on the worker.
+
+    The schema is created once, on first use. Connections are pooled and
+    shared between threads (a request thread borrows one for the length
+    of a query), so a thread per request costs neither a connect nor DDL,
+    and at most ``max_idle`` connections stay open. upstream_responses
+    keeps the ``max_responses`` most recently fetched responses, like
+    ResponseCache's ``max_entries``.
+    """
+
+    def __init__(self, path: str = 'nasa_events.db', max_idle: int = 4, max_responses: int = 256):
+        self.path = path
+        self.max_idle = max_idle
+        self.max_responses = max_responses
+        self.opened = 0
+        self._idle: List[sqlite3.Connection] = []
+        self._lock = threading.Lock()
+        self._pid = None  # the process the pool and schema belong to
+
+    def _open(self) -> sqlite3.Connection:
+        connection = sqlite3.connect(self.path, timeout=5, check_same_thread=False)
+        connection.row_factory = sqlite3.Row
+        self.opened += 1
+        return connection
+
+    @contextmanager
+    def _connection(self):
+        """Borrow a pooled connection; the first borrow in a process also creates the schema"""
+        connection = None
+        with self._lock:
+            if self._pid != os.getpid():
+                # A forked child must not share its parent's connections
+                self._idle = []
+                connection = self._open()
+                try:
+                    connection.execute('PRAGMA journal_mode=WAL')
+                    connection.executescript(SCHEMA)
+                except sqlite3.Error:
+                    connection.close()
+                    raise
+                self._pid = os.getpid()
+            elif self._idle:
+                connection = self._idle.pop()
+        if connection is None:
+            connection = self._open()
+        try:
+            yield connection
+        finally:
+            if connection.in_transaction:
+                connection.rollback()
+            with self._lock:
+                if len(self._idle) < self.max_idle:
+                    self._idle.append(connection)
+                    connection = None
+            if connection is not None:
+                connection.close()
+
+    def close(self) -> None:
+        """Close the idle connections; the store reopens them as needed"""
+        with self._lock:
+            idle, self._idle = self._idle, []
+        for connection in idle:
+            connection.close()
+
+    def upsert(self, rows: Iterable[Dict]) -> int:
+        """Insert or replace events by (source, id); returns how many were written"""
+        fetched_at = datetime.now(timezone.utc).isoformat()
+        rows = [dict(row, data=json.dumps(row.get('data') or {}), fetched_at=fetched_at) for row in rows]
+        with self._connection() as connection, connection:
+            connection.executemany(UPSERT, rows)
+        return len(rows)
+
+    def events(self, types: Optional[Iterable[str]] = None, start: Optional[str] = None,
+               end: Optional[str] = None, limit: Optional[int] = None, newest_first: bool = False) -> List[Dict]:
+        """Events filtered on type and an inclusive ISO date range"""
+        clauses, params = [], []
+        if types is not None:
+            types = list(types)
+            clauses.append(f"type IN ({','.join('?' * len(types))})")
+            params.extend(types)
+        if start is not None:
+            clauses.append("date >= ?")
+            params.append(start)
+        if end is not None:
+            clauses.append("date <= ?")
+            params.append(end)
+        query = "SELECT source, id, type, date, title, description, url, data FROM space_events"
+        if clauses:
+            query += " WHERE " + " AND ".join(clauses)
+        query += f" ORDER BY date {'DESC' if newest_first else 'ASC'}, source, id"
+        if limit is not None:
+            query += " LIMIT ?"
+            params.append(limit)
+        with self._connection() as connection:
+            rows = connection.execute(query, params).fetchall()
+        return [dict(row, data=json.loads(row['data'] or '{}')) for row in rows]
+
+    def upsert_approaches(self, approaches: NeoApproaches) -> int:
+        """Insert or replace close approaches by (neo_id, date)"""
+        columns = list(COLUMNS)
+        rows = [list(record.values()) for record in approaches.records()]
+        with self._connection() as connection, connection:
+            connection.executemany(
+                f"INSERT OR REPLACE INTO neo_approaches ({', '.join(columns)}) VALUES ({', '.join('?' * len(columns))})",
+                rows
+            )
+        return len(rows)
+
+    def approaches(self, start: Optional[str] = None, end: Optional[str] = None) -> NeoApproaches:
+        """Close approaches within an inclusive ISO date range, as column arrays"""
+        clauses, params = [], []
+        if start is not None:
+            clauses.append("date >= ?")
+            params.append(start)
+        if end is not None:
+            clauses.append("date <= ?")
+            params.append(end)
+        query = f"SELECT {', '.join(COLUMNS)} FROM neo_approaches"
+        if clauses:
+            query += " WHERE " + " AND ".join(clauses)
+        with self._connection() as connection:
+            rows = connection.execute(query + " ORDER BY date, neo_id", params).fetchall()
+        if not rows:
+            return NeoApproaches.empty()
+        return NeoApproaches.from_lists(dict(zip(COLUMNS, (list(values) for values in zip(*rows)))))
+
+    def get_response(self, key: str) -> Optional[Dict]:
+        """A kept upstream response for NasaClient's conditional requests"""
+        with self._connection() as connection:
+            row = connection.execute(
+                "SELECT body, etag, last_modified, fetched_at, pinned FROM upstream_responses WHERE key = ?", (key,)
+            ).fetchone()
+        return dict(row, pinned=bool(row['pinned'])) if row is not None else None
+
+    def put_response(self, key: str, entry: Dict) -> None:
+        with self._connection() as connection, connection:
+            connection.execute(
+                "INSERT OR REPLACE INTO upstream_responses (key, body, etag, last_modified, fetched_at, pinned) "
+                "VALUES (:key, :body, :etag, :last_modified, :fetched_at, :pinned)",
+                dict(entry, key=key, pinned=int(entry['pinned']))
+            )
+            # Oldest first, through the fetched_at index so the bodies are not read
+            connection.execute(
+                "DELETE FROM upstream_responses WHERE key IN "
+                "(SELECT key FROM upstream_responses ORDER BY fetched_at DESC LIMIT -1 OFFSET ?)",
+                (self.max_responses,)
+            )
+
+    def latest(self, event_type: str, on_or_before: Optional[str] = None) -> Optional[Dict]:
+        found = self.events([event_type], end=on_or_before, limit=1, newest_first=True)
+        return found[0] if found else None
+
+    def state(self, feed: str) -> Dict:
+        with self._connection() as connection:
+            row = connection.execute("SELECT * FROM ingest_state WHERE feed = ?", (feed,)).fetchone()
+        return dict(row) if row is not None else {}
+
+    def save_state(self, feed: str, **fields) -> None:
+        state = dict(self.state(feed), **fields, feed=feed)
+        with self._connection() as connection, connection:
+            connection.execute(
+                "INSERT OR REPLACE INTO ingest_state (feed, covered_until, backfilled_from, last_run_at, last_error) "
+                "VALUES (:feed, :covered_until, :backfilled_from, :last_run_at, :last_error)",
+                {key: state.get(key) for key in ('feed', 'covered_until', 'backfilled_from', 'last_run_at', 'last_error')}
+            )
+
+    def info(self) -> Dict:
+        with self._connection() as connection:
+            counts = dict(connection.execute("SELECT type, COUNT(*) FROM space_events GROUP BY type").fetchall())
+            approaches = connection.execute("SELECT COUNT(*), MIN(date), MAX(date) FROM neo_approaches").fetchone()
+            responses = connection.execute("SELECT COUNT(*), COALESCE(SUM(pinned), 0) FROM upstream_responses").fetchone()
+            feeds = {row['feed']: {key: row[key] for key in row.keys() if key != 'feed'}
+                     for row in connection.execute("SELECT * FROM ingest_state ORDER BY feed")}
+        return {"path": self.path, "events": counts, "feeds": feeds,
+                "neo_approaches": {"rows": approaches[0], "first": approaches[1], "last": approaches[2]},
+                "upstream_responses": {"kept": responses[0], "pinned": responses[1]}}
+
+
+# Normalizers: one feed response -> space_events rows
+
+def apod_rows(payload) -> List[Dict]:
+    return [{
+        'source': 'apod', 'id': entry['date'], 'type': 'nasa_apod', 'date': entry['date'],
+        'title': entry.get('title', 'Astronomy Picture of the Day'),
+        'description': entry.get('explanation', 'Daily space image from NASA'),
+        'url': entry.get('url', ''),
+        'data': {key: entry[key] for key in ('media_type', 'hdurl', 'copyright') if key in entry}
+    } for entry in payload if entry.get('date')]
+
+
+def approach_rows(approaches: NeoApproaches) -> List[Dict]:
+    rows = []
+    for approach in approaches.records():
+        miss_km, velocity_kmh = approach['miss_km'], approach['velocity_kmh']
+        rows.append({
+            'source': 'neo', 'id': f"{approach['neo_id']}:{approach['date']}", 'type': 'near_earth_asteroid',
+            'date': approach['date'], 'title': f"Asteroid {approach['name']}",
+            'description': "Near-Earth asteroid close approach",
+            'url': approach['url'],
+            'data': {
+                'neo_id': approach['neo_id'],
+                'miss_distance_km': 'Unknown' if miss_km is None else miss_km,
+                'velocity_kmh': 'Unknown' if velocity_kmh is None else velocity_kmh,
+                'hazardous': approach['hazardous']
+            }
+        })
+    return rows
+
+
+def donki_rows(kind: str) -> Callable[[list], List[Dict]]:
+    def rows(payload) -> List[Dict]:
+        result = []
+        for entry in payload or []:
+            if kind == 'FLR':
+                event_id, when = entry['flrID'], entry.get('beginTime', '')
+                event_type, title = 'solar_flare', f"{entry.get('classType', '')} solar flare".strip()
+                description = f"Peak at {entry.get('peakTime', 'unknown time')}, region {entry.get('sourceLocation', 'unknown')}"
+            elif kind == 'CME':
+                event_id, when = entry['activityID'], entry.get('startTime', '')
+                event_type, title = 'coronal_mass_ejection', "Coronal mass ejection"
+                description = entry.get('note') or "Coronal mass ejection observed"
+            else:
+                event_id, when = entry['gstID'], entry.get('startTime', '')
+                kp = max((k.get('kpIndex', 0) for k in entry.get('allKpIndex') or []), default=None)
+                event_type, title = 'geomagnetic_storm', f"Geomagnetic storm (Kp {kp})" if kp else "Geomagnetic storm"
+                description = "Aurora may be visible at lower latitudes than usual"
+            result.append({'source': f"donki_{kind.lower()}", 'id': event_id, 'type': event_type,
+                           'date': when[:10], 'title': title, 'description': description,
+                           'url': entry.get('link', ''), 'data': {'time': when}})
+        return result
+    return rows
+
+
+class Feed:
+    """How to fetch one NASA feed over a date window and turn it into rows"""
+
+    def __init__(self, name: str, window_days: int, fetch: Callable, rows: Callable, earliest: date = date(1995, 6, 16),
+                 approaches: Optional[Callable] = None):
+        self.name = name
+        self.window_days = window_days
+        self.fetch = fetch  # (client, start, end) -> payload
+        self.rows = rows
+        self.earliest = earliest
+        self.approaches = approaches  # payload -> NeoApproaches; ``rows`` then takes those columns
+
+
+FEEDS = {
+    'apod': Feed('apod', 30, lambda client, start, end: client.apod(start, end), apod_rows),
+    'neo': Feed('neo', NEO_MAX_DAYS, lambda client, start, end: client.neo_feed(start, end), approach_rows,
+                approaches=flatten_neo_feed),
+    **{f"donki_{kind.lower()}": Feed(f"donki_{kind.lower()}", 30,
+                                     lambda client, start, end, kind=kind: client.donki(kind, start, end),
+                                     donki_rows(kind), earliest=date(2010, 1, 1))
+       for kind in ('FLR', 'CME', 'GST')}
+}
+
+
+class NasaIngester:
+    """Fetches every feed incrementally into a SpaceEventStore, on demand or on a background thread"""
+
+    def __init__(self, client: NasaClient, store: SpaceEventStore, feeds: Iterable[str] = tuple(FEEDS),
+                 backfill_days: int = 30, refresh_days: int = 1, max_calls: Optional[int] = None,
+                 interval: float = 3600, today: Callable[[], date] = date.today):
+        self.client = client
+        self.store = store
+        self.feeds = [FEEDS[name] for name in feeds]
+        self.backfill_days = backfill_days
+        self.refresh_days = refresh_days
+        self.max_calls = max_calls  # per run, on top of the key's budget
+        self.interval = interval
+        self.today = today
+        self._thread = None
+        self._stop = threading.Event()
+        self.runs = 0
+        self.last_report = None
+
+    def _windows_forward(self, feed: Feed, state: Dict, today: date):
+        if state.get('covered_until'):
+            start = date.fromisoformat(state['covered_until']) - timedelta(days=self.refresh_days - 1)
+        else:
+            start = today - timedelta(days=feed.window_days - 1)
+        start = max(start, feed.earliest)
+        while start <= today:
+            end = min(start + timedelta(days=feed.window_days - 1), today)
+            yield start, end
+            start = end + timedelta(days=1)
+
+    def _windows_backward(self, feed: Feed, state: Dict, today: date):
+        target = max(today - timedelta(days=self.backfill_days), feed.earliest)
+        oldest = date.fromisoformat(state['backfilled_from'])
+        while oldest > target:
+            end = oldest - timedelta(days=1)
+            start = max(target, end - timedelta(days=feed.window_days - 1))
+            yield start, end
+            oldest = start
+
+    def _fetch(self, feed: Feed, start: date, end: date, report: Dict) -> None:
+        if self.max_calls is not None and report['calls'] >= self.max_calls:
+            raise QuotaExhausted(f"max_calls ({self.max_calls}) reached for this run", self.interval)
+        report['calls'] += 1
+        payload = feed.fetch(self.client, start, end)
+        if feed.approaches is not None:
+            payload = feed.approaches(payload)
+            self.store.upsert_approaches(payload)
+        written = self.store.upsert(feed.rows(payload))
+        report['feeds'][feed.name]['rows'] += written
+
+    def run_once(self) -> Dict:
+        """Bring every feed up to today, then backfill; stops early when the quota runs out"""
+        today = self.today()
+        report = {"started_at": datetime.now(timezone.utc).isoformat(), "calls": 0, "stopped": None, "feeds": {}}
+        # Forward for every feed first, so fresh data never waits behind a long backfill
+        for phase in ('forward', 'backfill'):
+            for feed in self.feeds:
+                feed_report = report['feeds'].setdefault(feed.name, {"rows": 0, "error": None})
+                if feed_report['error'] is not None:
+                    continue
+                state = self.store.state(feed.name)
+                if phase == 'backfill' and not state.get('backfilled_from'):
+                    continue
+                windows = self._windows_forward if phase == 'forward' else self._windows_backward
+                try:
+                    for start, end in windows(feed, state, today):
+                        self._fetch(feed, start, end, report)
+                        if phase == 'forward':
+                            oldest = state.get('backfilled_from') or start.isoformat()
+                            state = dict(state, covered_until=end.isoformat(),
+                                         backfilled_from=min(oldest, start.isoformat()))
+                        else:
+                            state = dict(state, backfilled_from=start.isoformat())
+                        self.store.save_state(feed.name, covered_until=state['covered_until'],
+                                              backfilled_from=state['backfilled_from'],
+                                              last_run_at=report['started_at'], last_error=None)
+                except QuotaExhausted as e:
+                    report['stopped'] = f"{e} (retry in {e.retry_after:.0f}s)"
+                    logger.warning(f"NASA ingestion stopped: {report['stopped']}")
+                    return self._finish(report)
+                except Exception as e:
+                    # One broken feed should not hold back the others
+                    feed_report['error'] = str(e)
+                    self.store.save_state(feed.name, last_run_at=report['started_at'], last_error=str(e))
+                    logger.error(f"NASA ingestion of {feed.name} failed: {e}")
+        return self._finish(report)
+
+    def _finish(self, report: Dict) -> Dict:
+        self.runs += 1
+        self.last_report = report
+        return report
+
+    def start(self) -> None:
+        """Run every ``interval`` seconds on a daemon thread (once per process)"""
+        if self._thread is not None and self._thread.is_alive():
+            return
+        self._stop.clear()
+        self._thread = threading.Thread(target=self._loop, name='nasa-ingest', daemon=True)
+        self._thread.start()
+
+    def stop(self) -> None:
+        self._stop.set()
+
+    def _loop(self) -> None:
+        while not self._stop.is_set():
+            try:
+                self.run_once()
+            except Exception as e:
+                logger.error(f"NASA ingestion run failed: {e}")
+            self._stop.wait(self.interval)
+
+    def info(self) -> Dict:
+        return {
+            "runs": self.runs,
+            "running": self._thread is not None and self._thread.is_alive(),
+            "interval": self.interval,
+            "last_report": self.last_report,
+            "client": self.client.stats()
+        }
+
+
+def ingest_neo_range(client: NasaClient, store: SpaceEventStore, start: date, end: date,
+                     workers: int = 4) -> Dict:
+    """Fetch every NEO close approach from ``start`` to ``end`` with ``workers`` threads into both tables"""
+    approaches, report = fetch_neo_range(client, start, end, workers)
+    store.upsert_approaches(approaches)
+    store.upsert(approach_rows(approaches))
+    return report
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--store', default=os.getenv('NASA_STORE_PATH', 'nasa_events.db'))
+    parser.add_argument('--once', action='store_true', help="run one ingestion pass and exit")
+    parser.add_argument('--backfill-days', type=int, default=int(os.getenv('NASA_BACKFILL_DAYS', '30')))
+    parser.add_argument('--interval', type=float, default=float(os.getenv('NASA_INGEST_INTERVAL', '3600')))
+    parser.add_argument('--feeds', nargs='+', choices=list(FEEDS), default=list(FEEDS))
+    parser.add_argument('--neo-range', nargs=2, type=date.fromisoformat, metavar=('START', 'END'),
+                        help="fetch NEO close approaches for this date range and exit")
+    parser.add_argument('--workers', type=int, default=4, help="concurrent NEO feed requests for --neo-range")
+    args = parser.parse_args()
+    logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(name)s - %(levelname)s - %(message)s')
+
+    store = SpaceEventStore(args.store)
+    client = NasaClient.from_env(cache=store)
+    if args.neo_range:
+        print(json.dumps(ingest_neo_range(client, store, *args.neo_range, workers=args.workers), indent=2))
+        return
+    ingester = NasaIngester(client, store, feeds=args.feeds, backfill_days=args.backfill_days,
+                            interval=args.interval)
+    if args.once:
+        print(json.dumps(ingester.run_once(), indent=2))
+        return
+    ingester.start()
+    try:
+        while True:
+            time.sleep(60)
+    except KeyboardInterrupt:
+        ingester.stop()
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,192 @@
+"""
+Near-Earth object close approaches as typed column arrays.
+
+The NEO feed answers at most 7 days per call, as nested JSON with every
+number in a string (``close_approach_data[].miss_distance.kilometers``
+and so on). ``fetch_neo_range`` splits a long date range into one
+contiguous segment per worker thread; each worker walks its segment in
+back-to-back windows, each starting the day after the last one ended
+(the feed's ``links.next`` can overlap the window just fetched, so it is
+not followed). ``flatten_neo_feed`` turns each response into float64
+columns (km, lunar distances, km/h) in one pass over the objects.
+``NeoApproaches`` holds those columns and answers top-k queries with
+argpartition, so "the 10 closest approaches since January" is one O(n)
+pass over months of rows.
+"""
+
+import logging
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from datetime import date, timedelta
+from typing import Dict, Iterable, List, Optional, Tuple
+
+import numpy as np
+
+from nasa_client import NEO_MAX_DAYS, NasaClient, QuotaExhausted
+
+logger = logging.getLogger(__name__)
+
+COLUMNS = {
+    'neo_id': str,
+    'name': str,
+    'date': str,
+    'epoch_ms': np.int64,
+    'miss_km': np.float64,
+    'miss_ld': np.float64,
+    'velocity_kmh': np.float64,
+    'diameter_max_km': np.float64,
+    'hazardous': np.bool_,
+    'url': str
+}
+# Columns top_k can rank by, and whether the default is the largest values first
+RANKED = {'miss_km': False, 'miss_ld': False, 'velocity_kmh': True, 'diameter_max_km': True}
+
+
+def _number(value) -> float:
+    try:
+        return float(value)
+    except (TypeError, ValueError):
+        return np.nan  # 'Unknown' or missing
+
+
+class NeoApproaches:
+    """Close approaches, one array per column in ``COLUMNS``"""
+
+    def __init__(self, columns: Dict[str, np.ndarray]):
+        self._columns = columns
+        self._length = len(columns['date'])
+
+    @classmethod
+    def from_lists(cls, values: Dict[str, list]) -> 'NeoApproaches':
+        return cls({column: np.array(values[column], dtype=dtype) for column, dtype in COLUMNS.items()})
+
+    @classmethod
+    def empty(cls) -> 'NeoApproaches':
+        return cls.from_lists({column: [] for column in COLUMNS})
+
+    @classmethod
+    def concat(cls, parts: Iterable['NeoApproaches']) -> 'NeoApproaches':
+        parts = [part for part in parts if len(part)]
+        if not parts:
+            return cls.empty()
+        return cls({column: np.concatenate([part[column] for part in parts]) for column in COLUMNS})
+
+    def __len__(self) -> int:
+        return self._length
+
+    def __getitem__(self, column: str) -> np.ndarray:
+        return self._columns[column]
+
+    def records(self, indices: Optional[Iterable[int]] = None) -> List[Dict]:
+        """Rows as plain dicts; unknown numbers are None"""
+        indices = np.arange(self._length) if indices is None else np.asarray(indices, dtype=np.intp)
+        values = []
+        for column in COLUMNS:
+            column_values = self._columns[column][indices].tolist()
+            if self._columns[column].dtype.kind == 'f':
+                column_values = [None if value != value else value for value in column_values]  # NaN -> None
+            values.append(column_values)
+        return [dict(zip(COLUMNS, row)) for row in zip(*values)]
+
+    def top_k(self, by: str = 'miss_km', k: int = 10, largest: Optional[bool] = None,
+              start: Optional[str] = None, end: Optional[str] = None) -> List[Dict]:
+        """The ``k`` approaches with the smallest (or largest) ``by``, optionally within an ISO date range"""
+        if by not in RANKED:
+            raise ValueError(f"top_k ranks by one of {sorted(RANKED)}, got {by!r}")
+        largest = RANKED[by] if largest is None else largest
+        values = self._columns[by]
+        mask = ~np.isnan(values)
+        if start is not None:
+            mask &= self._columns['date'] >= start
+        if end is not None:
+            mask &= self._columns['date'] <= end
+        candidates = np.flatnonzero(mask)
+        if k <= 0 or not len(candidates):
+            return []
+        keys = -values[candidates] if largest else values[candidates]
+        if k < len(candidates):
+            # Only the k winners get sorted
+            chosen = np.argpartition(keys, k - 1)[:k]
+            candidates, keys = candidates[chosen], keys[chosen]
+        return self.records(candidates[np.argsort(keys, kind='stable')])
+
+
+def flatten_neo_feed(payload) -> NeoApproaches:
+    """One NEO feed response -> one row per (object, approach date), numbers parsed to floats"""
+    values = {column: [] for column in COLUMNS}
+    for day, objects in (payload.get('near_earth_objects') or {}).items():
+        for neo in objects:
+            diameter = (neo.get('estimated_diameter') or {}).get('kilometers') or {}
+            for approach in neo.get('close_approach_data') or ():
+                # The feed lists an object under each day it passes; keep only that day's approach
+                if approach.get('close_approach_date', day) != day:
+                    continue
+                miss = approach.get('miss_distance') or {}
+                values['neo_id'].append(str(neo['id']))
+                values['name'].append(neo.get('name', 'Unknown'))
+                values['date'].append(day)
+                values['epoch_ms'].append(int(approach.get('epoch_date_close_approach') or 0))
+                values['miss_km'].append(_number(miss.get('kilometers')))
+                values['miss_ld'].append(_number(miss.get('lunar')))
+                values['velocity_kmh'].append(_number((approach.get('relative_velocity') or {}).get('kilometers_per_hour')))
+                values['diameter_max_km'].append(_number(diameter.get('estimated_diameter_max')))
+                values['hazardous'].append(bool(neo.get('is_potentially_hazardous_asteroid')))
+                values['url'].append(neo.get('nasa_jpl_url', ''))
+    return NeoApproaches.from_lists(values)
+
+
+def _segments(start: date, end: date, workers: int) -> List[Tuple[date, date]]:
+    """Split [start, end] into at most ``workers`` runs of whole NEO windows"""
+    windows = -(-((end - start).days + 1) // NEO_MAX_DAYS)
+    per_worker = -(-windows // max(1, workers))
+    segments, first = [], start
+    while first <= end:
+        last = min(first + timedelta(days=per_worker * NEO_MAX_DAYS - 1), end)
+        segments.append((first, last))
+        first = last + timedelta(days=1)
+    return segments
+
+
+def fetch_neo_range(client: NasaClient, start: date, end: date,
+                    workers: int = 4) -> Tuple[NeoApproaches, Dict]:
+    """Every close approach from ``start`` to ``end``, fetched by ``workers`` threads.
+
+    Stops every worker once the key's quota runs out; the report's
+    ``covered`` lists which (start, end) runs were fetched.
+    """
+    if end < start:
+        raise ValueError(f"end {end} is before start {start}")
+    stop = threading.Event()
+    report = {"calls": 0, "rows": 0, "stopped": None, "errors": [], "covered": []}
+    lock = threading.Lock()
+
+    def walk(segment: Tuple[date, date]) -> List[NeoApproaches]:
+        parts, first, (window_start, last) = [], None, segment
+        try:
+            while window_start <= last and not stop.is_set():
+                window_end = min(window_start + timedelta(days=NEO_MAX_DAYS - 1), last)
+                payload = client.neo_feed(window_start, window_end)
+                parts.append(flatten_neo_feed(payload))
+                with lock:
+                    report['calls'] += 1
+                first = first or window_start
+                window_start = window_end + timedelta(days=1)
+        except QuotaExhausted as e:
+            stop.set()
+            with lock:
+                report['stopped'] = f"{e} (retry in {e.retry_after:.0f}s)"
+        except Exception as e:
+            logger.error(f"NEO feed {window_start} to {last} failed: {e}")
+            with lock:
+                report['errors'].append(f"{window_start}: {e}")
+        if first is not None:
+            with lock:
+                report['covered'].append((first.isoformat(), (window_start - timedelta(days=1)).isoformat()))
+        return parts
+
+    with ThreadPoolExecutor(max_workers=max(1, workers), thread_name_prefix='neo-feed') as pool:
+        parts = [part for segment_parts in pool.map(walk, _segments(start, end, workers)) for part in segment_parts]
+    approaches = NeoApproaches.concat(parts)
+    report['rows'] = len(approaches)
+    report['covered'].sort()
+    return approaches, report
@@ -0,0 +1,308 @@
+"""
+Token-bucket rate limiting shared by every worker.
+
+flask_limiter kept its counters in each worker's memory, so with N workers
+a "50 per minute" route really allowed 50 * N, and nothing guarded the NASA
+API key's quota. Here a limit of ``count`` per ``period`` is a bucket of
+``count`` tokens refilled at ``count / period`` tokens a second: bursts up
+to the limit pass, and the long-run rate is the limit. Buckets live in a
+store:
+
+    RedisBucketStore   one Lua script per decision, so refill-and-take is
+                       atomic across workers, hosts and the proxy; it uses
+                       the Redis clock, so servers need not agree on time
+    LocalBucketStore   per-process buckets, for development and tests, and
+                       the fallback while Redis is unreachable
+
+The same RateLimiter serves inbound per-client limits (FlaskRateLimiter in
+enhanced_app.py) and outbound per-key budgets (the NASA calls in app.py).
+"""
+
+import hashlib
+import logging
+import re
+import threading
+import time
+from functools import lru_cache
+from typing import Callable, Dict, Iterable, Optional, Tuple
+
+from flask import abort, g, request
+
+try:
+    import redis
+except ImportError:  # redis is only needed when RATE_LIMIT_STORAGE = 'redis'
+    redis = None
+
+logger = logging.getLogger(__name__)
+
+PERIODS = {'second': 1, 'minute': 60, 'hour': 3600, 'day': 86400}
+_LIMIT_PATTERN = re.compile(r'^\s*(\d+)\s*(?:per|/)\s*(\d+)?\s*(second|minute|hour|day)s?\s*$', re.IGNORECASE)
+_WARNING_INTERVAL = 60  # seconds between repeated "store unavailable" warnings
+
+# KEYS[1] bucket; ARGV rate (tokens/s), capacity, cost. Returns {allowed, tokens, retry_after}
+TOKEN_BUCKET_LUA = """
+local rate = tonumber(ARGV[1])
+local capacity = tonumber(ARGV[2])
+local cost = tonumber(ARGV[3])
+local clock = redis.call('TIME')
+local now = tonumber(clock[1]) + tonumber(clock[2]) / 1000000
+local state = redis.call('HMGET', KEYS[1], 'tokens', 'ts')
+local tokens = tonumber(state[1]) or capacity
+local ts = tonumber(state[2]) or now
+tokens = math.min(capacity, tokens + math.max(0, now - ts) * rate)
+local allowed = 0
+local retry_after = 0
+if tokens >= cost then
+    tokens = tokens - cost
+    allowed = 1
+else
+    retry_after = (cost - tokens) / rate
+end
+redis.call('HSET', KEYS[1], 'tokens', tostring(tokens), 'ts', tostring(now))
+redis.call('PEXPIRE', KEYS[1], math.ceil((capacity - tokens) / rate * 1000) + 1000)
+return {allowed, tostring(tokens), tostring(retry_after)}
+"""
+
+
+class Limit:
+    """``count`` requests per ``period`` seconds"""
+
+    __slots__ = ('count', 'period', 'rate')
+
+    def __init__(self, count: int, period: float):
+        if count <= 0 or period <= 0:
+            raise ValueError(f"Limit needs a positive count and period, got {count} per {period}s")
+        self.count = count
+        self.period = period
+        self.rate = count / period
+
+    @staticmethod
+    @lru_cache(maxsize=256)
+    def parse(text: str) -> 'Limit':
+        """'50 per minute', '50/minute' or '1000 per 1 hour'"""
+        match = _LIMIT_PATTERN.match(text)
+        if not match:
+            raise ValueError(f"Cannot parse rate limit {text!r}")
+        count, multiple, unit = match.groups()
+        return Limit(int(count), int(multiple or 1) * PERIODS[unit.lower()])
+
+    def __str__(self) -> str:
+        return f"{self.count} per {self.period:g}s"
+
+
+class Decision:
+    """The outcome of one rate-limit check"""
+
+    __slots__ = ('allowed', 'limit', 'remaining', 'retry_after')
+
+    def __init__(self, allowed: bool, limit: Limit, remaining: int, retry_after: float):
+        self.allowed = allowed
+        self.limit = limit
+        self.remaining = remaining
+        self.retry_after = retry_after
+
+
+class LocalBucketStore:
+    """Token buckets in this process's memory"""
+
+    def __init__(self, max_keys: int = 100000, clock: Callable[[], float] = time.monotonic):
+        self.max_keys = max_keys
+        self._clock = clock
+        self._buckets = {}  # key -> [tokens, updated_at, full_at]
+        self._lock = threading.Lock()
+
+    def take(self, key: str, rate: float, capacity: int, cost: int = 1) -> Tuple[bool, float, float]:
+        """Refill ``key``'s bucket and take ``cost`` tokens if it has them"""
+        with self._lock:
+            now = self._clock()
+            bucket = self._buckets.get(key)
+            if bucket is None:
+                if len(self._buckets) >= self.max_keys:
+                    self._prune(now)
+                tokens = capacity
+            else:
+                tokens = min(capacity, bucket[0] + (now - bucket[1]) * rate)
+            if tokens >= cost:
+                tokens -= cost
+                allowed, retry_after = True, 0.0
+            else:
+                allowed, retry_after = False, (cost - tokens) / rate
+            self._buckets[key] = [tokens, now, now + (capacity - tokens) / rate]
+            return allowed, tokens, retry_after
+
+    def _prune(self, now: float) -> None:
+        # A bucket that has refilled is the same as no bucket at all
+        for key in [key for key, bucket in self._buckets.items() if bucket[2] <= now]:
+            del self._buckets[key]
+
+    def __len__(self) -> int:
+        return len(self._buckets)
+
+
+class RedisBucketStore:
+    """Token buckets in Redis, shared by every process that uses the same server"""
+
+    def __init__(self, client):
+        self.client = client
+        self._script = client.register_script(TOKEN_BUCKET_LUA)
+
+    @classmethod
+    def from_url(cls, url: str) -> 'RedisBucketStore':
+        if redis is None:
+            raise RuntimeError("The redis package is required for RATE_LIMIT_STORAGE = 'redis'")
+        return cls(redis.Redis.from_url(url, socket_timeout=0.25))
+
+    def take(self, key: str, rate: float, capacity: int, cost: int = 1) -> Tuple[bool, float, float]:
+        allowed, tokens, retry_after = self._script(keys=[key], args=[rate, capacity, cost])
+        return bool(allowed), float(tokens), float(retry_after)
+
+
+class RateLimiter:
+    """Checks limits against a bucket store, falling back to local buckets if the store fails"""
+
+    def __init__(self, store=None, prefix: str = 'skyquest:rl:', fallback: Optional[LocalBucketStore] = None):
+        self.store = store if store is not None else LocalBucketStore()
+        self.prefix = prefix
+        self.fallback = fallback if fallback is not None else LocalBucketStore()
+        self.enabled = True
+        self._lock = threading.Lock()
+        self._last_warning = 0.0
+        self.allowed = 0
+        self.limited = 0
+        self.errors = 0
+        self.decision_seconds = 0.0
+        self.max_decision_seconds = 0.0
+
+    def hit(self, key: str, limit, cost: int = 1) -> Decision:
+        """Take ``cost`` tokens from ``key``'s bucket for ``limit`` (a Limit or a string like '50 per minute')"""
+        if isinstance(limit, str):
+            limit = Limit.parse(limit)
+        if not self.enabled:
+            return Decision(True, limit, limit.count, 0.0)
+
+        started = time.perf_counter()
+        bucket = f"{self.prefix}{key}:{limit.count}/{limit.period:g}"
+        try:
+            allowed, tokens, retry_after = self.store.take(bucket, limit.rate, limit.count, cost)
+        except Exception as e:
+            # Keep limiting per process rather than letting everything through
+            allowed, tokens, retry_after = self.fallback.take(bucket, limit.rate, limit.count, cost)
+            self._store_failed(e)
+        elapsed = time.perf_counter() - started
+
+        with self._lock:
+            if allowed:
+                self.allowed += 1
+            else:
+                self.limited += 1
+            self.decision_seconds += elapsed
+            self.max_decision_seconds = max(self.max_decision_seconds, elapsed)
+        return Decision(allowed, limit, int(tokens), retry_after)
+
+    def _store_failed(self, error: Exception) -> None:
+        with self._lock:
+            self.errors += 1
+            now = time.monotonic()
+            if now - self._last_warning < _WARNING_INTERVAL:
+                return
+            self._last_warning = now
+        logger.warning(f"Rate limit store unavailable ({error}), limiting per process")
+
+    def stats(self) -> Dict:
+        with self._lock:
+            decisions = self.allowed + self.limited
+            return {
+                "backend": 'redis' if isinstance(self.store, RedisBucketStore) else 'local',
+                "enabled": self.enabled,
+                "allowed": self.allowed,
+                "limited": self.limited,
+                "errors": self.errors,
+                "avg_decision_ms": round(self.decision_seconds / decisions * 1000, 4) if decisions else 0.0,
+                "max_decision_ms": round(self.max_decision_seconds * 1000, 4)
+            }
+
+
+def create_rate_limiter(storage: str = 'memory', redis_url: Optional[str] = None,
+                        prefix: str = 'skyquest:rl:') -> RateLimiter:
+    """A RateLimiter on Redis when ``storage`` is 'redis' and the server answers, else on local buckets"""
+    if storage != 'redis':
+        return RateLimiter(prefix=prefix)
+    try:
+        store = RedisBucketStore.from_url(redis_url)
+        store.client.ping()
+    except Exception as e:
+        logger.warning(f"Redis rate limit store unavailable ({e}), limiting per process")
+        return RateLimiter(prefix=prefix)
+    return RateLimiter(store, prefix=prefix)
+
+
+def remote_address() -> str:
+    """The client's address, as flask_limiter's get_remote_address gave it"""
+    return request.remote_addr or '127.0.0.1'
+
+
+def key_id(secret: str) -> str:
+    """A short, stable name for an API key that does not reveal it in Redis key names"""
+    return hashlib.sha256(secret.encode()).hexdigest()[:12]
+
+
+class FlaskRateLimiter:
+    """Per-client, per-route limits for a Flask app, with flask_limiter's ``limit`` and ``exempt`` decorators.
+
+    A rejected request is aborted with 429; the app's 429 handler renders it
+    and the Retry-After and X-RateLimit-* headers are added afterwards.
+    """
+
+    def __init__(self, app, limiter: RateLimiter, key_func: Callable[[], str], default_limits: Iterable[str] = ()):
+        self.limiter = limiter
+        self.key_func = key_func
+        self.default_limits = [Limit.parse(text) for text in default_limits]
+        self._route_limits = {}  # endpoint -> [Limit]
+        self._exempt = set()
+        app.before_request(self._check)
+        app.after_request(self._add_headers)
+
+    @property
+    def enabled(self) -> bool:
+        return self.limiter.enabled
+
+    @enabled.setter
+    def enabled(self, value: bool) -> None:
+        self.limiter.enabled = value
+
+    def limit(self, text: str):
+        """Apply ``text`` (e.g. '50 per minute') to the decorated view instead of the default limits"""
+        limit = Limit.parse(text)
+
+        def decorator(view):
+            self._route_limits.setdefault(view.__name__, []).append(limit)
+            return view
+        return decorator
+
+    def exempt(self, view):
+        self._exempt.add(view.__name__)
+        return view
+
+    def _check(self) -> None:
+        endpoint = request.endpoint
+        if endpoint is None or endpoint in self._exempt or not self.limiter.enabled:
+            return
+        client = self.key_func()
+        for limit in self._route_limits.get(endpoint, self.default_limits):
+            decision = self.limiter.hit(f"in:{endpoint}:{client}", limit)
+            # Report the tightest bucket on the response
+            if getattr(g, 'rate_limit', None) is None or decision.remaining < g.rate_limit.remaining:
+                g.rate_limit = decision
+            if not decision.allowed:
+                g.rate_limit = decision
+                abort(429)
+
+    @staticmethod
+    def _add_headers(response):
+        decision = getattr(g, 'rate_limit', None)
+        if decision is not None:
+            response.headers['X-RateLimit-Limit'] = str(decision.limit.count)
+            response.headers['X-RateLimit-Remaining'] = str(max(0, decision.remaining))
+            if not decision.allowed:
+                response.headers['Retry-After'] = str(max(1, int(decision.retry_after + 0.999)))
+        return response
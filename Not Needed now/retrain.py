@@ -0,0 +1,275 @@
+"""
+Retrain the recommendation model from collected user feedback.
+
+Each run:
+  1. Streams feedback lines written since the previous run (per-segment byte
+     offsets are checkpointed) and appends the usable ones to a training
+     dataset, so old feedback is never re-parsed.
+  2. Trains a candidate on events.csv plus all accumulated feedback (its
+     categories spelled as in events.csv; feedback naming any other
+     category is left out) and validates it against a fixed holdout: it is
+     rejected if its accuracy on held-out events.csv rows drops more than
+     RETRAIN_MAX_ACCURACY_DROP below a model trained without the feedback,
+     or if it does worse on held-out feedback.
+  3. Refits the accepted candidate on everything and publishes it with
+     atomic renames; running API workers pick the new artifact up without
+     a restart.
+
+A DecisionTreeClassifier cannot be updated in place, so "incremental" here
+is on the data side: ingestion only reads new feedback, and refits are
+cheap at this data size.
+
+Usage:
+    python retrain.py [--force]
+"""
+
+import argparse
+import fcntl
+import hashlib
+import json
+import os
+import sys
+from typing import Dict, Iterator, Optional, Tuple
+
+import joblib
+import numpy as np
+import pandas as pd
+
+from compiled_model import export_pipeline
+from feedback_store import segment_paths
+from train_model import CATEGORICAL_FEATURES, NUMERICAL_FEATURES, build_pipeline
+
+FEATURES = CATEGORICAL_FEATURES + NUMERICAL_FEATURES
+LIKED = {'liked', 'like', 'positive', 'yes', 'up', 'thumbs_up', '1', 'true'}
+DISLIKED = {'disliked', 'dislike', 'negative', 'no', 'down', 'thumbs_down', '0', 'false'}
+
+
+def feedback_label(value) -> Optional[int]:
+    """1 for positive feedback, 0 for negative, None if it cannot be interpreted"""
+    value = str(value).strip().lower()
+    if value in LIKED:
+        return 1
+    if value in DISLIKED:
+        return 0
+    return None
+
+
+def feedback_row(record: Dict) -> Optional[Dict]:
+    """A training row from one feedback record, or None if it lacks usable features"""
+    label = feedback_label(record.get('feedback'))
+    event = record.get('selected_event')
+    if label is None or not isinstance(event, dict):
+        return None
+
+    preferences = record.get('user_preferences') or {}
+    row = {}
+    for feature in CATEGORICAL_FEATURES:
+        value = event.get(feature) or preferences.get(feature)
+        if not isinstance(value, str) or not value:
+            return None
+        row[feature] = value
+    for feature in NUMERICAL_FEATURES:
+        try:
+            row[feature] = float(event[feature])
+        except (KeyError, TypeError, ValueError):
+            return None
+        if not np.isfinite(row[feature]):
+            return None
+    row['liked'] = label
+    row['session_id'] = str(record.get('session_id', ''))
+    return row
+
+
+def align_categories(feedback: pd.DataFrame, base: pd.DataFrame) -> pd.DataFrame:
+    """Feedback rows with each category spelled as in the catalog, dropping rows the catalog has no category for.
+
+    /recommend echoes preferences lowercased, and the model matches
+    categories case-insensitively, so a feedback 'usa' next to the
+    catalog's 'USA' would shadow it.
+    """
+    aligned = feedback.copy()
+    known = np.ones(len(feedback), dtype=bool)
+    for feature in CATEGORICAL_FEATURES:
+        spellings = {str(value).lower(): value for value in base[feature].unique()}
+        aligned[feature] = feedback[feature].astype(str).str.lower().map(spellings)
+        known &= aligned[feature].notna().to_numpy()
+    return aligned[known]
+
+
+def iter_new_lines(path: str, offset: int) -> Iterator[Tuple[str, int]]:
+    """Complete lines after byte ``offset``, each with the offset just past it"""
+    with open(path, 'rb') as f:
+        f.seek(offset)
+        for raw in f:
+            # A line still being written has no newline yet; pick it up next run
+            if not raw.endswith(b'\n'):
+                break
+            offset += len(raw)
+            yield raw.decode('utf-8', errors='replace'), offset
+
+
+def ingest_feedback(feedback_dir: str, dataset_path: str, checkpoint_path: str,
+                    legacy_file: Optional[str] = 'user_feedback.jsonl') -> int:
+    """Append rows from feedback written since the last run to ``dataset_path``; returns rows added"""
+    checkpoint = {}
+    if os.path.exists(checkpoint_path):
+        with open(checkpoint_path, encoding='utf-8') as f:
+            checkpoint = json.load(f)
+
+    paths = segment_paths(feedback_dir)
+    if legacy_file and os.path.exists(legacy_file):
+        paths.insert(0, legacy_file)
+
+    rows = []
+    for path in paths:
+        key = os.path.abspath(path)
+        offset = checkpoint.get(key, 0)
+        if os.path.getsize(path) < offset:
+            offset = 0  # file was truncated or replaced
+        for line, offset in iter_new_lines(path, offset):
+            try:
+                row = feedback_row(json.loads(line))
+            except ValueError:
+                continue
+            if row is not None:
+                rows.append(row)
+        checkpoint[key] = offset
+
+    if rows:
+        new_rows = pd.DataFrame(rows, columns=FEATURES + ['liked', 'session_id'])
+        new_rows.to_csv(dataset_path, mode='a', index=False, header=not os.path.exists(dataset_path))
+
+    # Checkpoint only after the rows are safely in the dataset
+    _write_json_atomic(checkpoint_path, checkpoint)
+    return len(rows)
+
+
+def holdout_mask(df: pd.DataFrame, fraction: float, key_column: Optional[str] = None) -> np.ndarray:
+    """Deterministic holdout: a row stays in (or out of) the holdout on every run"""
+    keys = df[key_column].astype(str) if key_column else df.index.astype(str)
+    buckets = np.array([int(hashlib.md5(key.encode()).hexdigest()[:8], 16) % 1000 for key in keys])
+    return buckets < int(fraction * 1000)
+
+
+def _accuracy(model, rows: pd.DataFrame) -> Optional[float]:
+    return round(float(model.score(rows[FEATURES], rows['liked'])), 4) if len(rows) else None
+
+
+def evaluate_candidate(base: pd.DataFrame, feedback: pd.DataFrame, holdout_fraction: float,
+                       max_accuracy_drop: float) -> Dict:
+    """Compare a model trained with the feedback against one trained without it.
+
+    The candidate must stay within ``max_accuracy_drop`` of the baseline on
+    held-out events.csv rows, and do at least as well on held-out feedback.
+    """
+    base_holdout = holdout_mask(base, holdout_fraction)
+    feedback_holdout = holdout_mask(feedback, holdout_fraction, 'session_id') if len(feedback) else \
+        np.zeros(0, dtype=bool)
+    baseline_train = base[~base_holdout]
+    candidate_train = pd.concat([baseline_train, feedback[~feedback_holdout]])
+
+    def scorable(rows):
+        # Both models can only score categories the baseline saw (the candidate saw a superset)
+        seen = np.ones(len(rows), dtype=bool)
+        for feature in CATEGORICAL_FEATURES:
+            seen &= rows[feature].isin(set(baseline_train[feature])).to_numpy()
+        return rows[seen]
+
+    base_rows = scorable(base[base_holdout])
+    feedback_rows = scorable(feedback[feedback_holdout])
+    baseline = build_pipeline().fit(baseline_train[FEATURES], baseline_train['liked'])
+    candidate = build_pipeline().fit(candidate_train[FEATURES], candidate_train['liked'])
+
+    report = {
+        "holdout_rows": int(len(base_rows) + len(feedback_rows)),
+        "baseline_accuracy": _accuracy(baseline, base_rows),
+        "candidate_accuracy": _accuracy(candidate, base_rows),
+        "baseline_feedback_accuracy": _accuracy(baseline, feedback_rows),
+        "candidate_feedback_accuracy": _accuracy(candidate, feedback_rows),
+    }
+    accepted = len(base_rows) > 0 and \
+        report["candidate_accuracy"] >= report["baseline_accuracy"] - max_accuracy_drop
+    if len(feedback_rows):
+        accepted = accepted and report["candidate_feedback_accuracy"] >= report["baseline_feedback_accuracy"]
+    report["accepted"] = accepted
+    return report
+
+
+def publish(pipeline, model_path: str, compiled_path: str) -> None:
+    """Write both artifacts next to their targets, then rename into place.
+
+    The compiled model is renamed last because that is the file workers watch.
+    """
+    joblib.dump(pipeline, f'{model_path}.tmp')
+    os.replace(f'{model_path}.tmp', model_path)
+    tmp_compiled = f'{compiled_path}.tmp.npz'
+    export_pipeline(pipeline, tmp_compiled)
+    os.replace(tmp_compiled, compiled_path)
+
+
+def retrain(config, force: bool = False) -> Dict:
+    """Ingest new feedback, validate a candidate and publish it if it holds up"""
+    lock_path = f'{config.RETRAIN_DATASET_PATH}.lock'
+    with open(lock_path, 'w') as lock:
+        # One retrain at a time, even if cron and a manual run overlap
+        fcntl.flock(lock, fcntl.LOCK_EX)
+
+        added = ingest_feedback(config.FEEDBACK_DIR, config.RETRAIN_DATASET_PATH,
+                                config.RETRAIN_CHECKPOINT_PATH)
+        report = {"new_feedback_rows": added}
+        if added < config.RETRAIN_MIN_NEW_ROWS and not force:
+            report["published"] = False
+            report["reason"] = f"fewer than {config.RETRAIN_MIN_NEW_ROWS} new feedback rows"
+            return report
+
+        base = pd.read_csv(config.RETRAIN_BASE_DATA)
+        if os.path.exists(config.RETRAIN_DATASET_PATH):
+            feedback = pd.read_csv(config.RETRAIN_DATASET_PATH)
+        else:
+            feedback = pd.DataFrame(columns=FEATURES + ['liked', 'session_id'])
+        feedback = feedback.astype({'liked': int})
+        aligned = align_categories(feedback, base)
+        report["feedback_rows"] = int(len(aligned))
+        report["feedback_rows_unmatched"] = int(len(feedback) - len(aligned))
+        feedback = aligned
+
+        report.update(evaluate_candidate(base, feedback, config.RETRAIN_HOLDOUT_FRACTION,
+                                         config.RETRAIN_MAX_ACCURACY_DROP))
+        if not report["accepted"]:
+            report["published"] = False
+            report["reason"] = "candidate failed holdout validation"
+            return report
+
+        training = pd.concat([base[FEATURES + ['liked']], feedback[FEATURES + ['liked']]], ignore_index=True)
+        pipeline = build_pipeline().fit(training[FEATURES], training['liked'])
+        publish(pipeline, config.MODEL_PATH, config.COMPILED_MODEL_PATH)
+        report["published"] = True
+        report["training_rows"] = int(len(training))
+        return report
+
+
+def _write_json_atomic(path: str, data: Dict) -> None:
+    with open(f'{path}.tmp', 'w', encoding='utf-8') as f:
+        json.dump(data, f)
+    os.replace(f'{path}.tmp', path)
+
+
+def main():
+    from config import FEATURE_FLAGS, get_config
+
+    parser = argparse.ArgumentParser(description="Retrain the model from collected feedback")
+    parser.add_argument('--force', action='store_true',
+                        help="run even if retraining is disabled or there is not enough new feedback")
+    args = parser.parse_args()
+
+    if not FEATURE_FLAGS['ENABLE_MODEL_RETRAINING'] and not args.force:
+        print("Model retraining is disabled (FEATURE_FLAGS['ENABLE_MODEL_RETRAINING']); use --force to run anyway")
+        return 0
+
+    report = retrain(get_config(), force=args.force)
+    print(json.dumps(report, indent=2))
+    return 0 if report.get("published") or not report.get("reason", "").startswith("candidate") else 1
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,87 @@
+"""
+Tests for the background access log
+"""
+
+import json
+import os
+import tempfile
+import time
+
+from flask import Flask, jsonify, request
+
+from access_log import AccessLog
+
+
+def make_app(access_log):
+    app = Flask(__name__)
+
+    @app.route('/events/<kind>', methods=['GET', 'POST'])
+    def events(kind):
+        return jsonify({"kind": kind, "events": list(range(100))})
+
+    @app.before_request
+    def start_timer():
+        request.start_time = time.time()
+
+    @app.after_request
+    def log(response):
+        access_log.record(request, response, time.time() - request.start_time)
+        return response
+
+    return app
+
+
+def read_records(path):
+    with open(path, encoding='utf-8') as f:
+        return [json.loads(line) for line in f]
+
+
+def test_records_route_status_size_and_digest():
+    with tempfile.TemporaryDirectory() as tmp:
+        path = os.path.join(tmp, 'logs', 'access.log')
+        access_log = AccessLog(path=path, digest_rate=1.0, flush_interval=0.05)
+        client = make_app(access_log).test_client()
+
+        response = client.post('/events/meteor?limit=5', json={'a': 1})
+        client.post('/events/meteor?limit=5', json={'a': 1})
+        client.get('/missing')
+        access_log.close()
+
+        records = read_records(path)
+        assert [r['route'] for r in records] == ['/events/<kind>', '/events/<kind>', '/missing']
+        assert records[0]['path'].startswith('/events/') and records[0]['remote_addr'] == '127.0.0.1'
+        assert [r['status'] for r in records] == [200, 200, 404]
+        assert records[0]['bytes'] == len(response.get_data())
+        assert records[0]['method'] == 'POST'
+        assert records[0]['digest'] == records[1]['digest'] != records[2]['digest']
+
+
+def test_background_writer_flushes_without_close():
+    with tempfile.TemporaryDirectory() as tmp:
+        path = os.path.join(tmp, 'access.log')
+        access_log = AccessLog(path=path, digest_rate=0.0, flush_interval=0.05)
+        client = make_app(access_log).test_client()
+        for _ in range(20):
+            client.get('/events/eclipse')
+
+        deadline = time.time() + 5
+        while access_log.written < 20 and time.time() < deadline:
+            time.sleep(0.01)
+        assert access_log.written == 20
+        assert 'digest' not in read_records(path)[0]
+        access_log.close()
+
+
+def test_sampling_and_full_queue_drop_records():
+    sampled = AccessLog(sample_rate=0.0)
+    client = make_app(sampled).test_client()
+    client.get('/events/eclipse')
+    assert sampled.stats()['queued'] == 0
+
+    full = AccessLog(max_queue=1, flush_interval=60)
+    full._ensure_writer = lambda: None  # no writer, so the queue stays full
+    client = make_app(full).test_client()
+    client.get('/events/eclipse')
+    client.get('/events/eclipse')
+    assert full.stats()['queued'] == 1
+    assert full.dropped == 1
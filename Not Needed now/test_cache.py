@@ -0,0 +1,262 @@
+"""
+Unit tests for the bounded LRU/TTL cache in utils
+"""
+
+import threading
+
+import utils
+from cache_backends import FakeRedis, RedisCache, TieredCache
+from utils import Cache, cache_result
+
+
+class FakeClock:
+    def __init__(self, now=1000.0):
+        self.now = now
+
+    def __call__(self):
+        return self.now
+
+
+def test_lru_eviction_by_entry_count():
+    cache = Cache(max_entries=2)
+    cache.set('a', 1)
+    cache.set('b', 2)
+    assert cache.get('a') == 1  # 'b' is now least recently used
+    cache.set('c', 3)
+
+    assert cache.get('b') is None
+    assert cache.get('a') == 1
+    assert cache.get('c') == 3
+    assert cache.stats()['evictions'] == 1
+
+
+def test_byte_budget_evicts_and_rejects_oversized_values():
+    cache = Cache(max_entries=100, max_bytes=1600)
+    cache.set('small', 'x' * 100)
+    cache.set('big', 'y' * 1500)
+    assert cache.get('small') is None
+    assert cache.stats()['bytes'] <= 1600
+
+    cache.set('huge', 'z' * 5000)
+    assert cache.get('huge') is None
+    assert cache.get('big') is not None
+
+
+def test_per_entry_ttl(monkeypatch):
+    clock = FakeClock()
+    monkeypatch.setattr(utils.time, 'time', clock)
+    cache = Cache(default_timeout=300)
+    cache.set('short', 1, timeout=10)
+    cache.set('default', 2)
+    cache.set('forever', 3, timeout=0)
+
+    clock.now += 11
+    assert cache.get('short') is None
+    assert cache.get('default') == 2
+
+    clock.now += 300
+    assert cache.get('default') is None
+    assert cache.get('forever') == 3
+    assert cache.stats()['expirations'] == 2
+
+
+def test_hit_miss_counters():
+    cache = Cache()
+    cache.get('missing')
+    cache.set('k', 'v')
+    cache.get('k')
+    cache.get('k')
+
+    stats = cache.stats()
+    assert (stats['hits'], stats['misses']) == (2, 1)
+    assert stats['hit_rate'] == round(2 / 3, 4)
+
+
+def test_cache_result_honours_timeout(monkeypatch):
+    clock = FakeClock()
+    monkeypatch.setattr(utils.time, 'time', clock)
+    monkeypatch.setattr(utils, 'cache', Cache(default_timeout=300))
+    calls = []
+
+    @cache_result(timeout=5)
+    def compute(x):
+        calls.append(x)
+        return x * 2
+
+    assert compute(2) == 4
+    assert compute(2) == 4
+    clock.now += 6
+    assert compute(2) == 4
+    assert calls == [2, 2]
+
+
+def test_concurrent_access_keeps_accounting_consistent():
+    cache = Cache(max_entries=50)
+
+    def worker(offset):
+        for i in range(500):
+            cache.set(f'{offset}:{i}', i)
+            cache.get(f'{offset}:{i - 1}')
+
+    threads = [threading.Thread(target=worker, args=(n,)) for n in range(8)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+    stats = cache.stats()
+    assert stats['entries'] == 50
+    assert stats['hits'] + stats['misses'] == 8 * 500
+    assert stats['bytes'] == sum(size for _, _, size in cache._cache.values())
+
+
+def make_events_app(version):
+    """Tiny Flask app with one cached view that echoes its query string"""
+    from flask import Flask, request
+
+    app = Flask(__name__)
+    calls = []
+
+    @app.route('/events')
+    @utils.cache_response(timeout=60, version=lambda: version[0])
+    def events():
+        calls.append(request.query_string)
+        if request.args.get('fail'):
+            return utils.create_error_response("boom", 500)
+        return utils.create_response({"event_type": request.args.get('event_type')})
+
+    return app, calls
+
+
+def test_cache_response_keys_on_query_and_version(monkeypatch):
+    monkeypatch.setattr(utils, 'cache', Cache())
+    version = ['v1']
+    app, calls = make_events_app(version)
+    client = app.test_client()
+
+    first = client.get('/events?event_type=meteor&b=2&a=1')
+    other = client.get('/events?event_type=eclipse')
+    reordered = client.get('/events?a=1&event_type=meteor&b=2')
+
+    assert first.get_json()['data']['event_type'] == 'meteor'
+    assert other.get_json()['data']['event_type'] == 'eclipse'
+    assert reordered.headers['X-Cache'] == 'HIT'
+    assert reordered.get_data() == first.get_data()
+    assert len(calls) == 2
+
+    version[0] = 'v2'
+    assert client.get('/events?event_type=meteor&b=2&a=1').headers['X-Cache'] == 'MISS'
+    assert len(calls) == 3
+
+
+def test_cache_response_etag_revalidation(monkeypatch):
+    monkeypatch.setattr(utils, 'cache', Cache())
+    app, _ = make_events_app(['v1'])
+    client = app.test_client()
+
+    first = client.get('/events?event_type=meteor')
+    etag = first.headers['ETag']
+    revalidated = client.get('/events?event_type=meteor', headers={'If-None-Match': etag})
+
+    assert revalidated.status_code == 304
+    assert revalidated.get_data() == b''
+    assert revalidated.headers['ETag'] == etag
+
+
+def test_cache_response_skips_errors(monkeypatch):
+    monkeypatch.setattr(utils, 'cache', Cache())
+    app, calls = make_events_app(['v1'])
+    client = app.test_client()
+
+    client.get('/events?fail=1')
+    client.get('/events?fail=1')
+    assert len(calls) == 2
+
+
+def test_cache_response_does_not_buffer_streams(monkeypatch):
+    from flask import Flask
+
+    monkeypatch.setattr(utils, 'cache', Cache())
+    app = Flask(__name__)
+    produced = []
+
+    def records():
+        for i in range(3):
+            produced.append(i)
+            yield {'id': i}
+
+    @app.route('/events')
+    @utils.cache_response(timeout=60)
+    def events():
+        return utils.create_ndjson_response(records())
+
+    response = app.test_client().get('/events', buffered=False)
+    assert response.mimetype == 'application/x-ndjson'
+    assert len(produced) < 3  # records are generated as the body is read, not up front
+    assert response.get_data(as_text=True).splitlines() == ['{"id": 0}', '{"id": 1}', '{"id": 2}']
+    assert utils.cache.size() == 0
+
+
+def make_tiered(l1_timeout=30):
+    shared = RedisCache(FakeRedis(), compress_min_bytes=64)
+    return shared, TieredCache(Cache(max_entries=8), shared, l1_timeout=l1_timeout)
+
+
+def test_redis_cache_round_trip_and_compression():
+    client = FakeRedis()
+    shared = RedisCache(client, prefix='test:', compress_min_bytes=64)
+    big = {'events': ['meteor shower'] * 100}
+    shared.set('small', {'a': 1})
+    shared.set('big', big)
+
+    assert client.get('test:small')[:1] == b'p'
+    assert client.get('test:big')[:1] == b'z'
+    assert len(client.get('test:big')) < len(repr(big))
+    assert shared.get_many(['small', 'big', 'missing']) == {'small': {'a': 1}, 'big': big}
+    assert (shared.hits, shared.misses) == (2, 1)
+
+    shared.clear()
+    assert shared.get('small') is None
+
+
+def test_tiered_cache_shares_l2_between_workers():
+    shared, worker_a = make_tiered()
+    worker_b = TieredCache(Cache(max_entries=8), shared)
+
+    worker_a.set('events', [1, 2, 3], timeout=300)
+    assert worker_b.get('events') == [1, 2, 3]  # L1 miss, L2 hit
+    assert worker_b.get('events') == [1, 2, 3]  # now from L1
+
+    stats = worker_b.stats()
+    assert stats['l1']['hits'] == 1
+    assert stats['l2']['hits'] == 1
+    assert stats['hit_rate'] == 1.0
+
+
+def test_tiered_cache_l1_expires_before_l2(monkeypatch):
+    clock = FakeClock()
+    monkeypatch.setattr(utils.time, 'time', clock)
+    shared, tiered = make_tiered(l1_timeout=5)
+    tiered.set('k', 'v1', timeout=300)
+
+    shared.set('k', 'v2', timeout=300)  # another worker overwrote it
+    assert tiered.get('k') == 'v1'
+    clock.now += 6
+    assert tiered.get('k') == 'v2'
+
+
+def test_create_cache_falls_back_without_redis():
+    class Config:
+        CACHE_TYPE = 'redis'
+        CACHE_REDIS_URL = 'redis://127.0.0.1:1/0'
+        CACHE_KEY_PREFIX = 'test:'
+        CACHE_DEFAULT_TIMEOUT = 300
+        CACHE_MAX_ENTRIES = 16
+        CACHE_MAX_BYTES = 1024 * 1024
+        CACHE_COMPRESS_MIN_BYTES = 1024
+        CACHE_L1_MAX_ENTRIES = 4
+        CACHE_L1_TIMEOUT = 30
+
+    backend = utils.create_cache(Config)
+    assert isinstance(backend, Cache)
+    assert backend.max_entries == 16
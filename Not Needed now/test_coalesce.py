@@ -0,0 +1,79 @@
+"""
+Tests for in-flight request coalescing
+"""
+
+import threading
+
+import pytest
+
+from coalesce import CACHED, COALESCED, COMPUTED, Coalescer
+
+
+class Clock:
+    def __init__(self):
+        self.now = 0.0
+
+    def __call__(self):
+        return self.now
+
+
+def test_concurrent_identical_calls_share_one_computation():
+    coalescer = Coalescer(ttl=0)
+    started, release = threading.Event(), threading.Event()
+    calls = []
+
+    def compute():
+        calls.append(1)
+        started.set()
+        release.wait(5)
+        return ['result']
+
+    results = []
+    leader = threading.Thread(target=lambda: results.append(coalescer.get_or_compute('key', compute)))
+    leader.start()
+    started.wait(5)
+    followers = [threading.Thread(target=lambda: results.append(coalescer.get_or_compute('key', compute)))
+                 for _ in range(8)]
+    for thread in followers:
+        thread.start()
+    # Let the followers reach the wait before the computation finishes
+    while coalescer.stats()['coalesced'] < 8:
+        pass
+    release.set()
+    for thread in [leader] + followers:
+        thread.join(5)
+
+    assert len(calls) == 1
+    assert sorted(source for _, source in results) == [COALESCED] * 8 + [COMPUTED]
+    assert all(value is results[0][0] for value, _ in results)
+
+
+def test_results_are_kept_for_the_ttl_per_key():
+    clock = Clock()
+    coalescer = Coalescer(ttl=2.0, clock=clock)
+    assert coalescer.get_or_compute('a', lambda: 1) == (1, COMPUTED)
+    assert coalescer.get_or_compute('a', lambda: 2) == (1, CACHED)
+    assert coalescer.get_or_compute('b', lambda: 3) == (3, COMPUTED)
+    clock.now = 2.5
+    assert coalescer.get_or_compute('a', lambda: 4) == (4, COMPUTED)
+    assert coalescer.stats()['shared_rate'] == 0.25
+
+
+def test_errors_are_not_kept():
+    coalescer = Coalescer(ttl=10)
+
+    def fail():
+        raise RuntimeError("upstream down")
+
+    with pytest.raises(RuntimeError):
+        coalescer.get_or_compute('a', fail)
+    assert coalescer.get_or_compute('a', lambda: 'ok') == ('ok', COMPUTED)
+    assert coalescer.stats()['errors'] == 1
+
+
+def test_kept_results_are_bounded():
+    coalescer = Coalescer(ttl=10, max_entries=2)
+    for key in 'abc':
+        coalescer.get_or_compute(key, lambda: key)
+    assert coalescer.stats()['entries'] == 2
+    assert coalescer.get_or_compute('a', lambda: 'new') == ('new', COMPUTED)
@@ -0,0 +1,101 @@
+"""
+Parity tests for the compiled decision-tree evaluator against the sklearn pipeline
+"""
+
+import os
+import subprocess
+import sys
+import tempfile
+
+import numpy as np
+import pandas as pd
+import pytest
+
+from compiled_model import CompiledModel, export_pipeline
+from inference import GridScorer
+from train_model import build_pipeline
+
+HERE = os.path.dirname(os.path.abspath(__file__))
+EVENTS_CSV = os.path.join(HERE, 'events.csv')
+
+
+def compile_pipeline():
+    """Fit the training pipeline on events.csv and round-trip it through an export"""
+    df = pd.read_csv(EVENTS_CSV)
+    X = df.drop('liked', axis=1)
+    pipeline = build_pipeline().fit(X, df['liked'])
+
+    with tempfile.TemporaryDirectory() as tmp:
+        path = os.path.join(tmp, 'model.npz')
+        export_pipeline(pipeline, path)
+        compiled = CompiledModel.load(path)
+    return pipeline, compiled, X
+
+
+def test_batch_parity_on_events_csv():
+    pipeline, compiled, X = compile_pipeline()
+    records = X.to_dict('records')
+
+    np.testing.assert_array_equal(compiled.predict_proba(records), pipeline.predict_proba(X))
+    np.testing.assert_array_equal(compiled.predict(records), pipeline.predict(X))
+
+
+def test_single_row_parity_on_events_csv():
+    pipeline, compiled, X = compile_pipeline()
+    expected = pipeline.predict_proba(X)
+
+    for i, record in enumerate(X.to_dict('records')):
+        assert compiled.predict_proba_one(record) == expected[i].tolist()
+
+
+def test_grid_scorer_parity_between_backends():
+    pipeline, compiled, X = compile_pipeline()
+    sklearn_scorer = GridScorer(pipeline)
+    compiled_scorer = GridScorer(compiled)
+
+    for record in X.drop_duplicates(['event_type', 'location', 'time_of_day']).to_dict('records'):
+        expected = sklearn_scorer.score(record)
+        actual = compiled_scorer.score(record)
+        np.testing.assert_array_equal(actual[0], expected[0])
+        np.testing.assert_array_equal(actual[1], expected[1])
+
+
+def test_feature_names_match_encoder():
+    pipeline, compiled, _ = compile_pipeline()
+    encoder = pipeline.named_steps['preprocessor'].named_transformers_['cat']
+    assert compiled.encoded_feature_names == encoder.get_feature_names_out().tolist()
+
+
+def test_categories_differing_only_in_case_are_rejected():
+    df = pd.read_csv(EVENTS_CSV)
+    df = pd.concat([df, df.head(2).assign(location='usa')], ignore_index=True)
+    pipeline = build_pipeline().fit(df.drop('liked', axis=1), df['liked'])
+    with pytest.raises(ValueError, match='location'):
+        GridScorer(pipeline)
+    with tempfile.TemporaryDirectory() as tmp:
+        path = os.path.join(tmp, 'model.npz')
+        export_pipeline(pipeline, path)
+        with pytest.raises(ValueError, match='location'):
+            CompiledModel.load(path)
+
+
+def test_evaluator_does_not_import_sklearn():
+    pipeline, _, _ = compile_pipeline()
+    with tempfile.TemporaryDirectory() as tmp:
+        path = os.path.join(tmp, 'model.npz')
+        export_pipeline(pipeline, path)
+        code = (
+            "import sys; from compiled_model import CompiledModel; "
+            f"m = CompiledModel.load({path!r}); "
+            "m.predict_proba_one({'event_type': 'meteor shower', 'location': 'USA', "
+            "'time_of_day': 'night', 'duration': 120, 'popularity_score': 8.5}); "
+            "assert 'sklearn' not in sys.modules"
+        )
+        subprocess.run([sys.executable, '-c', code], cwd=HERE, check=True)
+
+
+def test_compiled_recommend_many_matches_sklearn():
+    pipeline, compiled, X = compile_pipeline()
+    profiles = X[['event_type', 'location', 'time_of_day']].drop_duplicates().to_dict('records')
+
+    assert GridScorer(compiled).recommend_many(profiles, 3) == GridScorer(pipeline).recommend_many(profiles, 3)
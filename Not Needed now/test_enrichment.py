@@ -0,0 +1,72 @@
+"""
+Parity tests for the vectorized event enrichment against enrich_event_data
+"""
+
+import os
+
+import numpy as np
+import pandas as pd
+
+from utils import (
+    ENRICHED_COLUMNS, build_enrichment_index, enrich_event_data, enrich_events_frame,
+    enrich_from_index, format_duration, format_durations
+)
+
+EVENTS_CSV = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'events.csv')
+# config.EVENT_TYPES, without importing config (it needs SECRET_KEY)
+EVENT_TYPES = ['meteor shower', 'solar eclipse', 'lunar eclipse', 'rocket launch', 'comet viewing',
+               'aurora borealis', 'planetary conjunction', 'star party']
+
+
+def expected_columns(df):
+    rows = [enrich_event_data(event) for event in df.to_dict('records')]
+    return pd.DataFrame(rows, index=df.index)[ENRICHED_COLUMNS]
+
+
+def test_format_durations_matches_format_duration():
+    minutes = pd.Series([0, 1, 59, 60, 61, 119, 120, 121, 180, 600, 1441])
+    assert format_durations(minutes).tolist() == [format_duration(m) for m in minutes]
+
+
+def test_enrich_events_frame_matches_per_row_on_events_csv():
+    df = pd.read_csv(EVENTS_CSV)
+    enriched = enrich_events_frame(df)
+
+    pd.testing.assert_frame_equal(enriched[ENRICHED_COLUMNS], expected_columns(df), check_dtype=False)
+    pd.testing.assert_frame_equal(enriched[df.columns], df)
+
+
+def test_enrich_events_frame_matches_per_row_on_edge_values():
+    rng = np.random.default_rng(1)
+    n_rows = 2_000
+    popularity = rng.choice([6.9, 7.0, 7.99, 8.0, 8.5, 9.0, 9.9, np.nan], n_rows)
+    df = pd.DataFrame({
+        'event_type': rng.choice(EVENT_TYPES + ['Rocket Launch', 'Star Party'], n_rows),
+        'duration': rng.choice([30, 60, 61, 120, 180, 181, 240, 300], n_rows),
+        'popularity_score': popularity,
+    })
+
+    enriched = enrich_events_frame(df)
+    pd.testing.assert_frame_equal(enriched[ENRICHED_COLUMNS], expected_columns(df), check_dtype=False)
+
+
+def test_enrich_events_frame_matches_per_row_with_missing_durations():
+    for durations in ([np.nan], [np.nan, 45, 90, 200]):
+        df = pd.DataFrame({
+            'event_type': ['comet viewing'] * len(durations),
+            'duration': durations,
+            'popularity_score': [8.0] * len(durations),
+        })
+        enriched = enrich_events_frame(df)
+        pd.testing.assert_frame_equal(enriched[ENRICHED_COLUMNS], expected_columns(df), check_dtype=False)
+
+
+def test_enrichment_index_matches_per_row():
+    index = build_enrichment_index(EVENT_TYPES, [60, 180, 300], [7.0, 8.5])
+    event = {'event_type': 'meteor shower', 'location': 'usa', 'duration': 300, 'popularity_score': 8.5}
+
+    assert len(index) == len(EVENT_TYPES) * 6
+    assert enrich_from_index(event, index) == enrich_event_data(event)
+
+    off_grid = dict(event, duration=45)
+    assert enrich_from_index(off_grid, index) == enrich_event_data(off_grid)
@@ -0,0 +1,149 @@
+"""
+Tests for the indexed EventStore against plain DataFrame filtering
+"""
+
+import itertools
+import os
+
+import numpy as np
+import pandas as pd
+
+from event_store import EventStore, decode_cursor, encode_cursor
+from utils import enrich_event_data, enrich_events_frame
+
+EVENTS_CSV = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'events.csv')
+
+
+def dataframe_filter(df, event_type=None, location=None, time_of_day=None,
+                     min_popularity=None, max_duration=None):
+    """The mask-based filtering /events used before EventStore"""
+    filtered = df.copy()
+    if event_type:
+        filtered = filtered[filtered['event_type'].str.lower() == event_type.lower()]
+    if location:
+        filtered = filtered[filtered['location'] == location]
+    if time_of_day:
+        filtered = filtered[filtered['time_of_day'].str.lower() == time_of_day.lower()]
+    if min_popularity is not None:
+        filtered = filtered[filtered['popularity_score'] >= min_popularity]
+    if max_duration is not None:
+        filtered = filtered[filtered['duration'] <= max_duration]
+    return filtered
+
+
+def synthetic_events(n_rows, seed=0):
+    rng = np.random.default_rng(seed)
+    base = pd.read_csv(EVENTS_CSV)
+    popularity = rng.uniform(5, 10, n_rows).round(1)
+    popularity[rng.random(n_rows) < 0.01] = np.nan
+    return pd.DataFrame({
+        'event_type': rng.choice(base['event_type'].unique(), n_rows),
+        'location': rng.choice(base['location'].unique(), n_rows),
+        'time_of_day': rng.choice(['day', 'night', 'Night'], n_rows),
+        'duration': rng.integers(10, 600, n_rows),
+        'popularity_score': popularity,
+        'liked': rng.integers(0, 2, n_rows)
+    })
+
+
+def test_filters_match_dataframe_on_events_csv():
+    df = pd.read_csv(EVENTS_CSV)
+    store = EventStore(df)
+
+    for event_type, location, time_of_day, min_popularity, max_duration in itertools.product(
+            [None, 'Meteor Shower', 'solar eclipse'], [None, 'USA', 'usa'], [None, 'night', 'DAY'],
+            [None, 8.0], [None, 120]):
+        filters = dict(event_type=event_type, location=location, time_of_day=time_of_day,
+                       min_popularity=min_popularity, max_duration=max_duration)
+        expected = dataframe_filter(df, **filters)
+        assert store.filter_ids(**filters).tolist() == expected.index.tolist(), filters
+
+
+def test_filters_match_dataframe_on_large_table():
+    df = synthetic_events(50_000)
+    store = EventStore(df)
+
+    for filters in [
+        {'event_type': 'aurora borealis'},
+        {'time_of_day': 'night', 'min_popularity': 9.5},
+        {'location': 'Norway', 'max_duration': 60, 'min_popularity': 7.0},
+        {'min_popularity': 8.0, 'max_duration': 300},
+        {'event_type': 'star party', 'location': 'Iceland', 'time_of_day': 'day'},
+    ]:
+        expected = dataframe_filter(df, **filters)
+        assert store.filter_ids(**filters).tolist() == expected.index.tolist(), filters
+
+
+def test_records_are_pre_enriched():
+    df = pd.read_csv(EVENTS_CSV)
+    store = EventStore(enrich_events_frame(df))
+
+    assert len(store) == len(df)
+    assert store.records[0] == enrich_event_data(df.iloc[0].to_dict())
+    assert store.filter(location='Atlantis') == []
+    assert store.event_types == sorted(df['event_type'].unique().tolist())
+
+
+def test_cursor_pages_cover_every_row_once():
+    store = EventStore(synthetic_events(1_000))
+    rows = store.filter_ids(time_of_day='night')
+
+    seen, after = [], None
+    while True:
+        page, after = store.page(rows, after=after, limit=70)
+        seen.extend(page.tolist())
+        if after is None:
+            break
+    assert seen == rows.tolist()
+
+
+def test_cursor_round_trip_and_expiry():
+    cursor = encode_cursor(41, 'v1')
+    assert decode_cursor(cursor, 'v1') == 41
+    for bad in ['not-a-cursor', encode_cursor(41, 'v2')]:
+        try:
+            decode_cursor(bad, 'v1')
+        except ValueError:
+            pass
+        else:
+            raise AssertionError(f"{bad!r} should be rejected")
+
+
+def test_field_projection():
+    store = EventStore(pd.read_csv(EVENTS_CSV))
+
+    assert store.parse_fields(None) is None
+    fields = store.parse_fields('event_type, location')
+    assert list(store.iter_records(np.array([0]), fields)) == [
+        {key: store.records[0][key] for key in ['event_type', 'location']}
+    ]
+    try:
+        store.parse_fields('event_type,password')
+    except ValueError as e:
+        assert 'password' in str(e)
+    else:
+        raise AssertionError("unknown field should be rejected")
+
+
+def test_version_follows_the_data_not_the_files():
+    df = enrich_events_frame(pd.read_csv(EVENTS_CSV))
+    assert EventStore(df).version == EventStore(df.copy()).version
+    changed = df.copy()
+    changed.loc[0, 'popularity_score'] += 1
+    assert EventStore(changed).version != EventStore(df).version
+
+
+def test_limited_ndjson_stream_hands_out_the_next_cursor(monkeypatch):
+    import app
+    store = EventStore(enrich_events_frame(pd.read_csv(EVENTS_CSV)))
+    monkeypatch.setattr(app, 'event_store', store)
+    monkeypatch.setattr(app, 'data_version', store.version)
+    client = app.app.test_client()
+
+    seen, url = [], '/events?format=ndjson&limit=15&fields=event_type'
+    while url:
+        response = client.get(url)
+        seen.extend(response.get_data(as_text=True).splitlines())
+        cursor = response.headers.get('X-Next-Cursor')
+        url = f'/events?format=ndjson&limit=15&fields=event_type&cursor={cursor}' if cursor else None
+    assert len(seen) == len(store.records)
@@ -0,0 +1,80 @@
+"""
+Tests for the memory-mapped column-array events table
+"""
+
+import os
+import tempfile
+
+import numpy as np
+import pandas as pd
+
+from event_store import EventStore
+from event_table import EventTable, export_event_table
+from utils import enrich_events_frame
+
+EVENTS_CSV = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'events.csv')
+
+
+def test_round_trip_matches_dataframe_records():
+    df = enrich_events_frame(pd.read_csv(EVENTS_CSV))
+    with tempfile.TemporaryDirectory() as tmp:
+        export_event_table(df, tmp)
+        table = EventTable.load(tmp)
+
+        assert len(table) == len(df)
+        assert table.columns == list(df.columns)
+        expected = [{key: value.item() if hasattr(value, 'item') else value for key, value in record.items()}
+                    for record in df.to_dict('records')]
+        assert table.to_dict('records') == expected
+
+
+def test_columns_are_memory_mapped():
+    df = pd.read_csv(EVENTS_CSV)
+    with tempfile.TemporaryDirectory() as tmp:
+        export_event_table(df, tmp)
+        table = EventTable.load(tmp)
+        assert isinstance(table['popularity_score'], np.memmap)
+        assert isinstance(table['event_type'], np.memmap)
+        assert table['event_type'].dtype.kind == 'U'
+
+        in_memory = EventTable.load(tmp, mmap=False)
+        assert not isinstance(in_memory['event_type'], np.memmap)
+
+
+def test_table_is_only_complete_with_its_manifest():
+    with tempfile.TemporaryDirectory() as tmp:
+        assert not EventTable.exists(tmp)
+        export_event_table(pd.read_csv(EVENTS_CSV), tmp)
+        assert EventTable.exists(tmp)
+
+
+def test_event_store_is_the_same_from_table_or_dataframe():
+    df = enrich_events_frame(pd.read_csv(EVENTS_CSV))
+    with tempfile.TemporaryDirectory() as tmp:
+        export_event_table(df, tmp)
+        from_table = EventStore(EventTable.load(tmp))
+    from_frame = EventStore(df)
+
+    assert from_table.records == from_frame.records
+    assert from_table.event_types == from_frame.event_types
+    assert from_table.locations == from_frame.locations
+    for filters in ({'event_type': 'METEOR SHOWER'}, {'location': 'USA', 'time_of_day': 'night'},
+                    {'min_popularity': 8.0, 'max_duration': 180}):
+        assert from_table.filter_ids(**filters).tolist() == from_frame.filter_ids(**filters).tolist()
+
+
+def test_export_never_rewrites_mapped_files():
+    df = pd.read_csv(EVENTS_CSV)
+    with tempfile.TemporaryDirectory() as tmp:
+        export_event_table(df, tmp)
+        serving = EventTable.load(tmp)
+        first_scores = np.array(serving['popularity_score'])
+
+        # Retraining while a worker has the table mapped
+        export_event_table(df.assign(popularity_score=df['popularity_score'] + 1), tmp)
+        np.testing.assert_array_equal(serving['popularity_score'], first_scores)
+        np.testing.assert_array_equal(EventTable.load(tmp)['popularity_score'], first_scores + 1)
+
+        export_event_table(df, tmp)
+        versions = [name for name in os.listdir(tmp) if name.startswith('v-')]
+        assert len(versions) == 2  # the current one and the one before it
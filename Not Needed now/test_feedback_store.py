@@ -0,0 +1,119 @@
+"""
+Tests for the batched feedback writer
+"""
+
+import multiprocessing
+import os
+import tempfile
+import threading
+import time
+
+import pytest
+
+from feedback_store import FeedbackWriter, read_feedback, segment_paths
+
+
+def feedback(i):
+    return {'session_id': f'{i:08x}', 'feedback': 'liked', 'selected_event': {'event_type': 'star party'}}
+
+
+def test_batches_are_written_and_read_back_in_order():
+    with tempfile.TemporaryDirectory() as tmp:
+        writer = FeedbackWriter(directory=tmp, batch_size=100, flush_interval=0.05, fsync='interval')
+        for i in range(1000):
+            assert writer.submit(feedback(i))
+        writer.close()
+
+        records = list(read_feedback(tmp, legacy_file=None))
+        assert [r['session_id'] for r in records] == [f'{i:08x}' for i in range(1000)]
+        assert writer.stats()['written'] == 1000
+        assert writer.batches <= 1000 // 50
+
+
+def test_always_acknowledges_only_after_the_batch_is_synced():
+    with tempfile.TemporaryDirectory() as tmp:
+        # A flush interval this long would stall an 'interval' submit's write for a minute
+        writer = FeedbackWriter(directory=tmp, batch_size=100, flush_interval=60, fsync='always')
+        assert writer.submit(feedback(1))
+        assert [r['session_id'] for r in read_feedback(tmp, legacy_file=None)] == ['00000001']
+
+        # Concurrent submits share batches (and fsyncs)
+        threads = [threading.Thread(target=lambda i=i: writer.submit(feedback(i))) for i in range(2, 202)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        assert writer.written == 201 and writer.batches < 201
+        writer.close()
+
+
+def test_always_reports_a_failed_write():
+    with tempfile.TemporaryDirectory() as tmp:
+        blocker = os.path.join(tmp, 'not-a-directory')
+        open(blocker, 'w').close()
+        writer = FeedbackWriter(directory=blocker, fsync='always')
+        assert not writer.submit(feedback(1))
+        assert writer.dropped == 1
+        writer.close()
+
+
+def test_background_flush_by_time():
+    with tempfile.TemporaryDirectory() as tmp:
+        writer = FeedbackWriter(directory=tmp, batch_size=1000, flush_interval=0.05, fsync='never')
+        writer.submit(feedback(1))
+
+        deadline = time.time() + 5
+        while writer.written < 1 and time.time() < deadline:
+            time.sleep(0.01)
+        assert [r['session_id'] for r in read_feedback(tmp, legacy_file=None)] == ['00000001']
+        writer.close()
+
+
+def test_segments_rotate_and_legacy_file_is_read_first():
+    with tempfile.TemporaryDirectory() as tmp:
+        legacy = os.path.join(tmp, 'user_feedback.jsonl')
+        with open(legacy, 'w') as f:
+            f.write('{"session_id": "legacy"}\n{"session_id": "trunc')
+
+        writer = FeedbackWriter(directory=tmp, batch_size=10, segment_max_bytes=500)
+        for i in range(50):
+            writer.submit(feedback(i))
+        writer.close()
+
+        assert len(segment_paths(tmp)) > 1
+        records = list(read_feedback(tmp, legacy_file=legacy))
+        assert records[0] == {'session_id': 'legacy'}
+        assert len(records) == 51
+
+
+def write_in_worker(directory, offset):
+    writer = FeedbackWriter(directory=directory, batch_size=50, flush_interval=0.01)
+    for i in range(offset, offset + 500):
+        writer.submit(feedback(i))
+    writer.close()
+
+
+def test_workers_write_separate_segments_without_interleaving():
+    with tempfile.TemporaryDirectory() as tmp:
+        context = multiprocessing.get_context('fork')
+        workers = [context.Process(target=write_in_worker, args=(tmp, n * 1000)) for n in range(4)]
+        for worker in workers:
+            worker.start()
+        for worker in workers:
+            worker.join()
+
+        assert len(segment_paths(tmp)) == 4
+        ids = sorted(int(r['session_id'], 16) for r in read_feedback(tmp, legacy_file=None))
+        assert ids == sorted(n * 1000 + i for n in range(4) for i in range(500))
+
+
+def test_full_queue_and_bad_policy():
+    writer = FeedbackWriter(directory=tempfile.gettempdir(), max_queue=1)
+    writer._ensure_writer = lambda: None  # no writer, so the queue stays full
+    assert writer.submit(feedback(1))
+    assert not writer.submit(feedback(2))
+    assert writer.dropped == 1
+    writer._queue.get_nowait()
+
+    with pytest.raises(ValueError):
+        FeedbackWriter(fsync='sometimes')
@@ -0,0 +1,89 @@
+"""
+Parity tests for the single-pass GridScorer against the sklearn pipeline
+"""
+
+import itertools
+import os
+
+import numpy as np
+import pandas as pd
+
+from inference import GridScorer
+from train_model import build_pipeline
+
+EVENTS_CSV = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'events.csv')
+
+
+def fit_pipeline():
+    """Fit the training pipeline on events.csv without writing artifacts"""
+    df = pd.read_csv(EVENTS_CSV)
+    return build_pipeline().fit(df.drop('liked', axis=1), df['liked']), df
+
+
+def test_grid_scorer_matches_pipeline():
+    """Every category combination scores exactly like predict/predict_proba"""
+    pipeline, df = fit_pipeline()
+    scorer = GridScorer(pipeline)
+
+    for event_type, location, time_of_day in itertools.product(
+            df['event_type'].unique(), df['location'].unique(), df['time_of_day'].unique()):
+        prefs = {'event_type': event_type, 'location': location, 'time_of_day': time_of_day}
+        grid = pd.DataFrame({
+            'event_type': event_type,
+            'location': location,
+            'time_of_day': time_of_day,
+            'duration': scorer.durations,
+            'popularity_score': scorer.popularity_scores
+        })
+
+        predicted, like_probability = scorer.score(prefs)
+        np.testing.assert_array_equal(predicted, pipeline.predict(grid))
+        np.testing.assert_array_equal(like_probability, pipeline.predict_proba(grid)[:, 1])
+
+
+def test_grid_scorer_accepts_cleaned_preferences():
+    """validate_and_clean_preferences lowercases location, which must still encode"""
+    pipeline, _ = fit_pipeline()
+    scorer = GridScorer(pipeline)
+
+    upper = scorer.recommend({'event_type': 'meteor shower', 'location': 'USA', 'time_of_day': 'night'}, 3)
+    lower = scorer.recommend({'event_type': 'meteor shower', 'location': 'usa', 'time_of_day': 'night'}, 3)
+    assert [r['like_probability'] for r in upper] == [r['like_probability'] for r in lower]
+
+
+def test_grid_scorer_rejects_unknown_category():
+    pipeline, _ = fit_pipeline()
+    scorer = GridScorer(pipeline)
+
+    try:
+        scorer.score({'event_type': 'black hole', 'location': 'USA', 'time_of_day': 'night'})
+    except ValueError as e:
+        assert 'event_type' in str(e)
+    else:
+        raise AssertionError("unknown event_type should raise ValueError")
+
+
+def test_recommend_many_matches_recommend():
+    """One stacked pass gives the same per-profile results as scoring one at a time"""
+    pipeline, df = fit_pipeline()
+    scorer = GridScorer(pipeline)
+    profiles = df[['event_type', 'location', 'time_of_day']].drop_duplicates().to_dict('records')
+
+    batched = scorer.recommend_many(profiles, 3)
+    assert batched == [scorer.recommend(prefs, 3) for prefs in profiles]
+
+
+def test_recommend_many_reports_bad_profile_index():
+    pipeline, _ = fit_pipeline()
+    scorer = GridScorer(pipeline)
+    profiles = [
+        {'event_type': 'meteor shower', 'location': 'USA', 'time_of_day': 'night'},
+        {'event_type': 'meteor shower', 'location': 'Mars', 'time_of_day': 'night'},
+    ]
+
+    try:
+        scorer.recommend_many(profiles, 3)
+    except ValueError as e:
+        assert str(e).startswith('preferences[1]')
+    else:
+        raise AssertionError("unknown location should raise ValueError")
@@ -0,0 +1,123 @@
+"""
+Tests for the metrics registry
+"""
+
+import multiprocessing
+import os
+import tempfile
+import threading
+import time
+
+from metrics import MetricsRegistry, retire_snapshot
+
+
+def test_counters_and_histograms_across_threads():
+    metrics = MetricsRegistry()
+
+    def worker():
+        for i in range(1000):
+            metrics.inc('requests_total', {'route': '/events'})
+            metrics.observe('latency_seconds', 0.002 if i % 10 else 0.2, {'route': '/events'})
+
+    threads = [threading.Thread(target=worker) for _ in range(4)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+    # The worker threads have exited; their counts must survive being folded together
+    totals = metrics.collect()
+    assert totals['counters'][('requests_total', (('route', '/events'),))] == 4000
+    entry = totals['histograms'][('latency_seconds', (('route', '/events'),))]
+    assert sum(entry[:-1]) == 4000
+    assert abs(entry[-1] - (3600 * 0.002 + 400 * 0.2)) < 1e-6
+    assert metrics.collect()['counters'][('requests_total', (('route', '/events'),))] == 4000
+
+
+def test_percentiles_from_buckets():
+    metrics = MetricsRegistry(buckets=(0.01, 0.02, 0.05, 0.1))
+    for _ in range(90):
+        metrics.observe('latency_seconds', 0.015)
+    for _ in range(10):
+        metrics.observe('latency_seconds', 0.08)
+
+    series = metrics.summary()['latency']['latency_seconds']['all']
+    assert series['count'] == 100
+    assert 10 <= series['p50_ms'] <= 20
+    assert 50 <= series['p95_ms'] <= 100
+    assert series['p99_ms'] <= 100
+
+
+def test_prometheus_text_format():
+    metrics = MetricsRegistry(buckets=(0.1, 1.0))
+    metrics.describe('requests_total', 'counter', 'Requests')
+    metrics.inc('requests_total', {'route': '/events', 'status': 200})
+    metrics.observe('latency_seconds', 0.5, {'route': '/events'})
+    metrics.gauge('cache_entries', lambda: {(): 7})
+
+    text = metrics.prometheus_text()
+    assert '# HELP skyquest_requests_total Requests' in text
+    assert 'skyquest_requests_total{route="/events",status="200"} 1' in text
+    assert '# TYPE skyquest_latency_seconds histogram' in text
+    assert 'skyquest_latency_seconds_bucket{route="/events",le="0.1"} 0' in text
+    assert 'skyquest_latency_seconds_bucket{route="/events",le="+Inf"} 1' in text
+    assert 'skyquest_latency_seconds_count{route="/events"} 1' in text
+    assert 'skyquest_cache_entries 7' in text
+
+
+def record_in_worker(snapshot_dir, count):
+    metrics = MetricsRegistry(snapshot_dir=snapshot_dir, snapshot_interval=3600)
+    for _ in range(count):
+        metrics.inc('requests_total')
+        metrics.observe('latency_seconds', 0.003)
+    metrics.write_snapshot()
+
+
+def test_aggregates_snapshots_from_other_processes():
+    with tempfile.TemporaryDirectory() as tmp:
+        context = multiprocessing.get_context('fork')
+        workers = [context.Process(target=record_in_worker, args=(tmp, n)) for n in (5, 7)]
+        for worker in workers:
+            worker.start()
+        for worker in workers:
+            worker.join()
+            assert worker.exitcode == 0
+
+        metrics = MetricsRegistry(snapshot_dir=tmp)
+        metrics.inc('requests_total')
+        totals = metrics.aggregate()
+        assert totals['counters'][('requests_total', ())] == 13
+        assert sum(totals['histograms'][('latency_seconds', ())][:-1]) == 12
+
+
+def test_exited_workers_are_retired_and_stale_snapshots_dropped():
+    with tempfile.TemporaryDirectory() as tmp:
+        context = multiprocessing.get_context('fork')
+        for count in (5, 7):
+            worker = context.Process(target=record_in_worker, args=(tmp, count))
+            worker.start()
+            worker.join()
+            # What gunicorn's child_exit does; the PID may now be reused without
+            # the new worker's snapshot replacing these counts
+            retire_snapshot(tmp, worker.pid)
+        assert os.listdir(tmp) == ['retired.json']
+
+        crashed = context.Process(target=record_in_worker, args=(tmp, 100))
+        crashed.start()
+        crashed.join()
+        old = time.time() - 120
+        os.utime(os.path.join(tmp, f'{crashed.pid}.json'), (old, old))
+
+        metrics = MetricsRegistry(snapshot_dir=tmp, stale_after=60)
+        assert metrics.aggregate()['counters'][('requests_total', ())] == 12
+        assert sorted(os.listdir(tmp)) == ['retired.json']
+
+
+def test_exited_threads_are_folded_in_as_new_ones_register():
+    metrics = MetricsRegistry()
+    for _ in range(50):
+        thread = threading.Thread(target=metrics.inc, args=('requests_total',))
+        thread.start()
+        thread.join()
+    assert len(metrics._shards) <= 1
+    assert metrics.collect()['counters'][('requests_total', ())] == 50
@@ -0,0 +1,148 @@
+"""
+Tests for background model reloads and atomic snapshot swaps
+"""
+
+import threading
+import time
+from types import SimpleNamespace
+
+import pytest
+
+from model_manager import ModelManager
+
+
+class Artifacts:
+    """Stands in for the files on disk: a version and what loading it produces"""
+
+    def __init__(self):
+        self.version = 'v1'
+        self.loads = 0
+
+    def load(self, version):
+        self.loads += 1
+        return SimpleNamespace(version=version, value=int(version[1:]))
+
+
+def test_initial_load_is_not_counted_as_a_swap():
+    artifacts = Artifacts()
+    manager = ModelManager(artifacts.load, lambda: artifacts.version)
+    assert manager.current is None
+
+    assert manager.reload(force=True)
+    assert manager.current.version == 'v1'
+    info = manager.info()
+    assert info['version'] == 'v1'
+    assert info['swap_count'] == 0
+    assert info['load_time_ms'] is not None and info['loaded_at'] is not None
+
+
+def test_reload_only_when_version_changes():
+    artifacts = Artifacts()
+    manager = ModelManager(artifacts.load, lambda: artifacts.version)
+    manager.reload(force=True)
+
+    assert not manager.reload()
+    assert artifacts.loads == 1
+
+    artifacts.version = 'v2'
+    assert manager.reload()
+    assert manager.current.value == 2
+    assert manager.swap_count == 1
+
+
+def test_in_flight_request_keeps_its_snapshot():
+    artifacts = Artifacts()
+    manager = ModelManager(artifacts.load, lambda: artifacts.version)
+    manager.reload(force=True)
+
+    in_flight = manager.current
+    artifacts.version = 'v2'
+    manager.reload()
+
+    assert in_flight.value == 1
+    assert manager.current.value == 2
+
+
+def test_failed_validation_keeps_serving_old_version():
+    artifacts = Artifacts()
+
+    def validate(snapshot):
+        if snapshot.value == 2:
+            raise ValueError("bad model")
+
+    manager = ModelManager(artifacts.load, lambda: artifacts.version, validate=validate)
+    manager.reload(force=True)
+    artifacts.version = 'v2'
+
+    with pytest.raises(ValueError):
+        manager.reload()
+    assert manager.current.version == 'v1'
+    assert manager.version == 'v1'
+    assert manager.failed_reloads == 1
+    assert 'bad model' in manager.info()['last_error']
+
+    # The same broken version is not retried on every tick...
+    assert not manager.reload()
+    assert artifacts.loads == 2
+
+    # ...but the next published version is
+    artifacts.version = 'v3'
+    assert manager.reload()
+    assert manager.current.value == 3
+
+
+def test_warm_up_runs_before_the_swap():
+    artifacts = Artifacts()
+    seen = []
+
+    def warm_up(snapshot):
+        # Still serving the old snapshot while the new one warms up
+        seen.append((snapshot.version, manager.current and manager.current.version))
+
+    manager = ModelManager(artifacts.load, lambda: artifacts.version, warm_up=warm_up)
+    manager.reload(force=True)
+    artifacts.version = 'v2'
+    manager.reload()
+
+    assert seen == [('v1', None), ('v2', 'v1')]
+
+
+def test_readers_never_see_a_missing_snapshot_during_swaps():
+    artifacts = Artifacts()
+    manager = ModelManager(artifacts.load, lambda: artifacts.version)
+    manager.reload(force=True)
+    stop = threading.Event()
+    errors = []
+
+    def reader():
+        while not stop.is_set():
+            snapshot = manager.current
+            if snapshot is None or snapshot.value != int(snapshot.version[1:]):
+                errors.append(snapshot)
+
+    threads = [threading.Thread(target=reader) for _ in range(4)]
+    for thread in threads:
+        thread.start()
+    for i in range(2, 200):
+        artifacts.version = f'v{i}'
+        manager.reload()
+    stop.set()
+    for thread in threads:
+        thread.join()
+
+    assert errors == []
+    assert manager.swap_count == 198
+
+
+def test_watcher_picks_up_new_version():
+    artifacts = Artifacts()
+    manager = ModelManager(artifacts.load, lambda: artifacts.version, interval=0.01)
+    manager.reload(force=True)
+    manager.start()
+    assert manager.info()['watching']
+
+    artifacts.version = 'v2'
+    deadline = time.time() + 5
+    while manager.version != 'v2' and time.time() < deadline:
+        time.sleep(0.01)
+    assert manager.current.value == 2
@@ -0,0 +1,96 @@
+"""
+Tests for NasaClient's conditional requests and pinned responses
+"""
+
+import os
+import tempfile
+from datetime import date, timedelta
+
+import pytest
+
+from fake_nasa import FakeNasa
+from nasa_client import NasaClient
+from nasa_ingest import SpaceEventStore
+
+TODAY = date.today()
+PAST = TODAY - timedelta(days=30)
+
+
+@pytest.fixture
+def fake():
+    server = FakeNasa(neo_per_day=3).start()
+    yield server
+    server.stop()
+
+
+def client_for(fake, **kwargs):
+    kwargs.setdefault('rate_limit', '1000 per hour')
+    return NasaClient(base_url=fake.url, **kwargs)
+
+
+def test_unchanged_data_is_revalidated_with_a_304(fake):
+    client = client_for(fake)
+    first = client.neo_feed(TODAY - timedelta(days=1), TODAY)
+    sent = fake.bytes_sent
+    second = client.neo_feed(TODAY - timedelta(days=1), TODAY)
+
+    assert second == first
+    assert len(fake.requests) == 2 and fake.not_modified == 1
+    assert fake.bytes_sent == sent  # the 304 carried no body
+    assert client.stats()['responses']['not_modified'] == 1
+    assert client.stats()['responses']['bytes_saved'] > 0
+
+
+def test_past_dates_are_pinned_without_requests_or_budget(fake):
+    client = client_for(fake, rate_limit='2 per hour')
+    first = client.apod(PAST, PAST + timedelta(days=6))
+    for _ in range(5):
+        assert client.apod(PAST, PAST + timedelta(days=6)) == first
+    assert len(fake.requests) == 1
+    assert client.stats()['responses']['pinned'] == 5
+    client.neo_feed(PAST, PAST)  # the budget's second call is still there
+
+
+def test_pinning_does_not_need_validators(fake):
+    fake.validators = False
+    client = client_for(fake)
+    client.neo_feed(PAST, PAST)
+    client.neo_feed(PAST, PAST)
+    client.neo_feed(TODAY, TODAY)
+    client.neo_feed(TODAY, TODAY)
+    # Only today's window is downloaded again
+    assert [params['start_date'] for _, params in fake.requests] == [PAST.isoformat()] + [TODAY.isoformat()] * 2
+
+
+def test_donki_is_revalidated_not_pinned(fake):
+    client = client_for(fake)
+    client.donki('CME', PAST, PAST + timedelta(days=10))
+    client.donki('CME', PAST, PAST + timedelta(days=10))
+    assert len(fake.requests) == 2 and fake.not_modified == 1
+
+
+def test_store_keeps_responses_across_clients(fake):
+    with tempfile.TemporaryDirectory() as tmp:
+        store = SpaceEventStore(os.path.join(tmp, 'nasa.db'))
+        client_for(fake, cache=store).neo_feed(PAST, PAST + timedelta(days=6))
+        client_for(fake, cache=store).apod(TODAY, TODAY)
+
+        again = client_for(fake, cache=store)
+        assert len(again.neo_feed(PAST, PAST + timedelta(days=6))['near_earth_objects']) == 7
+        again.apod(TODAY, TODAY)
+        assert len(fake.requests) == 3 and fake.not_modified == 1
+        assert store.info()['upstream_responses'] == {'kept': 2, 'pinned': 1}
+
+
+def test_store_keeps_only_the_newest_responses(fake):
+    with tempfile.TemporaryDirectory() as tmp:
+        store = SpaceEventStore(os.path.join(tmp, 'nasa.db'), max_responses=2)
+        client = client_for(fake, cache=store)
+        for weeks in range(3):
+            client.neo_feed(PAST + timedelta(weeks=weeks), PAST + timedelta(weeks=weeks, days=6))
+        assert store.info()['upstream_responses'] == {'kept': 2, 'pinned': 2}
+
+        client.neo_feed(PAST + timedelta(weeks=2), PAST + timedelta(weeks=2, days=6))
+        assert len(fake.requests) == 3  # still pinned
+        client.neo_feed(PAST, PAST + timedelta(days=6))
+        assert len(fake.requests) == 4  # the oldest was dropped
@@ -0,0 +1,133 @@
+"""
+Tests for the NASA ingestion worker, run against a local fake of api.nasa.gov
+"""
+
+import os
+import tempfile
+import threading
+from datetime import date, timedelta
+
+import pytest
+
+from fake_nasa import FakeNasa
+from nasa_client import NasaClient, QuotaExhausted
+from nasa_ingest import FEEDS, NasaIngester, SpaceEventStore
+
+TODAY = date(2025, 3, 20)
+
+
+@pytest.fixture
+def fake():
+    server = FakeNasa(neo_per_day=2).start()
+    yield server
+    server.stop()
+
+
+@pytest.fixture
+def store():
+    with tempfile.TemporaryDirectory() as tmp:
+        yield SpaceEventStore(os.path.join(tmp, 'nasa.db'))
+
+
+def ingester(fake, store, today=TODAY, rate_limit='1000 per hour', **kwargs):
+    client = NasaClient(base_url=fake.url, rate_limit=rate_limit)
+    return NasaIngester(client, store, today=lambda: today, **kwargs)
+
+
+def test_first_run_fills_every_feed_and_backfills(fake, store):
+    report = ingester(fake, store, backfill_days=40).run_once()
+
+    assert report['stopped'] is None
+    assert all(feed['error'] is None for feed in report['feeds'].values())
+    start = (TODAY - timedelta(days=40)).isoformat()
+    apods = store.events(['nasa_apod'])
+    assert [row['date'] for row in apods] == [(TODAY - timedelta(days=n)).isoformat() for n in range(40, -1, -1)]
+    asteroids = store.events(['near_earth_asteroid'])
+    assert len(asteroids) == 41 * 2 and asteroids[0]['date'] == start
+    assert {'solar_flare', 'coronal_mass_ejection', 'geomagnetic_storm'} <= set(store.info()['events'])
+    # The NEO feed is only ever asked for 7 days at a time
+    for _, params in fake.calls('/neo/'):
+        assert (date.fromisoformat(params['end_date']) - date.fromisoformat(params['start_date'])).days < 7
+    for name in FEEDS:
+        assert store.state(name)['covered_until'] == TODAY.isoformat()
+        assert store.state(name)['backfilled_from'] == start
+
+
+def test_later_runs_fetch_only_new_days(fake, store):
+    ingester(fake, store, backfill_days=10).run_once()
+    before = len(fake.requests)
+
+    report = ingester(fake, store, today=TODAY + timedelta(days=2), backfill_days=10).run_once()
+    new_calls = fake.requests[before:]
+    # One window per feed, from the last covered day (fetched again) to the new today
+    assert len(new_calls) == len(FEEDS)
+    apod_call = [params for path, params in new_calls if path == '/planetary/apod'][0]
+    assert (apod_call['start_date'], apod_call['end_date']) == (TODAY.isoformat(), (TODAY + timedelta(days=2)).isoformat())
+    assert report['feeds']['apod']['rows'] == 3
+    assert store.latest('nasa_apod')['date'] == (TODAY + timedelta(days=2)).isoformat()
+
+
+def test_quota_stops_the_run_and_the_next_run_resumes(fake, store):
+    # Budget for three calls: the forward windows of apod, neo and donki_flr
+    worker = ingester(fake, store, rate_limit='3 per hour', backfill_days=30)
+    report = worker.run_once()
+    assert worker.client.calls == 3 and 'budget' in report['stopped']
+    assert store.state('donki_cme') == {}
+
+    worker.client.limiter.enabled = False
+    report = worker.run_once()
+    assert report['stopped'] is None
+    assert store.state('donki_gst')['backfilled_from'] == (TODAY - timedelta(days=30)).isoformat()
+
+
+def test_nasa_quota_header_and_429_stop_calls(fake, store):
+    # The first answer says 2 calls are left, which is the client's reserve
+    fake.quota = 3
+    worker = ingester(fake, store)
+    report = worker.run_once()
+    assert worker.client.calls == 1 and '2 calls left' in report['stopped']
+
+    fake.quota = 0
+    with pytest.raises(QuotaExhausted):
+        NasaClient(base_url=fake.url, reserve=0).apod(TODAY, TODAY)
+    assert len(fake.calls('/planetary/apod')) == 2
+
+
+def test_failing_feed_does_not_block_the_others(fake, store):
+    original = FEEDS['apod'].fetch
+    FEEDS['apod'].fetch = lambda client, start, end: client.get('/planetary/missing', 'apod')
+    try:
+        report = ingester(fake, store, backfill_days=0).run_once()
+    finally:
+        FEEDS['apod'].fetch = original
+    assert report['feeds']['apod']['error']
+    assert store.state('apod')['last_error']
+    assert report['feeds']['neo']['rows'] > 0
+
+
+def test_request_threads_share_pooled_connections(fake, store):
+    ingester(fake, store, backfill_days=0, feeds=['apod']).run_once()
+    opened = store.opened
+    # One short-lived thread per request, as under the threaded dev server
+    for _ in range(20):
+        threads = [threading.Thread(target=store.events, args=(['nasa_apod'],)) for _ in range(3)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+    assert store.opened - opened <= 3
+    assert len(store._idle) <= store.max_idle
+    store.close()
+    assert store.latest('nasa_apod')['date'] == TODAY.isoformat()
+
+
+def test_app_reads_nasa_events_from_the_store_only(fake, store, monkeypatch):
+    import app
+    ingester(fake, store, today=date.today(), backfill_days=0, feeds=['apod', 'neo']).run_once()
+    fake.stop()  # nothing upstream from here on
+    monkeypatch.setattr(app, 'nasa_store', store)
+
+    events = app.get_nasa_events()
+    assert [event['event_type'] for event in events] == ['nasa_apod', 'near_earth_asteroid', 'near_earth_asteroid']
+    assert events[0]['date'] == date.today().isoformat()
+    assert float(events[1]['distance_km']) > 0
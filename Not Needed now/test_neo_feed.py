@@ -0,0 +1,142 @@
+"""
+Tests for columnar NEO close-approach ingestion and top-k queries
+"""
+
+import os
+import tempfile
+from datetime import date, timedelta
+
+import numpy as np
+import pytest
+
+from fake_nasa import FakeNasa
+from nasa_client import NasaClient
+from nasa_ingest import SpaceEventStore, ingest_neo_range
+from neo_feed import NeoApproaches, fetch_neo_range, flatten_neo_feed
+
+START, END = date(2025, 1, 1), date(2025, 3, 31)  # 90 days
+
+
+@pytest.fixture
+def fake():
+    server = FakeNasa(neo_per_day=4).start()
+    yield server
+    server.stop()
+
+
+def test_flatten_parses_numbers_and_keeps_only_the_listed_day():
+    payload = {'near_earth_objects': {'2025-01-02': [{
+        'id': '42', 'name': '(2025 AB)', 'is_potentially_hazardous_asteroid': True,
+        'estimated_diameter': {'kilometers': {'estimated_diameter_max': 0.5}},
+        'close_approach_data': [
+            {'close_approach_date': '2024-12-01', 'miss_distance': {'kilometers': '1.0'}},
+            {'close_approach_date': '2025-01-02', 'epoch_date_close_approach': 1735776000000,
+             'miss_distance': {'kilometers': '384400.5', 'lunar': '1.0000013'},
+             'relative_velocity': {'kilometers_per_hour': 'Unknown'}}
+        ]
+    }]}}
+    approaches = flatten_neo_feed(payload)
+
+    assert len(approaches) == 1
+    assert approaches['miss_km'].dtype == np.float64 and approaches['miss_km'][0] == 384400.5
+    assert approaches['miss_ld'][0] == pytest.approx(1.0000013)
+    assert np.isnan(approaches['velocity_kmh'][0])
+    assert approaches.records()[0]['velocity_kmh'] is None
+    assert approaches.records()[0]['hazardous'] is True
+
+
+def test_range_is_walked_concurrently_in_feed_sized_windows(fake):
+    approaches, report = fetch_neo_range(NasaClient(base_url=fake.url, rate_limit='1000 per hour'),
+                                         START, END, workers=4)
+
+    assert report['stopped'] is None and not report['errors']
+    assert len(approaches) == 90 * 4
+    days = []
+    for _, params in fake.calls('/neo/'):
+        first, last = date.fromisoformat(params['start_date']), date.fromisoformat(params['end_date'])
+        assert (last - first).days < 7
+        days.extend(first + timedelta(days=n) for n in range((last - first).days + 1))
+    assert sorted(days) == [START + timedelta(days=n) for n in range(90)]  # every day exactly once
+    assert len(report['covered']) == 4
+    assert report['covered'][0][0] == START.isoformat() and report['covered'][-1][1] == END.isoformat()
+
+
+def test_overlapping_next_links_do_not_refetch_days(fake):
+    client = NasaClient(base_url=fake.url, rate_limit='1000 per hour')
+    neo_feed = client.neo_feed
+
+    def overlapping(start, end):
+        # links.next starting on the last day already fetched
+        payload = dict(neo_feed(start, end))
+        payload['links'] = dict(payload['links'], next=f"{fake.url}/neo/rest/v1/feed?start_date={end}")
+        return payload
+
+    client.neo_feed = overlapping
+    approaches, report = fetch_neo_range(client, START, END, workers=2)
+
+    assert len(approaches) == 90 * 4
+    assert len({(neo_id, day) for neo_id, day in zip(approaches['neo_id'], approaches['date'])}) == 90 * 4
+    days = [date.fromisoformat(params['start_date']) + timedelta(days=n) for _, params in fake.calls('/neo/')
+            for n in range((date.fromisoformat(params['end_date']) - date.fromisoformat(params['start_date'])).days + 1)]
+    assert sorted(days) == [START + timedelta(days=n) for n in range(90)]
+    assert report['covered'][-1][1] == END.isoformat()
+
+
+def test_top_k_matches_a_full_sort(fake):
+    approaches, _ = fetch_neo_range(NasaClient(base_url=fake.url, rate_limit='1000 per hour'), START, END)
+    records = approaches.records()
+
+    closest = sorted(records, key=lambda r: r['miss_km'])[:10]
+    assert approaches.top_k('miss_km', 10) == closest
+    fastest = sorted(records, key=lambda r: -r['velocity_kmh'])[:5]
+    assert approaches.top_k('velocity_kmh', 5) == fastest
+    february = [r for r in records if r['date'].startswith('2025-02')]
+    assert approaches.top_k('miss_km', 3, start='2025-02-01', end='2025-02-28') == \
+        sorted(february, key=lambda r: r['miss_km'])[:3]
+    assert len(approaches.top_k('miss_km', 10_000)) == len(records)
+    with pytest.raises(ValueError):
+        approaches.top_k('name')
+
+
+def test_quota_stops_every_worker(fake):
+    approaches, report = fetch_neo_range(NasaClient(base_url=fake.url, rate_limit='3 per hour'),
+                                         START, END, workers=2)
+    assert 'budget' in report['stopped']
+    assert len(fake.calls('/neo/')) == 3
+    assert len(approaches) == sum((date.fromisoformat(last) - date.fromisoformat(first)).days + 1
+                                  for first, last in report['covered']) * 4
+
+
+def test_store_round_trip(fake):
+    with tempfile.TemporaryDirectory() as tmp:
+        store = SpaceEventStore(os.path.join(tmp, 'nasa.db'))
+        ingest_neo_range(NasaClient(base_url=fake.url, rate_limit='1000 per hour'), store, START, END)
+        loaded = store.approaches('2025-03-01', '2025-03-31')
+
+        assert len(loaded) == 31 * 4
+        assert loaded['velocity_kmh'].dtype == np.float64
+        assert len(store.events(['near_earth_asteroid'])) == 90 * 4
+        assert store.info()['neo_approaches'] == {'rows': 360, 'first': '2025-01-01', 'last': '2025-03-31'}
+
+        store.upsert_approaches(NeoApproaches.from_lists({
+            'neo_id': ['x'], 'name': ['x'], 'date': ['2025-03-05'], 'epoch_ms': [0], 'miss_km': [float('nan')],
+            'miss_ld': [1.0], 'velocity_kmh': [1.0], 'diameter_max_km': [1.0], 'hazardous': [False], 'url': ['']
+        }))
+        unknown = store.approaches('2025-03-05', '2025-03-05')
+        assert np.isnan(unknown['miss_km']).sum() == 1
+        assert store.approaches().top_k('miss_km', 1)[0]['neo_id'] != 'x'
+
+
+def test_top_asteroids_endpoint(fake, monkeypatch):
+    import app
+    with tempfile.TemporaryDirectory() as tmp:
+        store = SpaceEventStore(os.path.join(tmp, 'nasa.db'))
+        ingest_neo_range(NasaClient(base_url=fake.url, rate_limit='1000 per hour'), store, START, END)
+        monkeypatch.setattr(app, 'nasa_store', store)
+        client = app.app.test_client()
+
+        body = client.get('/nasa/asteroids/top?by=velocity_kmh&k=3&start=2025-01-01&end=2025-03-31').get_json()
+        assert body['approaches_considered'] == 360
+        assert [a['velocity_kmh'] for a in body['approaches']] == \
+            [a['velocity_kmh'] for a in store.approaches().top_k('velocity_kmh', 3)]
+        assert client.get('/nasa/asteroids/top?by=name').status_code == 400
@@ -0,0 +1,59 @@
+"""
+Parity tests for the vectorized ranker against the per-candidate scoring it replaced
+"""
+
+import numpy as np
+
+from utils import calculate_similarity_score, rank_recommendations, top_k_indices
+
+
+def reference_rank(recommendations, user_preferences):
+    """rank_recommendations as it was: score each candidate, then sort the full list"""
+    for rec in recommendations:
+        similarity = calculate_similarity_score(rec, user_preferences)
+        rec['similarity_score'] = similarity
+        rec['final_score'] = (similarity * 0.6) + (rec.get('like_probability', 0) * 0.4)
+    return sorted(recommendations, key=lambda x: x['final_score'], reverse=True)
+
+
+def random_candidates(n, seed=0):
+    rng = np.random.default_rng(seed)
+    return [
+        {
+            'event_type': str(rng.choice(['meteor shower', 'solar eclipse', 'star party'])),
+            'location': str(rng.choice(['usa', 'USA', 'norway'])),
+            'time_of_day': str(rng.choice(['day', 'night'])),
+            'duration': int(rng.choice([30, 60, 90, 120, 150, 180, 240, 300])),
+            'like_probability': float(rng.choice([0.0, 0.5, 0.75, 1.0]))
+        }
+        for _ in range(n)
+    ]
+
+
+PREFERENCES = {'event_type': 'meteor shower', 'location': 'usa', 'time_of_day': 'night'}
+
+
+def test_matches_reference_including_ties():
+    expected = reference_rank(random_candidates(500), PREFERENCES)
+    actual = rank_recommendations(random_candidates(500), PREFERENCES)
+    assert actual == expected
+
+
+def test_top_k_matches_head_of_full_ranking():
+    expected = reference_rank(random_candidates(2_000, seed=1), PREFERENCES)
+    for k in [1, 3, 10, 1_999, 5_000]:
+        assert rank_recommendations(random_candidates(2_000, seed=1), PREFERENCES, limit=k) == expected[:k]
+
+
+def test_missing_fields_and_preference_duration():
+    candidates = [{'event_type': 'star party'}, {'event_type': 'star party', 'location': 'USA', 'duration': 200}]
+    preferences = {'event_type': 'star party', 'duration': 120}
+    expected = reference_rank([dict(c) for c in candidates], preferences)
+    assert rank_recommendations([dict(c) for c in candidates], preferences) == expected
+
+
+def test_top_k_indices_is_a_stable_descending_sort():
+    scores = np.array([0.5, 0.9, 0.5, 0.1, 0.9, 0.5])
+    assert top_k_indices(scores, 4).tolist() == [1, 4, 0, 2]
+    assert top_k_indices(scores, 0).tolist() == []
+    assert rank_recommendations([], PREFERENCES) == []
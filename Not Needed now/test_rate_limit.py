@@ -0,0 +1,104 @@
+"""
+Tests for the shared token-bucket rate limiter
+"""
+
+import pytest
+from flask import Flask
+
+from rate_limit import FlaskRateLimiter, Limit, LocalBucketStore, RateLimiter
+
+
+class Clock:
+    def __init__(self):
+        self.now = 1000.0
+
+    def __call__(self):
+        return self.now
+
+
+class BrokenStore:
+    def take(self, key, rate, capacity, cost=1):
+        raise ConnectionError("redis is down")
+
+
+def test_parse_limits():
+    assert (Limit.parse("50 per minute").count, Limit.parse("50 per minute").period) == (50, 60)
+    assert Limit.parse("30/hour").period == 3600
+    assert Limit.parse("1000 per 2 days").period == 2 * 86400
+    with pytest.raises(ValueError):
+        Limit.parse("fifty per minute")
+
+
+def test_bucket_allows_a_burst_then_refills_at_the_limit_rate():
+    clock = Clock()
+    limiter = RateLimiter(LocalBucketStore(clock=clock))
+    decisions = [limiter.hit('client', '3 per minute') for _ in range(4)]
+    assert [d.allowed for d in decisions] == [True, True, True, False]
+    assert decisions[-1].retry_after == pytest.approx(20.0)
+
+    clock.now += 20  # one token back
+    assert limiter.hit('client', '3 per minute').allowed
+    assert not limiter.hit('client', '3 per minute').allowed
+    # Other keys have their own bucket
+    assert limiter.hit('other', '3 per minute').allowed
+    assert limiter.stats()['limited'] == 2
+
+
+def test_limiters_on_one_store_share_buckets():
+    # Two workers pointed at the same store enforce one limit between them
+    store = LocalBucketStore(clock=Clock())
+    workers = [RateLimiter(store), RateLimiter(store)]
+    allowed = [workers[i % 2].hit('client', '4 per minute').allowed for i in range(8)]
+    assert allowed.count(True) == 4
+
+
+def test_store_failure_falls_back_to_local_buckets():
+    limiter = RateLimiter(BrokenStore())
+    assert [limiter.hit('client', '2 per minute').allowed for _ in range(3)] == [True, True, False]
+    assert limiter.stats()['errors'] == 3
+
+
+def test_full_buckets_are_pruned():
+    clock = Clock()
+    store = LocalBucketStore(max_keys=2, clock=clock)
+    store.take('a', 1.0, 5)
+    store.take('b', 1.0, 5)
+    clock.now += 5
+    store.take('c', 1.0, 5)
+    assert len(store) == 1
+
+
+def test_flask_limits_per_route_default_and_exempt():
+    app = Flask(__name__)
+    limiter = FlaskRateLimiter(app, RateLimiter(), key_func=lambda: 'client', default_limits=["2 per minute"])
+
+    @app.errorhandler(429)
+    def too_many(error):
+        return {"message": "Rate limit exceeded"}, 429
+
+    @app.route('/limited')
+    @limiter.limit("1 per minute")
+    def limited():
+        return 'ok'
+
+    @app.route('/default')
+    def default():
+        return 'ok'
+
+    @app.route('/free')
+    @limiter.exempt
+    def free():
+        return 'ok'
+
+    client = app.test_client()
+    first = client.get('/limited')
+    assert first.status_code == 200 and first.headers['X-RateLimit-Remaining'] == '0'
+    rejected = client.get('/limited')
+    assert rejected.status_code == 429
+    assert int(rejected.headers['Retry-After']) == 60
+
+    assert [client.get('/default').status_code for _ in range(3)] == [200, 200, 429]
+    assert all(client.get('/free').status_code == 200 for _ in range(5))
+
+    limiter.enabled = False
+    assert client.get('/limited').status_code == 200
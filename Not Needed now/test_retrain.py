@@ -0,0 +1,111 @@
+"""
+Tests for feedback ingestion, candidate validation and publishing in retrain.py
+"""
+
+import json
+import os
+import tempfile
+
+import pandas as pd
+
+from compiled_model import CompiledModel
+from feedback_store import FeedbackWriter
+from retrain import feedback_row, ingest_feedback, retrain
+
+HERE = os.path.dirname(os.path.abspath(__file__))
+EVENTS_CSV = os.path.join(HERE, 'events.csv')
+
+
+def feedback_record(i, feedback='liked'):
+    # selected_event as /recommend returns it, with the preferences lowercased
+    return {
+        'session_id': f'{i:08x}',
+        'user_preferences': {'event_type': 'meteor shower', 'location': 'usa', 'time_of_day': 'night'},
+        'selected_event': {'event_type': 'meteor shower', 'location': 'usa', 'time_of_day': 'night',
+                           'duration': 60 + i % 5 * 60, 'popularity_score': 8.5},
+        'feedback': feedback
+    }
+
+
+def make_config(tmp, **overrides):
+    class Config:
+        FEEDBACK_DIR = os.path.join(tmp, 'feedback')
+        RETRAIN_BASE_DATA = EVENTS_CSV
+        RETRAIN_DATASET_PATH = os.path.join(tmp, 'feedback_training.csv')
+        RETRAIN_CHECKPOINT_PATH = os.path.join(tmp, 'feedback_checkpoint.json')
+        RETRAIN_MIN_NEW_ROWS = 10
+        RETRAIN_HOLDOUT_FRACTION = 0.2
+        RETRAIN_MAX_ACCURACY_DROP = 0.02
+        MODEL_PATH = os.path.join(tmp, 'model.pkl')
+        COMPILED_MODEL_PATH = os.path.join(tmp, 'model.npz')
+    for key, value in overrides.items():
+        setattr(Config, key, value)
+    return Config
+
+
+def write_feedback(directory, records):
+    writer = FeedbackWriter(directory=directory, flush_interval=0.01)
+    for record in records:
+        writer.submit(record)
+    writer.close()
+
+
+def test_feedback_row_mapping():
+    row = feedback_row(feedback_record(1))
+    assert row['liked'] == 1 and row['location'] == 'usa' and row['duration'] == 120.0
+    assert feedback_row(feedback_record(1, 'Disliked'))['liked'] == 0
+    assert feedback_row(feedback_record(1, 'meh')) is None
+    assert feedback_row({'feedback': 'liked', 'selected_event': {'event_type': 'star party'}}) is None
+
+
+def test_ingestion_only_reads_new_feedback():
+    with tempfile.TemporaryDirectory() as tmp:
+        config = make_config(tmp)
+        write_feedback(config.FEEDBACK_DIR, [feedback_record(i) for i in range(30)])
+        assert ingest_feedback(config.FEEDBACK_DIR, config.RETRAIN_DATASET_PATH,
+                               config.RETRAIN_CHECKPOINT_PATH, legacy_file=None) == 30
+        assert ingest_feedback(config.FEEDBACK_DIR, config.RETRAIN_DATASET_PATH,
+                               config.RETRAIN_CHECKPOINT_PATH, legacy_file=None) == 0
+
+        # A partial last line is left for the next run
+        segment = next(iter(json.load(open(config.RETRAIN_CHECKPOINT_PATH))))
+        with open(segment, 'a') as f:
+            f.write(json.dumps(feedback_record(99)) + '\n' + '{"session_id": "par')
+        assert ingest_feedback(config.FEEDBACK_DIR, config.RETRAIN_DATASET_PATH,
+                               config.RETRAIN_CHECKPOINT_PATH, legacy_file=None) == 1
+        assert len(pd.read_csv(config.RETRAIN_DATASET_PATH)) == 31
+
+
+def test_retrain_publishes_validated_model():
+    with tempfile.TemporaryDirectory() as tmp:
+        config = make_config(tmp)
+        write_feedback(config.FEEDBACK_DIR, [feedback_record(i) for i in range(5)])
+        report = retrain(config)
+        assert not report['published'] and report['new_feedback_rows'] == 5
+
+        write_feedback(config.FEEDBACK_DIR, [feedback_record(i) for i in range(5, 60)])
+        report = retrain(config)
+        assert report['published'], report
+        base = pd.read_csv(EVENTS_CSV)
+        assert report['training_rows'] == len(base) + 60
+        model = CompiledModel.load(config.COMPILED_MODEL_PATH)
+        # Feedback is folded into the catalog's categories rather than adding its own spellings
+        assert [set(values) for values in model.categories] == \
+            [set(base[column]) for column in model.categorical_columns]
+        assert model.predict_proba_one(feedback_record(0)['selected_event'])[1] > 0.5
+
+
+def test_retrain_rejects_candidate_that_hurts_holdout():
+    with tempfile.TemporaryDirectory() as tmp:
+        # Feedback that contradicts events.csv on the very rows the holdout checks
+        base = pd.read_csv(EVENTS_CSV)
+        records = []
+        for i, event in enumerate(base.to_dict('records') * 20):
+            label = 'disliked' if event['liked'] else 'liked'
+            records.append({'session_id': f'{i:08x}', 'selected_event': event, 'feedback': label})
+        config = make_config(tmp)
+        write_feedback(config.FEEDBACK_DIR, records)
+
+        report = retrain(config)
+        assert not report['accepted'] and not report['published']
+        assert not os.path.exists(config.COMPILED_MODEL_PATH)
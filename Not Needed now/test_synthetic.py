@@ -0,0 +1,82 @@
+"""
+Tests for the synthetic catalog, event and feedback generator
+"""
+
+import os
+import tempfile
+
+import numpy as np
+import pandas as pd
+
+from benchmarks.synthetic import (CopulaModel, PLANETS_PATH, generate_events, generate_feedback,
+                                  generate_planets)
+from feedback_store import read_feedback
+from retrain import feedback_row
+
+EVENTS_CSV = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'events.csv')
+
+
+def _source():
+    # Two correlated continuous columns, a discrete one, a category, and columns missing together
+    rng = np.random.default_rng(0)
+    x = rng.lognormal(0, 1, 4000)
+    df = pd.DataFrame({
+        'x': x,
+        'y': x * rng.lognormal(0, 0.2, 4000),
+        'count': rng.integers(1, 4, 4000),
+        'kind': rng.choice(['a', 'b', 'c'], 4000, p=[0.6, 0.3, 0.1]),
+    })
+    missing = rng.random(4000) < 0.25
+    df.loc[missing, ['x', 'y']] = np.nan
+    return df
+
+
+def test_sample_keeps_marginals_correlation_and_nan_pattern():
+    source = _source()
+    sample = CopulaModel(source).sample(20000, seed=1)
+
+    assert list(sample.columns) == list(source.columns)
+    assert sample['count'].dtype == source['count'].dtype
+    assert set(sample['count']) <= set(source['count'])
+    assert abs(sample['x'].median() - source['x'].median()) < 0.1
+    assert abs(sample['kind'].eq('a').mean() - 0.6) < 0.02
+    assert abs(sample[['x', 'y']].corr('spearman').iloc[0, 1] - source[['x', 'y']].corr('spearman').iloc[0, 1]) < 0.05
+    # x and y are only ever missing together
+    assert (sample['x'].isna() == sample['y'].isna()).all()
+    assert abs(sample['x'].isna().mean() - 0.25) < 0.02
+
+
+def test_same_seed_gives_same_rows():
+    model = CopulaModel(_source())
+    pd.testing.assert_frame_equal(model.sample(500, seed=7, chunk_size=200), model.sample(500, seed=7, chunk_size=200))
+    assert not model.sample(500, seed=7).equals(model.sample(500, seed=8))
+
+
+def test_planets_file_matches_archive_schema():
+    archive = pd.read_csv(PLANETS_PATH)
+    with tempfile.TemporaryDirectory() as tmp:
+        path = os.path.join(tmp, 'planets.csv')
+        assert generate_planets(2500, path, chunk_size=1000) == 2500
+        planets = pd.read_csv(path)
+
+    assert list(planets.columns) == list(archive.columns)
+    assert len(planets) == 2500
+    assert planets['pl_name'].is_unique
+    assert planets['rastr'].str.match(r'^\d{2}h\d{2}m\d{2}\.\d{2}s$').all()
+    assert set(planets['discoverymethod'].dropna()) <= set(archive['discoverymethod'])
+    assert (planets.isna().mean() - archive.isna().mean()).abs().max() < 0.05
+
+
+def test_events_and_feedback_load_like_real_data():
+    with tempfile.TemporaryDirectory() as tmp:
+        events_path = os.path.join(tmp, 'events.csv')
+        generate_events(300, events_path)
+        events = pd.read_csv(events_path)
+        assert list(events.columns) == list(pd.read_csv(EVENTS_CSV).columns)
+        assert set(events['liked']) <= {0, 1}
+
+        feedback_dir = os.path.join(tmp, 'feedback')
+        assert generate_feedback(250, feedback_dir, segment_rows=100) == 250
+        assert len(os.listdir(feedback_dir)) == 3
+        rows = [feedback_row(record) for record in read_feedback(feedback_dir, legacy_file=None)]
+        assert len(rows) == 250 and all(row is not None for row in rows)
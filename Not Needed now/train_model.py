@@ -6,6 +6,28 @@ from sklearn.compose import ColumnTransformer
 from sklearn.pipeline import Pipeline
 import joblib
 import os
+from compiled_model import export_pipeline
+from event_table import export_event_table
+from utils import enrich_events_frame
+
+CATEGORICAL_FEATURES = ['event_type', 'location', 'time_of_day']
+NUMERICAL_FEATURES = ['duration', 'popularity_score']
+
+def build_pipeline():
+    """Create the (unfitted) preprocessing + DecisionTreeClassifier pipeline"""
+    # Create preprocessing pipeline
+    preprocessor = ColumnTransformer(
+        transformers=[
+            ('cat', OneHotEncoder(drop='first', sparse_output=False), CATEGORICAL_FEATURES),
+            ('num', StandardScaler(), NUMERICAL_FEATURES)
+        ],
+        remainder='drop'
+    )
+    
+    return Pipeline([
+        ('preprocessor', preprocessor),
+        ('classifier', DecisionTreeClassifier(random_state=42, max_depth=10))
+    ])
 
 def train_model():
     """
@@ -21,24 +43,9 @@ def train_model():
     X = df.drop('liked', axis=1)
     y = df['liked']
     
-    # Define categorical and numerical columns
-    categorical_features = ['event_type', 'location', 'time_of_day']
-    numerical_features = ['duration', 'popularity_score']
-    
-    # Create preprocessing pipeline
-    preprocessor = ColumnTransformer(
-        transformers=[
-            ('cat', OneHotEncoder(drop='first', sparse_output=False), categorical_features),
-            ('num', StandardScaler(), numerical_features)
-        ],
-        remainder='drop'
-    )
-    
     # Create the full pipeline
-    pipeline = Pipeline([
-        ('preprocessor', preprocessor),
-        ('classifier', DecisionTreeClassifier(random_state=42, max_depth=10))
-    ])
+    pipeline = build_pipeline()
+    preprocessor = pipeline.named_steps['preprocessor']
     
     # Train the model
     print("Training model...")
@@ -48,9 +55,15 @@ def train_model():
     print("Saving model...")
     joblib.dump(pipeline, 'space_events_model.pkl')
     
+    # Flattened copy of the pipeline for serving without sklearn
+    export_pipeline(pipeline, 'space_events_model.npz')
+    
     # Also save the original dataset for recommendations
     joblib.dump(df, 'events_data.pkl')
     
+    # Enriched copy as memory-mappable column arrays, so the API starts without pandas
+    export_event_table(enrich_events_frame(df), 'events_table')
+    
     # Print model accuracy
     train_score = pipeline.score(X, y)
     print(f"Training accuracy: {train_score:.3f}")
@@ -58,8 +71,8 @@ def train_model():
     # Print feature importance (if available)
     try:
         feature_names = (preprocessor.named_transformers_['cat']
-                        .get_feature_names_out(categorical_features).tolist() + 
-                        numerical_features)
+                        .get_feature_names_out(CATEGORICAL_FEATURES).tolist() + 
+                        NUMERICAL_FEATURES)
         
         importances = pipeline.named_steps['classifier'].feature_importances_
         feature_importance = dict(zip(feature_names, importances))
@@ -74,7 +87,9 @@ def train_model():
     print("\nModel training completed successfully!")
     print("Files saved:")
     print("- space_events_model.pkl (trained model)")
+    print("- space_events_model.npz (compiled model for serving)")
     print("- events_data.pkl (original dataset)")
+    print("- events_table/ (enriched dataset as column arrays for serving)")
 
 if __name__ == "__main__":
     train_model() 
\ No newline at end of file
@@ -1,53 +1,183 @@
-import pandas as pd
 import numpy as np
 import json
 import logging
+import sys
+import threading
 import time
+from collections import OrderedDict
 from functools import wraps
+from operator import itemgetter
 from datetime import datetime, timedelta
-from typing import Dict, List, Any, Optional
+from typing import TYPE_CHECKING, Dict, List, Any, Callable, Optional
+from urllib.parse import urlencode
 import hashlib
+from flask import Response, current_app, request, stream_with_context
+from cache_backends import CacheBackend, RedisCache, TieredCache
+
+if TYPE_CHECKING:
+    import pandas as pd  # imported lazily: only load-time helpers need it
 
 # Set up logging
 logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
 
-class Cache:
-    """Simple in-memory cache implementation"""
+def _estimate_size(value: Any) -> int:
+    """Rough in-memory footprint of a cached value, in bytes"""
+    size = sys.getsizeof(value)
+    if isinstance(value, dict):
+        size += sum(_estimate_size(k) + _estimate_size(v) for k, v in value.items())
+    elif isinstance(value, (list, tuple, set, frozenset)):
+        size += sum(_estimate_size(item) for item in value)
+    return size
+
+class Cache(CacheBackend):
+    """Thread-safe in-memory LRU cache with per-entry TTL and size limits"""
+    
+    def __init__(self, max_entries: int = 1024, max_bytes: int = 64 * 1024 * 1024,
+                 default_timeout: int = 300):
+        self.max_entries = max_entries
+        self.max_bytes = max_bytes
+        self.default_timeout = default_timeout
+        self._cache = OrderedDict()  # key -> (value, expires_at, size)
+        self._bytes = 0
+        self._lock = threading.RLock()
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.expirations = 0
+    
+    def configure(self, max_entries: Optional[int] = None, max_bytes: Optional[int] = None,
+                  default_timeout: Optional[int] = None) -> None:
+        """Update the limits, evicting entries if the cache is now over budget"""
+        with self._lock:
+            if max_entries is not None:
+                self.max_entries = max_entries
+            if max_bytes is not None:
+                self.max_bytes = max_bytes
+            if default_timeout is not None:
+                self.default_timeout = default_timeout
+            self._evict()
     
-    def __init__(self):
-        self._cache = {}
-        self._timestamps = {}
+    def _remove(self, key: str) -> None:
+        _, _, size = self._cache.pop(key)
+        self._bytes -= size
+    
+    def _evict(self) -> None:
+        """Drop least recently used entries until both budgets are respected"""
+        while self._cache and (len(self._cache) > self.max_entries or self._bytes > self.max_bytes):
+            key = next(iter(self._cache))
+            self._remove(key)
+            self.evictions += 1
     
     def get(self, key: str) -> Optional[Any]:
         """Get value from cache"""
-        if key in self._cache:
-            # Check if cache entry is still valid (5 minutes)
-            if time.time() - self._timestamps[key] < 300:
-                return self._cache[key]
-            else:
+        with self._lock:
+            entry = self._cache.get(key)
+            if entry is None:
+                self.misses += 1
+                return None
+            
+            value, expires_at, _ = entry
+            if expires_at is not None and time.time() >= expires_at:
                 # Remove expired entry
-                del self._cache[key]
-                del self._timestamps[key]
-        return None
+                self._remove(key)
+                self.expirations += 1
+                self.misses += 1
+                return None
+            
+            self._cache.move_to_end(key)
+            self.hits += 1
+            return value
     
-    def set(self, key: str, value: Any) -> None:
-        """Set value in cache"""
-        self._cache[key] = value
-        self._timestamps[key] = time.time()
+    def set(self, key: str, value: Any, timeout: Optional[int] = None) -> None:
+        """Set value in cache, expiring after ``timeout`` seconds (0 means never)"""
+        if timeout is None:
+            timeout = self.default_timeout
+        expires_at = time.time() + timeout if timeout else None
+        size = _estimate_size(value)
+        
+        with self._lock:
+            if key in self._cache:
+                self._remove(key)
+            if size > self.max_bytes:
+                # Would evict everything else and still not fit
+                self.evictions += 1
+                return
+            self._cache[key] = (value, expires_at, size)
+            self._bytes += size
+            self._evict()
+    
+    def delete(self, key: str) -> None:
+        """Remove a single entry if present"""
+        with self._lock:
+            if key in self._cache:
+                self._remove(key)
     
     def clear(self) -> None:
         """Clear all cache entries"""
-        self._cache.clear()
-        self._timestamps.clear()
+        with self._lock:
+            self._cache.clear()
+            self._bytes = 0
     
     def size(self) -> int:
         """Get cache size"""
         return len(self._cache)
+    
+    def stats(self) -> Dict:
+        """Hit/miss/eviction counters and current usage"""
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                "backend": "memory",
+                "entries": len(self._cache),
+                "bytes": self._bytes,
+                "max_entries": self.max_entries,
+                "max_bytes": self.max_bytes,
+                "hits": self.hits,
+                "misses": self.misses,
+                "hit_rate": round(self.hits / lookups, 4) if lookups else 0.0,
+                "evictions": self.evictions,
+                "expirations": self.expirations
+            }
 
 # Global cache instance
 cache = Cache()
 
+def create_cache(config) -> CacheBackend:
+    """Build the cache backend selected by ``config.CACHE_TYPE``.
+    
+    'simple' is a per-process Cache. 'redis' is a Redis cache shared by all
+    workers with a small in-process L1 in front; if Redis is unreachable we
+    log a warning and fall back to the per-process cache.
+    """
+    local = Cache(
+        max_entries=config.CACHE_MAX_ENTRIES,
+        max_bytes=config.CACHE_MAX_BYTES,
+        default_timeout=config.CACHE_DEFAULT_TIMEOUT
+    )
+    if config.CACHE_TYPE != 'redis':
+        return local
+    
+    try:
+        shared = RedisCache.from_url(
+            config.CACHE_REDIS_URL,
+            prefix=config.CACHE_KEY_PREFIX,
+            default_timeout=config.CACHE_DEFAULT_TIMEOUT,
+            compress_min_bytes=config.CACHE_COMPRESS_MIN_BYTES
+        )
+        shared.client.ping()
+    except Exception as e:
+        logger.warning(f"Redis cache unavailable ({e}), using in-process cache")
+        return local
+    
+    local.configure(max_entries=config.CACHE_L1_MAX_ENTRIES)
+    return TieredCache(local, shared, l1_timeout=config.CACHE_L1_TIMEOUT)
+
+def set_cache(backend: CacheBackend) -> None:
+    """Swap the backend used by cache_result, cache_response and the stats helpers"""
+    global cache
+    cache = backend
+
 def cache_result(timeout: int = 300):
     """Decorator to cache function results"""
     def decorator(func):
@@ -64,12 +194,60 @@ def cache_result(timeout: int = 300):
             
             # Execute function and cache result
             result = func(*args, **kwargs)
-            cache.set(cache_key, result)
+            cache.set(cache_key, result, timeout=timeout)
             logger.debug(f"Cache miss for {func.__name__}, cached result")
             return result
         return wrapper
     return decorator
 
+def _request_cache_key(version: str) -> str:
+    """Cache key for the current request: method, path, normalized query and data version"""
+    params = sorted(
+        (name, value)
+        for name in request.args
+        for value in request.args.getlist(name)
+        if value != ''
+    )
+    return f"response:{request.method}:{request.path}?{urlencode(params)}:{version}"
+
+def cache_response(timeout: int = 300, version: Callable[[], str] = lambda: ''):
+    """Decorator to cache Flask view responses per request, with ETag revalidation.
+    
+    Unlike cache_result, the key is built from the request itself (method, path
+    and sorted query parameters) plus ``version()``, so every filter combination
+    gets its own entry and a model/data reload never serves stale bodies. Error
+    payloads are not cached. Clients sending a matching If-None-Match get a 304.
+    """
+    def decorator(func):
+        @wraps(func)
+        def wrapper(*args, **kwargs):
+            cache_key = _request_cache_key(version())
+            
+            cached = cache.get(cache_key)
+            if cached is not None:
+                body, mimetype, etag = cached
+                response = Response(body, mimetype=mimetype)
+                response.headers['X-Cache'] = 'HIT'
+            else:
+                rv = func(*args, **kwargs)
+                response = current_app.make_response(rv)
+                # Streamed bodies are generated lazily; buffering them would defeat the point
+                if response.is_streamed:
+                    return response
+                if response.status_code != 200 or (isinstance(rv, dict) and rv.get('status') == 'error'):
+                    return response
+                
+                body = response.get_data()
+                etag = hashlib.md5(body).hexdigest()
+                cache.set(cache_key, (body, response.mimetype, etag), timeout=timeout)
+                response.headers['X-Cache'] = 'MISS'
+            
+            response.set_etag(etag)
+            response.headers['Cache-Control'] = f'max-age={timeout}'
+            return response.make_conditional(request)
+        return wrapper
+    return decorator
+
 def create_response(data: Any, status: int = 200, message: str = "Success") -> Dict:
     """Create standardized API response"""
     return {
@@ -90,6 +268,20 @@ def create_error_response(message: str, status: int = 400, errors: List[str] = N
         "status_code": status
     }
 
+def create_ndjson_response(records, next_cursor: Optional[str] = None) -> Response:
+    """Stream an iterable of dicts as newline-delimited JSON, one record at a time.
+    
+    ``next_cursor``, when more records follow a limited stream, is sent in
+    the X-Next-Cursor header.
+    """
+    def generate():
+        for record in records:
+            yield json.dumps(record, default=str) + '\n'
+    response = Response(stream_with_context(generate()), mimetype='application/x-ndjson')
+    if next_cursor is not None:
+        response.headers['X-Next-Cursor'] = next_cursor
+    return response
+
 def log_api_request(request_data: Dict, response_data: Dict, duration: float) -> None:
     """Log API request and response for analytics"""
     log_entry = {
@@ -126,7 +318,7 @@ def calculate_similarity_score(event1: Dict, event2: Dict) -> float:
     
     return score
 
-def filter_events_by_preferences(events_df: pd.DataFrame, preferences: Dict) -> pd.DataFrame:
+def filter_events_by_preferences(events_df: 'pd.DataFrame', preferences: Dict) -> 'pd.DataFrame':
     """Filter events based on user preferences"""
     filtered_df = events_df.copy()
     
@@ -150,22 +342,89 @@ def filter_events_by_preferences(events_df: pd.DataFrame, preferences: Dict) ->
     
     return filtered_df
 
-def rank_recommendations(recommendations: List[Dict], user_preferences: Dict) -> List[Dict]:
-    """Rank recommendations based on user preferences and similarity"""
-    for rec in recommendations:
-        # Calculate similarity score
-        similarity = calculate_similarity_score(rec, user_preferences)
-        
-        # Combine with like probability for final score
-        like_prob = rec.get('like_probability', 0)
-        final_score = (similarity * 0.6) + (like_prob * 0.4)
-        
-        rec['similarity_score'] = similarity
-        rec['final_score'] = final_score
+# Categorical similarity weights, applied in this order (duration adds up to 0.1 more)
+SIMILARITY_WEIGHTS = (('event_type', 0.4), ('location', 0.3), ('time_of_day', 0.2))
+
+def encode_column(values: List[Any], target: Any) -> tuple[np.ndarray, int]:
+    """Integer codes for ``values`` plus the code of ``target`` (-2 if it never occurs).
+    
+    Missing values (None) share code -1, so a missing target matches missing values
+    just as ``None == None`` does in ``calculate_similarity_score``.
+    """
+    # A dict beats pd.factorize for the handful of rows a request ranks, and keeps pandas off the request path
+    lookup = {None: -1}
+    codes = np.fromiter((lookup.setdefault(value, len(lookup) - 1) for value in values),
+                        dtype=np.int64, count=len(values))
+    return codes, lookup.get(target, -2)
+
+def similarity_scores(codes: Dict[str, np.ndarray], target_codes: Dict[str, int],
+                      durations: np.ndarray, target_duration: float = 0) -> np.ndarray:
+    """``calculate_similarity_score`` for integer-coded candidates against one target.
+    
+    Weights are accumulated in the same order as the scalar version, so the
+    floating-point results are identical.
+    """
+    score = np.zeros(len(durations))
+    for field, weight in SIMILARITY_WEIGHTS:
+        score += np.where(codes[field] == target_codes[field], weight, 0.0)
+    duration_diff = np.abs(durations - target_duration)
+    score += np.select([duration_diff <= 60, duration_diff <= 120], [0.1, 0.05], 0.0)
+    return score
+
+def top_k_indices(scores: np.ndarray, k: int) -> np.ndarray:
+    """Indices of the ``k`` highest scores, best first, ties in input order (like a stable sort)"""
+    if k >= len(scores):
+        return np.argsort(-scores, kind='stable')
+    if k <= 0:
+        return np.empty(0, dtype=np.int64)
+    
+    # Partition instead of sorting everything; rows tied with the k-th score
+    # are then taken in input order so the result matches a full stable sort
+    negated = -scores
+    threshold = np.partition(negated, k - 1)[k - 1]
+    better = np.flatnonzero(negated < threshold)
+    tied = np.flatnonzero(negated == threshold)[:k - len(better)]
+    chosen = np.sort(np.concatenate([better, tied]))
+    return chosen[np.argsort(negated[chosen], kind='stable')]
+
+def _column(records: List[Dict], field: str, default: Any) -> List[Any]:
+    """One field from every record; uses a C-level getter unless some record lacks it"""
+    try:
+        return list(map(itemgetter(field), records))
+    except KeyError:
+        return [record.get(field, default) for record in records]
+
+def rank_recommendations(recommendations: List[Dict], user_preferences: Dict,
+                         limit: Optional[int] = None) -> List[Dict]:
+    """Rank recommendations based on user preferences and similarity.
+    
+    Scores every candidate in one NumPy pass and returns the best ``limit``
+    (all of them by default), each annotated with ``similarity_score`` and
+    ``final_score``.
+    """
+    n = len(recommendations)
+    if n == 0:
+        return recommendations
+    
+    codes, target_codes = {}, {}
+    for field, _ in SIMILARITY_WEIGHTS:
+        codes[field], target_codes[field] = encode_column(
+            _column(recommendations, field, None), user_preferences.get(field)
+        )
+    durations = np.array(_column(recommendations, 'duration', 0), dtype=np.float64)
+    like_prob = np.array(_column(recommendations, 'like_probability', 0), dtype=np.float64)
     
-    # Sort by final score
-    recommendations.sort(key=lambda x: x['final_score'], reverse=True)
-    return recommendations
+    # Combine with like probability for final score
+    similarity = similarity_scores(codes, target_codes, durations, user_preferences.get('duration', 0))
+    final_score = (similarity * 0.6) + (like_prob * 0.4)
+    
+    ranked = []
+    for i in top_k_indices(final_score, n if limit is None else limit):
+        rec = recommendations[i]
+        rec['similarity_score'] = float(similarity[i])
+        rec['final_score'] = float(final_score[i])
+        ranked.append(rec)
+    return ranked
 
 def validate_and_clean_preferences(preferences: Dict) -> tuple[Dict, List[str]]:
     """Validate and clean user preferences"""
@@ -207,6 +466,22 @@ def validate_and_clean_preferences(preferences: Dict) -> tuple[Dict, List[str]]:
     
     return cleaned_prefs, errors
 
+def validate_and_clean_preferences_batch(preferences_list: List[Dict]) -> tuple[List[Dict], List[str]]:
+    """Validate and clean a list of user preferences, prefixing errors with their index"""
+    cleaned_list = []
+    errors = []
+    
+    for position, preferences in enumerate(preferences_list):
+        if not isinstance(preferences, dict):
+            errors.append(f"preferences[{position}]: must be an object")
+            continue
+        
+        cleaned_prefs, prefs_errors = validate_and_clean_preferences(preferences)
+        cleaned_list.append(cleaned_prefs)
+        errors.extend(f"preferences[{position}]: {error}" for error in prefs_errors)
+    
+    return cleaned_list, errors
+
 def generate_recommendation_explanation(recommendation: Dict, user_preferences: Dict) -> str:
     """Generate human-readable explanation for a recommendation"""
     reasons = []
@@ -261,13 +536,22 @@ def save_feedback_to_file(feedback_data: Dict, filename: str = "user_feedback.js
     except Exception as e:
         logger.error(f"Failed to save feedback: {e}")
 
-def get_api_usage_stats() -> Dict:
-    """Get API usage statistics"""
+def get_api_usage_stats(metrics_summary: Optional[Dict] = None) -> Dict:
+    """Get API usage statistics, from a ``MetricsRegistry.summary()`` when one is given"""
+    cache_stats = cache.stats()
+    latency = (metrics_summary or {}).get('latency', {})
+    requests_latency = latency.get('http_request_duration_seconds', {})
+    total_requests = sum(series['count'] for series in requests_latency.values())
+    total_ms = sum(series['mean_ms'] * series['count'] for series in requests_latency.values())
     return {
-        "cache_size": cache.size(),
-        "cache_hit_rate": 0.0,  # Would need to track hits/misses
-        "total_requests": 0,    # Would need to track in production
-        "average_response_time": 0.0,  # Would need to track in production
+        "cache_size": cache_stats["entries"],
+        "cache_hit_rate": cache_stats["hit_rate"],
+        "cache": cache_stats,
+        "total_requests": total_requests,
+        "average_response_time": round(total_ms / total_requests, 3) if total_requests else 0.0,
+        "latency_by_route": requests_latency,
+        "model_inference": latency.get('model_inference_seconds', {}),
+        "upstream": latency.get('upstream_request_seconds', {}),
         "uptime": datetime.utcnow().isoformat()
     }
 
@@ -311,4 +595,74 @@ def enrich_event_data(event: Dict) -> Dict:
     else:
         enriched['difficulty'] = 'Advanced'
     
-    return enriched 
\ No newline at end of file
+    return enriched 
+
+ENRICHED_COLUMNS = ['duration_formatted', 'popularity_category', 'difficulty']
+
+def format_durations(minutes: 'pd.Series') -> 'pd.Series':
+    """Vectorized ``format_duration`` over a column of minutes"""
+    import pandas as pd
+    
+    # NumPy strings rather than Series.astype(str), and no cast to int: a
+    # column with a missing duration is float, and the per-row version
+    # formats those as '1.0 hour 30.0 minutes' and 'nan hours nan minutes'
+    values = minutes.to_numpy()
+    hours = (values // 60).astype(str)
+    remaining = np.char.add((values % 60).astype(str), ' minutes')
+    formatted = np.select(
+        [values < 60, values < 120],
+        [np.char.add(values.astype(str), ' minutes'), np.char.add(np.char.add(hours, ' hour '), remaining)],
+        np.char.add(np.char.add(hours, ' hours '), remaining)
+    )
+    return pd.Series(formatted, index=minutes.index)
+
+def enrich_events_frame(events_df: 'pd.DataFrame') -> 'pd.DataFrame':
+    """Vectorized ``enrich_event_data`` for a whole table, computed once at load time"""
+    enriched = events_df.copy()
+    duration = enriched['duration']
+    popularity = enriched['popularity_score']
+    event_type = enriched['event_type'].str.lower()
+    
+    enriched['duration_formatted'] = format_durations(duration)
+    # NaN fails every comparison and lands in the default, as in the per-row version
+    enriched['popularity_category'] = np.select(
+        [popularity >= 9.0, popularity >= 8.0, popularity >= 7.0],
+        ['Very Popular', 'Popular', 'Moderately Popular'],
+        'Less Popular'
+    )
+    enriched['difficulty'] = np.select(
+        [(duration <= 60) | (event_type == 'rocket launch'),
+         (duration <= 180) | event_type.isin(['meteor shower', 'star party'])],
+        ['Easy', 'Moderate'],
+        'Advanced'
+    )
+    return enriched
+
+def build_enrichment_index(event_types: List[str], durations, popularity_scores) -> Dict[tuple, Dict]:
+    """Enriched fields for every (event_type, duration, popularity_score) combination.
+    
+    Recommendation rows are generated per request from a fixed grid, so their
+    enrichment can be looked up instead of recomputed.
+    """
+    # A few hundred rows: the scalar version is quick enough and needs no pandas at startup
+    index = {}
+    for event_type in event_types:
+        for duration in durations:
+            for popularity in popularity_scores:
+                enriched = enrich_event_data({
+                    'event_type': event_type, 'duration': int(duration), 'popularity_score': float(popularity)
+                })
+                index[(event_type.lower(), int(duration), float(popularity))] = {
+                    column: enriched[column] for column in ENRICHED_COLUMNS
+                }
+    return index
+
+def enrich_from_index(event: Dict, index: Dict[tuple, Dict]) -> Dict:
+    """``enrich_event_data`` via a prebuilt index, falling back to computing it"""
+    key = (str(event.get('event_type', '')).lower(), event.get('duration'), event.get('popularity_score'))
+    fields = index.get(key)
+    if fields is None:
+        return enrich_event_data(event)
+    enriched = event.copy()
+    enriched.update(fields)
+    return enriched
@@ -0,0 +1,22 @@
+"""
+WSGI entry point for serving enhanced_app with several workers:
+
+    gunicorn -c gunicorn.conf.py wsgi:app
+
+With ``preload_app`` (on by default in gunicorn.conf.py) this module is
+imported once in the gunicorn master. The model and events are loaded
+there and every worker inherits them through fork, sharing the pages
+copy-on-write instead of loading its own copy; the events table is
+memory-mapped, so its columns are shared through the page cache as well.
+"""
+
+import gc
+
+from enhanced_app import app, load_model, model_manager  # noqa: F401  (app is the WSGI callable)
+
+load_model()
+
+# Everything loaded so far lives as long as the process. Moving it out of the
+# collector's generations stops a GC pass in each worker from writing to
+# (and so copying) every inherited object's header.
+gc.freeze()